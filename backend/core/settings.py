@@ -10,11 +10,16 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Running under `manage.py test`
+TESTING = sys.argv[1:2] == ['test']
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/3.2/howto/deployment/checklist/
@@ -45,6 +50,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'recipes.middleware.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -83,6 +89,111 @@ DATABASES = {
 }
 
 
+# Cache
+# Single node: 'locmem' (default) or 'file'. Several nodes need a shared
+# cache so that invalidations are seen everywhere: 'redis' or 'memcached'
+# with CACHE_LOCATION pointing at the server.
+
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+}
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+CACHE_DEFAULT_LOCATIONS = {
+    'locmem': 'recipio',
+    'file': str(BASE_DIR / 'cache'),
+    'redis': 'redis://127.0.0.1:6379/1',
+    'memcached': '127.0.0.1:11211',
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.getenv('CACHE_LOCATION', CACHE_DEFAULT_LOCATIONS[CACHE_BACKEND]),
+        'OPTIONS': {'MAX_ENTRIES': 5000} if CACHE_BACKEND in ('locmem', 'file') else {},
+    }
+}
+
+# LLM backend for the AI endpoints: 'groq' or 'fake' (canned JSON after a
+# configurable delay, for load tests and benchmarks without network access)
+LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'groq')
+LLM_FAKE_LATENCY = float(os.getenv('LLM_FAKE_LATENCY', '0.5'))  # seconds
+LLM_FAKE_ERROR_RATE = float(os.getenv('LLM_FAKE_ERROR_RATE', '0'))  # 0..1
+LLM_FAKE_RESPONSES_FILE = os.getenv('LLM_FAKE_RESPONSES_FILE', '')  # JSON: {"substitute": ..., "recipe": ...}
+
+# Failure isolation for provider calls (see recipes/resilience.py)
+LLM_TIMEOUT = 30  # seconds per call, retries included
+LLM_CONNECT_TIMEOUT = 5  # seconds
+LLM_MAX_RETRIES = 2
+LLM_RETRY_BACKOFF = 0.5  # seconds, doubled per attempt and jittered
+LLM_RETRY_MAX_BACKOFF = 4  # seconds
+LLM_BREAKER_WINDOW = 60  # seconds of outcomes the error rate is computed over
+LLM_BREAKER_MIN_CALLS = 10
+LLM_BREAKER_ERROR_RATE = 0.5
+LLM_BREAKER_COOLDOWN = 30  # seconds the breaker stays open
+LLM_POOL_CONNECTIONS = 20
+LLM_POOL_KEEPALIVE = 10
+LLM_POOL_KEEPALIVE_EXPIRY = 60  # seconds
+
+# AI answers (substitutions, ...) are kept in an in-process LRU in front of a
+# persistent cache: a file cache unless AI_CACHE_BACKEND selects another one.
+AI_CACHE_BACKEND = os.getenv('AI_CACHE_BACKEND', 'file')
+AI_CACHE_DEFAULT_LOCATIONS = dict(CACHE_DEFAULT_LOCATIONS, locmem='recipio-ai', file=str(BASE_DIR / 'var' / 'ai_cache'))
+AI_CACHE_LOCATION = os.getenv('AI_CACHE_LOCATION', AI_CACHE_DEFAULT_LOCATIONS[AI_CACHE_BACKEND])
+if TESTING:
+    # Tests never read or write the real persistent cache
+    AI_CACHE_BACKEND, AI_CACHE_LOCATION = 'locmem', 'recipio-ai-tests'
+CACHES['ai'] = {
+    'BACKEND': CACHE_BACKENDS[AI_CACHE_BACKEND],
+    'LOCATION': AI_CACHE_LOCATION,
+    'OPTIONS': {'MAX_ENTRIES': 20000} if AI_CACHE_BACKEND in ('locmem', 'file') else {},
+}
+AI_CACHE_ALIAS = 'ai'
+AI_CACHE_TIMEOUT = 7 * 24 * 3600  # seconds
+AI_CACHE_MEMORY_SIZE = 1024  # entries per process
+# Longest an identical AI call waits on another process's in-flight call
+AI_COALESCE_TIMEOUT = 120  # seconds
+
+# Generated recipes are reused for requests whose ingredient set (normalized,
+# pantry staples dropped) is at least this Jaccard-similar to a recent one
+# with the same preferences and contains all of its ingredients (see
+# recipes/generation_cache.py)
+GENERATION_CACHE_SIMILARITY = 0.8
+GENERATION_CACHE_SIZE = 256  # recipes kept per restriction profile
+GENERATION_CACHE_TIMEOUT = 24 * 3600  # seconds
+
+RECIPE_CACHE_ALIAS = 'default'
+RECIPE_CACHE_TIMEOUT = 300  # seconds
+
+# Full rebuild interval of the in-process pantry matching index
+PANTRY_INDEX_MAX_AGE = 600  # seconds
+
+# Minimum interval between rebuilds of the "similar recipes" TF-IDF matrix
+SIMILARITY_REBUILD_INTERVAL = 300  # seconds
+
+# Trending score: favorites/ratings lose half their weight every half-life.
+# A full recompute (refresh_trending --full) reads events back to the window.
+TRENDING_HALF_LIFE = 48 * 3600  # seconds
+TRENDING_WINDOW = 14 * 24 * 3600  # seconds
+
+# Background recipe generation (generate-recipe with "async": true)
+GENERATION_WORKERS = 4  # threads per web process
+GENERATION_QUEUE_LIMIT = 100  # pending + running jobs before new ones get 503
+GENERATION_JOB_TIMEOUT = 300  # seconds before a running job is assumed dead and requeued
+GENERATION_SWEEP_INTERVAL = 60  # seconds between sweeps for jobs left behind by restarted processes
+GENERATION_JOB_RETENTION = 7 * 24 * 3600  # seconds finished jobs are kept
+
+# /api/metrics/ is served to staff users and to clients in these networks
+# (REMOTE_ADDR; behind a reverse proxy, restrict the path at the proxy too)
+METRICS_ALLOWED_NETWORKS = ['127.0.0.0/8', '::1/128']
+
+# Generated artifacts (recommendation models, ...)
+VAR_DIR = BASE_DIR / 'var'
+RECOMMENDATIONS_DIR = VAR_DIR / 'recommendations'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -139,6 +250,8 @@ REST_FRAMEWORK = {
         'rest_framework_simplejwt.authentication.JWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
+    'DEFAULT_PAGINATION_CLASS': 'recipes.pagination.KeysetPagination',
+    'PAGE_SIZE': 20,
 }
 
 from datetime import timedelta
@@ -0,0 +1,86 @@
+"""
+Two-tier cache for AI answers: an in-process LRU in front of the Django
+cache ``AI_CACHE_ALIAS``, keyed by the normalized prompt inputs and model.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+MEMORY = 'memory'
+SHARED = 'shared'
+
+
+def normalize_preferences(value):
+    """Lowercased, de-duplicated and sorted list from a list or comma separated string."""
+    items = value.split(',') if isinstance(value, str) else list(value or [])
+    return sorted({' '.join(str(item).lower().split()) for item in items} - {''})
+
+
+def cache_key(kind, *parts):
+    payload = json.dumps([kind, *parts], separators=(',', ':'), sort_keys=True)
+    return f'ai:{kind}:{hashlib.sha256(payload.encode("utf-8")).hexdigest()}'
+
+
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class AICache:
+    def __init__(self):
+        self.memory = LRUCache(getattr(settings, 'AI_CACHE_MEMORY_SIZE', 1024))
+
+    @property
+    def shared(self):
+        return caches[getattr(settings, 'AI_CACHE_ALIAS', 'default')]
+
+    def get(self, key):
+        """Return (value, tier) where tier is MEMORY, SHARED or None on a miss."""
+        value = self.memory.get(key)
+        if value is not None:
+            return value, MEMORY
+        entry = self.shared.get(key)
+        if entry is None:
+            return None, None
+        # Promote with the remaining lifetime of the shared entry
+        self.memory.set(key, entry['value'], entry['expires_at'])
+        return entry['value'], SHARED
+
+    def set(self, key, value):
+        timeout = getattr(settings, 'AI_CACHE_TIMEOUT', 7 * 24 * 3600)
+        expires_at = time.time() + timeout
+        self.memory.set(key, value, expires_at)
+        self.shared.set(key, {'value': value, 'expires_at': expires_at}, timeout)
+
+
+ai_cache = AICache()
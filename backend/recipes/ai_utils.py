@@ -1,11 +1,16 @@
-import os
-from groq import Groq
 from dotenv import load_dotenv
 import json
 
+from .ai_cache import ai_cache, cache_key, normalize_preferences
+from .coalesce import single_flight
+from .generation_cache import canonical_ingredients, generation_cache
+from .llm import get_provider
+from .metrics import JSON_ERROR, LLMCall
+from .vocabulary import normalize_ingredient, parse_ingredient_list
+
 load_dotenv()
 
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+MODEL = "llama-3.3-70b-versatile"
 
 def get_ingredient_substitute(ingredient_name, user_restrictions="", user_allergies=""):
     prompt = f"""
@@ -17,37 +22,145 @@ def get_ingredient_substitute(ingredient_name, user_restrictions="", user_allerg
     CRITICAL: You must return ONLY a JSON object with a single key 'alternatives' containing a list of objects with 'name', 'reason', and 'texture_impact' keys.
     """
     
-    chat_completion = client.chat.completions.create(
-        messages=[
-            {
-                "role": "system",
-                "content": "You are a professional culinary assistant focused on dietary accommodations."
-            },
-            {
-                "role": "user",
-                "content": prompt,
-            }
-        ],
-        model="llama-3.3-70b-versatile",
-        response_format={"type": "json_object"}
-    )
+    with LLMCall('substitute', MODEL) as call:
+        completion = get_provider().complete(
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You are a professional culinary assistant focused on dietary accommodations."
+                },
+                {
+                    "role": "user",
+                    "content": prompt,
+                }
+            ],
+            model=MODEL,
+            json_mode=True
+        )
+        call.completed(completion)
+        call.check_json(completion.text)
     
-    return chat_completion.choices[0].message.content
+    return completion.text
 
 
-def generate_recipe_from_ingredients(ingredients_text, user_restrictions="", user_allergies=""):
+def get_batch_substitutes(ingredient_names, user_restrictions="", user_allergies=""):
     """
-    Generate a complete recipe from a list of ingredients using AI.
+    Ask for substitutes of several ingredients in one call.
+
+    Returns:
+        str: JSON object keyed by item number ("1", "2", ...) in the order of ingredient_names
+    """
+    items = "\n".join(f"    {number}. {name}" for number, name in enumerate(ingredient_names, start=1))
+    prompt = f"""
+    The user wants to substitute each of these ingredients:
+{items}
+    User Dietary Restrictions: {user_restrictions}
+    User Allergies: {user_allergies}
     
-    Args:
-        ingredients_text (str): Comma-separated or line-separated list of ingredients
-        user_restrictions (str): User's dietary restrictions
-        user_allergies (str): User's allergies
+    For each ingredient provide 3 smart, logical, and culinary-accurate alternatives.
+    CRITICAL: You must return ONLY a JSON object keyed by the item number ("1", "2", ...). Each value must be an object with a single key 'alternatives' containing a list of objects with 'name', 'reason', and 'texture_impact' keys.
+    """
+    
+    with LLMCall('substitute_batch', MODEL) as call:
+        completion = get_provider().complete(
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You are a professional culinary assistant focused on dietary accommodations."
+                },
+                {
+                    "role": "user",
+                    "content": prompt,
+                }
+            ],
+            model=MODEL,
+            json_mode=True
+        )
+        call.completed(completion)
+        call.check_json(completion.text)
     
+    return completion.text
+
+
+def substitution_key(ingredient_name, restrictions, allergies):
+    ingredient_key = normalize_ingredient(ingredient_name) or ingredient_name.strip().lower()
+    return cache_key('substitute', ingredient_key, restrictions, allergies, MODEL)
+
+
+def substitute_with_cache(ingredient_name, restrictions=(), allergies=()):
+    """
+    Substitutes for an ingredient, answered from the AI cache when the same
+    normalized question was asked before.
+
     Returns:
-        dict: Generated recipe with title, description, ingredients, instructions, etc.
+        tuple: (parsed alternatives, cache tier it came from or None on a miss)
     """
-    prompt = f"""
+    restrictions = normalize_preferences(restrictions)
+    allergies = normalize_preferences(allergies)
+    key = substitution_key(ingredient_name, restrictions, allergies)
+    data, tier = ai_cache.get(key)
+    if data is None:
+        def ask():
+            answer = json.loads(get_ingredient_substitute(ingredient_name, ", ".join(restrictions), ", ".join(allergies)))
+            ai_cache.set(key, answer)
+            return answer
+        # Identical questions asked concurrently share one upstream call
+        data = single_flight.do(key, ask)
+    return data, tier
+
+
+def substitutes_with_cache(ingredient_names, restrictions=(), allergies=()):
+    """
+    Substitutes for several ingredients. Cached answers are reused and only
+    the misses are sent upstream, together in one prompt; each answer is
+    then cached on its own, so later single or batch requests reuse it.
+
+    Returns:
+        list: (parsed alternatives or {"error": ...}, cache tier or None) per ingredient
+    """
+    restrictions = normalize_preferences(restrictions)
+    allergies = normalize_preferences(allergies)
+    keys = [substitution_key(name, restrictions, allergies) for name in ingredient_names]
+    answers = {}
+    misses = {}
+    for name, key in zip(ingredient_names, keys):
+        if key in answers or key in misses:
+            continue
+        data, tier = ai_cache.get(key)
+        if data is None:
+            misses[key] = name
+        else:
+            answers[key] = (data, tier)
+
+    if misses:
+        miss_keys = list(misses)
+
+        def ask():
+            response = json.loads(get_batch_substitutes(
+                [misses[key] for key in miss_keys], ", ".join(restrictions), ", ".join(allergies),
+            ))
+            if not isinstance(response, dict):
+                raise ValueError("AI response is not a JSON object")
+            results = {}
+            for number, key in enumerate(miss_keys, start=1):
+                answer = response.get(str(number))
+                if isinstance(answer, dict) and isinstance(answer.get("alternatives"), list):
+                    ai_cache.set(key, answer)
+                    results[key] = answer
+            return results
+
+        results = single_flight.do(cache_key('substitute-batch', sorted(miss_keys)), ask)
+        for key in miss_keys:
+            answers[key] = (results.get(key) or {"error": "No substitutes returned for this ingredient"}, None)
+
+    return [answers[key] for key in keys]
+
+
+RECIPE_SYSTEM_PROMPT = "You are a world-class chef who creates amazing recipes. You always return valid JSON."
+
+
+def recipe_prompt(ingredients_text, user_restrictions="", user_allergies=""):
+    return f"""
     You are a professional chef and recipe creator. The user has the following ingredients available:
     {ingredients_text}
     
@@ -78,32 +191,165 @@ def generate_recipe_from_ingredients(ingredients_text, user_restrictions="", use
     
     Make the recipe realistic, delicious, and easy to follow. Include at least 4-6 detailed instruction steps.
     """
+
+
+def generate_recipe_from_ingredients(ingredients_text, user_restrictions="", user_allergies=""):
+    """
+    Generate a complete recipe from a list of ingredients using AI.
+
+    Concurrent calls for the same ingredients and preferences share a
+    single upstream call (see coalesce.py).
     
-    chat_completion = client.chat.completions.create(
-        messages=[
-            {
-                "role": "system",
-                "content": "You are a world-class chef who creates amazing recipes. You always return valid JSON."
-            },
-            {
-                "role": "user",
-                "content": prompt,
-            }
-        ],
-        model="llama-3.3-70b-versatile",
-        response_format={"type": "json_object"},
-        temperature=0.7
+    Args:
+        ingredients_text (str): Comma-separated or line-separated list of ingredients
+        user_restrictions (str): User's dietary restrictions
+        user_allergies (str): User's allergies
+    
+    Returns:
+        dict: Generated recipe with title, description, ingredients, instructions, etc.
+    """
+    key = cache_key(
+        'generate', sorted(parse_ingredient_list(ingredients_text)),
+        normalize_preferences(user_restrictions), normalize_preferences(user_allergies), MODEL,
+    )
+    return single_flight.do(key, lambda: _generate_recipe(ingredients_text, user_restrictions, user_allergies))
+
+
+def generate_recipe_with_cache(ingredients_text, user_restrictions="", user_allergies="", fresh=False):
+    """
+    generate_recipe_from_ingredients, answered from the near-duplicate cache
+    when a recipe was recently generated for a similar set of ingredients
+    and the same preferences (see generation_cache.py). ``fresh`` skips the
+    lookup; the new recipe is still remembered.
+
+    Returns:
+        tuple: (recipe, Jaccard similarity of the cached match or None on a miss)
+    """
+    ingredients = canonical_ingredients(ingredients_text)
+    profile = (
+        tuple(normalize_preferences(user_restrictions)), tuple(normalize_preferences(user_allergies)), MODEL,
     )
+    if not fresh:
+        match = generation_cache.get(ingredients, profile)
+        if match is not None:
+            return match
+    recipe_data = generate_recipe_from_ingredients(ingredients_text, user_restrictions, user_allergies)
+    if "error" not in recipe_data:
+        generation_cache.add(ingredients, profile, recipe_data)
+    return recipe_data, None
+
+
+def _generate_recipe(ingredients_text, user_restrictions, user_allergies):
+    with LLMCall('generate', MODEL) as call:
+        completion = get_provider().complete(
+            messages=[
+                {
+                    "role": "system",
+                    "content": RECIPE_SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": recipe_prompt(ingredients_text, user_restrictions, user_allergies),
+                }
+            ],
+            model=MODEL,
+            json_mode=True,
+            temperature=0.7
+        )
+        call.completed(completion)
     
-    response_text = chat_completion.choices[0].message.content
+        response_text = completion.text
     
-    try:
-        recipe_data = json.loads(response_text)
-        return recipe_data
-    except json.JSONDecodeError as e:
-        # Fallback in case JSON parsing fails
-        return {
-            "error": "Failed to parse AI response",
-            "raw_response": response_text
-        }
+        try:
+            recipe_data = json.loads(response_text)
+            return recipe_data
+        except json.JSONDecodeError as e:
+            # Fallback in case JSON parsing fails
+            call.outcome = JSON_ERROR
+            return {
+                "error": "Failed to parse AI response",
+                "raw_response": response_text
+            }
+
+
+def stream_recipe_from_ingredients(ingredients_text, user_restrictions="", user_allergies=""):
+    """
+    Like generate_recipe_from_ingredients, but yields the response text in
+    pieces as the model produces it.
+
+    JSON mode is not available together with streaming, so the output is
+    only held to JSON by the prompt; see validate_generated_recipe.
+    """
+    with LLMCall('generate_stream', MODEL) as call:
+        text = []
+        for chunk in get_provider().stream(
+            messages=[
+                {
+                    "role": "system",
+                    "content": RECIPE_SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": recipe_prompt(ingredients_text, user_restrictions, user_allergies),
+                }
+            ],
+            model=MODEL,
+            temperature=0.7
+        ):
+            call.received()
+            text.append(chunk)
+            yield chunk
+        try:
+            parse_recipe_text(''.join(text))
+        except ValueError:
+            call.outcome = JSON_ERROR
+
+
+def parse_recipe_text(text):
+    # Tolerate prose or code fences around the object
+    start, end = text.find('{'), text.rfind('}')
+    if start < 0 or end < start:
+        raise ValueError("No JSON object in the response")
+    return json.loads(text[start:end + 1])
+
+
+def validate_generated_recipe(recipe_data):
+    """
+    Check the shape of a generated recipe and coerce its fields to the types
+    the recipe form expects. Raises ValueError when a required part is missing.
+    """
+    if not isinstance(recipe_data, dict):
+        raise ValueError("Recipe must be a JSON object")
+    for field in ("title", "description"):
+        if not isinstance(recipe_data.get(field), str) or not recipe_data[field].strip():
+            raise ValueError(f"Recipe has no {field}")
+    ingredients = recipe_data.get("ingredients")
+    if not isinstance(ingredients, list) or not ingredients:
+        raise ValueError("Recipe has no ingredients")
+    instructions = recipe_data.get("instructions")
+    if not isinstance(instructions, list) or not instructions:
+        raise ValueError("Recipe has no instructions")
 
+    cleaned = {
+        "title": recipe_data["title"].strip(),
+        "description": recipe_data["description"].strip(),
+        "ingredients": [],
+        "instructions": [str(step).strip() for step in instructions if str(step).strip()],
+        "category": str(recipe_data.get("category") or "Other").strip(),
+    }
+    for ingredient in ingredients:
+        if isinstance(ingredient, str):
+            ingredient = {"name": ingredient}
+        if not isinstance(ingredient, dict) or not str(ingredient.get("name") or "").strip():
+            raise ValueError("Every ingredient needs a name")
+        cleaned["ingredients"].append({
+            "name": str(ingredient["name"]).strip(),
+            "amount": str(ingredient.get("amount") or "").strip(),
+            "unit": str(ingredient.get("unit") or "").strip(),
+        })
+    for field, default in (("prep_time", 0), ("cook_time", 0), ("servings", 1)):
+        try:
+            cleaned[field] = max(int(float(recipe_data.get(field, default))), 0)
+        except (TypeError, ValueError):
+            cleaned[field] = default
+    return cleaned
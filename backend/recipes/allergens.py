@@ -0,0 +1,174 @@
+"""
+Allergen and dietary flags derived from ingredient names.
+
+Each recipe stores the union of the flags of its ingredients as a bitmask
+in Recipe.allergen_flags. A user's allergies and dietary restrictions map
+to a mask of flags they must avoid, so "is this recipe safe for me" is a
+single ``allergen_flags & mask = 0`` predicate on the recipe row.
+
+After changing the dictionaries below, run the recompute_allergen_flags
+management command.
+"""
+import re
+from collections import defaultdict
+
+from django.db.models import F
+
+from .models import Ingredient, Recipe
+from .vocabulary import normalize_ingredient
+
+GLUTEN = 1 << 0
+DAIRY = 1 << 1
+EGG = 1 << 2
+PEANUT = 1 << 3
+TREE_NUT = 1 << 4
+SOY = 1 << 5
+FISH = 1 << 6
+SHELLFISH = 1 << 7
+SESAME = 1 << 8
+MEAT = 1 << 9
+HONEY = 1 << 10
+
+UPDATE_BATCH_SIZE = 500
+
+FLAG_NAMES = {
+    GLUTEN: 'gluten', DAIRY: 'dairy', EGG: 'egg', PEANUT: 'peanut', TREE_NUT: 'tree nut',
+    SOY: 'soy', FISH: 'fish', SHELLFISH: 'shellfish', SESAME: 'sesame', MEAT: 'meat', HONEY: 'honey',
+}
+
+# Multi-word ingredients whose words would otherwise be misread
+# ("peanut butter" is not dairy, "coconut milk" is neither).
+PHRASE_FLAGS = {
+    'peanut butter': PEANUT,
+    'almond butter': TREE_NUT,
+    'almond milk': TREE_NUT,
+    'cashew milk': TREE_NUT,
+    'soy milk': SOY,
+    'soy sauce': SOY | GLUTEN,
+    'coconut milk': 0,
+    'coconut cream': 0,
+    'oat milk': 0,
+    'rice milk': 0,
+    'vegan butter': 0,
+    'cream tartar': 0,
+    'gluten free flour': 0,
+    'rice flour': 0,
+    'almond flour': TREE_NUT,
+    'coconut flour': 0,
+    'corn flour': 0,
+    'fish sauce': FISH,
+    'oyster sauce': SHELLFISH,
+    'sesame oil': SESAME,
+    'egg noodle': EGG | GLUTEN,
+}
+
+WORD_FLAGS = {
+    GLUTEN: {
+        'flour', 'wheat', 'bread', 'breadcrumb', 'pasta', 'spaghetti', 'penne', 'macaroni', 'noodle',
+        'barley', 'rye', 'couscous', 'semolina', 'dough', 'tortilla', 'pita', 'bun', 'cracker', 'seitan',
+        'lasagna', 'fettuccine', 'linguine', 'croissant', 'panko',
+    },
+    DAIRY: {
+        'milk', 'cheese', 'butter', 'cream', 'yogurt', 'mozzarella', 'parmesan', 'pecorino', 'cheddar',
+        'ricotta', 'feta', 'mascarpone', 'ghee', 'buttermilk', 'gruyere', 'brie', 'paneer', 'whey',
+    },
+    EGG: {'egg', 'mayonnaise', 'mayo', 'meringue', 'aioli'},
+    PEANUT: {'peanut'},
+    TREE_NUT: {
+        'almond', 'walnut', 'cashew', 'pecan', 'pistachio', 'hazelnut', 'macadamia', 'nut', 'praline',
+        'marzipan',
+    },
+    SOY: {'soy', 'tofu', 'tempeh', 'edamame', 'miso', 'soybean'},
+    FISH: {'fish', 'salmon', 'tuna', 'cod', 'anchovy', 'sardine', 'trout', 'halibut', 'tilapia', 'mackerel'},
+    SHELLFISH: {'shrimp', 'crab', 'lobster', 'mussel', 'clam', 'oyster', 'scallop', 'crawfish', 'squid'},
+    SESAME: {'sesame', 'tahini'},
+    MEAT: {
+        'chicken', 'beef', 'pork', 'bacon', 'guanciale', 'pancetta', 'lamb', 'turkey', 'ham', 'sausage',
+        'veal', 'duck', 'prosciutto', 'salami', 'chorizo', 'steak', 'mince', 'gelatin', 'pepperoni',
+    },
+    HONEY: {'honey'},
+}
+
+# User allergies / dietary restrictions -> flags to avoid
+PREFERENCE_FLAGS = {
+    'peanut': PEANUT,
+    'tree nut': TREE_NUT,
+    'nut': PEANUT | TREE_NUT,
+    'soy': SOY,
+    'wheat': GLUTEN,
+    'gluten': GLUTEN,
+    'shellfish': SHELLFISH,
+    'fish': FISH,
+    'egg': EGG,
+    'milk': DAIRY,
+    'dairy': DAIRY,
+    'lactose': DAIRY,
+    'sesame': SESAME,
+    'vegan': MEAT | FISH | SHELLFISH | DAIRY | EGG | HONEY,
+    'vegetarian': MEAT | FISH | SHELLFISH,
+    'pescatarian': MEAT,
+    'gluten free': GLUTEN,
+    'dairy free': DAIRY,
+    'nut free': PEANUT | TREE_NUT,
+    'egg free': EGG,
+}
+
+
+def ingredient_flags(name):
+    phrase = normalize_ingredient(name)
+    flags = 0
+    for override, override_flags in PHRASE_FLAGS.items():
+        pattern = r'\b%s\b' % re.escape(override)
+        if re.search(pattern, phrase):
+            flags |= override_flags
+            phrase = re.sub(pattern, ' ', phrase)
+    for word in phrase.split():
+        for flag, words in WORD_FLAGS.items():
+            if word in words:
+                flags |= flag
+    return flags
+
+
+def flag_names(flags):
+    return [name for flag, name in FLAG_NAMES.items() if flags & flag]
+
+
+def preference_mask(restrictions, allergies):
+    """Mask of flags to avoid for a profile's dietary restrictions and allergies."""
+    mask = 0
+    for value in list(restrictions or []) + list(allergies or []):
+        key = normalize_ingredient(value)
+        mask |= PREFERENCE_FLAGS.get(key, 0)
+    return mask
+
+
+def compute_recipe_flags(ingredient_rows, recipe_ids):
+    """Map each recipe id to its flags from (recipe_id, ingredient name) rows."""
+    flags = dict.fromkeys(recipe_ids, 0)
+    for recipe_id, name in ingredient_rows:
+        flags[recipe_id] = flags.get(recipe_id, 0) | ingredient_flags(name)
+    return flags
+
+
+def store_recipe_flags(recipe_model, flags):
+    # One UPDATE per distinct flag value rather than per recipe
+    by_value = defaultdict(list)
+    for recipe_id, value in flags.items():
+        by_value[value].append(recipe_id)
+    for value, recipe_ids in by_value.items():
+        for start in range(0, len(recipe_ids), UPDATE_BATCH_SIZE):
+            batch = recipe_ids[start:start + UPDATE_BATCH_SIZE]
+            recipe_model.objects.filter(pk__in=batch).exclude(allergen_flags=value).update(allergen_flags=value)
+
+
+def update_recipe_flags(recipe_ids):
+    """Recompute and store the allergen flags of the given recipes."""
+    recipe_ids = list(recipe_ids)
+    rows = Ingredient.objects.filter(recipe_id__in=recipe_ids).order_by().values_list('recipe_id', 'name')
+    store_recipe_flags(Recipe, compute_recipe_flags(rows, recipe_ids))
+
+
+def exclude_unsafe(queryset, mask):
+    if not mask:
+        return queryset
+    return queryset.alias(unsafe_flags=F('allergen_flags').bitand(mask)).filter(unsafe_flags=0)
@@ -0,0 +1,111 @@
+"""
+Versioned response cache for public recipe reads.
+
+Every cached response is keyed by its path, query string and a version
+counter: a global one for listings and one per recipe for detail views.
+Saving a recipe (or one of its ingredients, ratings or favorites) bumps the
+counters, so stale entries are never read again and simply expire.
+
+The storage is the Django cache configured as ``RECIPE_CACHE_ALIAS``
+(local memory, file or a shared Redis/Memcached server, see settings).
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+GLOBAL_VERSION_KEY = 'recipes:version'
+
+
+def get_cache():
+    return caches[getattr(settings, 'RECIPE_CACHE_ALIAS', 'default')]
+
+
+def recipe_version_key(recipe_id):
+    return f'recipes:version:{recipe_id}'
+
+
+def get_version(key):
+    cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so an evicted counter never reuses an old version.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key, time.time_ns())
+    return version
+
+
+def _bump(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def invalidate_recipe(recipe_id):
+    _bump(GLOBAL_VERSION_KEY)
+    if recipe_id is not None:
+        _bump(recipe_version_key(recipe_id))
+
+
+def invalidate_recipes(recipe_ids):
+    _bump(GLOBAL_VERSION_KEY)
+    for recipe_id in recipe_ids:
+        _bump(recipe_version_key(recipe_id))
+
+
+def compute_etag(data, media_type=''):
+    payload = json.dumps(data, sort_keys=True, default=str, separators=(',', ':'))
+    return '"%s"' % hashlib.sha1(f'{media_type}:{payload}'.encode('utf-8')).hexdigest()
+
+
+def etag_matches(request, etag):
+    header = request.headers.get('If-None-Match', '')
+    return header.strip() == '*' or etag in [tag.strip() for tag in header.split(',')]
+
+
+class CachedReadMixin:
+    """
+    Serves anonymous ``list``/``retrieve`` responses from the versioned
+    cache and answers ``If-None-Match`` revalidation with 304 for everyone.
+    """
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, GLOBAL_VERSION_KEY, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        key = recipe_version_key(kwargs.get(self.lookup_url_kwarg or self.lookup_field))
+        return self.cached_response(request, key, super().retrieve, *args, **kwargs)
+
+    def cached_response(self, request, version_key, handler, *args, **kwargs):
+        media_type = request.accepted_media_type or ''
+        if request.user.is_authenticated:
+            response = handler(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                return self.conditional_response(request, response.data, compute_etag(response.data, media_type))
+            return response
+
+        cache = get_cache()
+        raw_key = f'{request.path}?{sorted(request.query_params.lists())}|{media_type}|{get_version(version_key)}'
+        cache_key = 'recipes:response:' + hashlib.sha1(raw_key.encode('utf-8')).hexdigest()
+        cached = cache.get(cache_key)
+        if cached is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cached = {'data': response.data, 'etag': compute_etag(response.data, media_type)}
+            cache.set(cache_key, cached, getattr(settings, 'RECIPE_CACHE_TIMEOUT', 300))
+        return self.conditional_response(request, cached['data'], cached['etag'])
+
+    def conditional_response(self, request, data, etag):
+        if etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+        response['ETag'] = etag
+        response['Vary'] = 'Accept, Authorization, Cookie'
+        return response
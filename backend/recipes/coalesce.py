@@ -0,0 +1,122 @@
+"""
+Single-flight coalescing of identical AI calls.
+
+When many clients ask the same question at once (a popular recipe page
+asking for the same substitution), only the first call goes upstream and
+every concurrent caller receives its result.
+
+Within a process, callers with the same key wait on the leader's thread.
+Across processes the leader holds a row in AICallLock while it runs and
+publishes the result in the shared AI cache; callers in other processes
+see the row, poll for the result, and take over if the row disappears or
+expires without one (the leader failed or died).
+"""
+import datetime
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .ai_cache import ai_cache
+from .models import AICallLock
+
+# Published results only need to outlive the wait of the other callers
+RESULT_TIMEOUT = 30  # seconds
+MAX_POLL_INTERVAL = 0.5  # seconds
+
+
+def get_lock_timeout():
+    return getattr(settings, 'AI_COALESCE_TIMEOUT', 120)
+
+
+def acquire(key, owner):
+    now = timezone.now()
+    AICallLock.objects.filter(key=key, expires_at__lte=now).delete()
+    try:
+        with transaction.atomic():
+            AICallLock.objects.create(
+                key=key, owner=owner, expires_at=now + datetime.timedelta(seconds=get_lock_timeout()),
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+def release(key, owner):
+    AICallLock.objects.filter(key=key, owner=owner).delete()
+
+
+def is_locked(key):
+    return AICallLock.objects.filter(key=key, expires_at__gt=timezone.now()).exists()
+
+
+def _result_key(key):
+    return f'{key}:result'
+
+
+def call_across_processes(key, fn):
+    owner = uuid.uuid4().hex
+    deadline = time.monotonic() + get_lock_timeout()
+    while time.monotonic() < deadline:
+        if acquire(key, owner):
+            try:
+                result = fn()
+                ai_cache.shared.set(_result_key(key), {'value': result}, RESULT_TIMEOUT)
+                return result
+            finally:
+                release(key, owner)
+
+        delay = 0.05
+        while time.monotonic() < deadline:
+            time.sleep(delay)
+            delay = min(delay * 2, MAX_POLL_INTERVAL)
+            entry = ai_cache.shared.get(_result_key(key))
+            if entry is not None:
+                return entry['value']
+            if not is_locked(key):
+                break
+    # Waited the leader's whole lock timeout; make the call ourselves
+    return fn()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def do(self, key, fn):
+        """Run ``fn()`` unless an identical call is in flight; either way return its result."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = call_across_processes(key, fn)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+
+single_flight = SingleFlight()
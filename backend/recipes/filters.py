@@ -0,0 +1,51 @@
+import django_filters
+from rest_framework import filters
+
+from .allergens import exclude_unsafe, preference_mask
+from .labels import LABEL_FIELDS, filter_by_labels, parse_labels
+from .models import Profile, Recipe
+from .utils import parse_flag
+
+
+class RecipeFilter(django_filters.FilterSet):
+    """
+    ``?tags=`` and ``?dietary_labels=`` take comma separated labels. A recipe
+    must carry all of them unless ``?tags_match=any`` /
+    ``?dietary_labels_match=any`` is given.
+
+    ``?safe_for_me=1`` hides recipes containing anything the current user's
+    profile allergies or dietary restrictions rule out.
+    """
+    tags = django_filters.CharFilter(method='filter_labels')
+    dietary_labels = django_filters.CharFilter(method='filter_labels')
+    safe_for_me = django_filters.CharFilter(method='filter_safe_for_me')
+
+    class Meta:
+        model = Recipe
+        fields = ['author', 'category', 'tags', 'dietary_labels', 'safe_for_me']
+
+    def filter_labels(self, queryset, name, value):
+        match_all = self.data.get(f'{name}_match', 'all').lower() != 'any'
+        return filter_by_labels(queryset, LABEL_FIELDS[name], parse_labels(value), match_all)
+
+    def filter_safe_for_me(self, queryset, name, value):
+        user = getattr(self.request, 'user', None)
+        if not parse_flag(value) or not user or not user.is_authenticated:
+            return queryset
+        profile = Profile.objects.filter(user=user).first()
+        if profile is None:
+            return queryset
+        return exclude_unsafe(queryset, preference_mask(profile.dietary_restrictions, profile.allergies))
+
+
+class RecipeOrderingFilter(filters.OrderingFilter):
+    """OrderingFilter that also accepts public aliases for stored sort columns."""
+    ordering_aliases = {'trending': 'trending_score'}
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        resolved = []
+        for field in fields:
+            prefix = '-' if field.startswith('-') else ''
+            name = field.lstrip('-')
+            resolved.append(prefix + self.ordering_aliases.get(name, name))
+        return super().remove_invalid_fields(queryset, resolved, view, request)
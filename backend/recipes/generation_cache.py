@@ -0,0 +1,154 @@
+"""
+Near-duplicate cache for generated recipes, matched by the Jaccard
+similarity of canonical ingredient sets through MinHash/LSH.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+from django.conf import settings
+
+from .vocabulary import PANTRY_STAPLES, parse_ingredient_list
+
+BANDS = 16
+ROWS = 4
+PERMUTATIONS = BANDS * ROWS
+# Mersenne prime 2**31 - 1: a * x + b stays below 2**62, so uint64 never overflows
+PRIME = (1 << 31) - 1
+
+_random = np.random.RandomState(20240611)
+_A = _random.randint(1, PRIME, size=PERMUTATIONS, dtype=np.int64).astype(np.uint64)
+_B = _random.randint(0, PRIME, size=PERMUTATIONS, dtype=np.int64).astype(np.uint64)
+
+
+def canonical_ingredients(ingredients_text):
+    """The set of normalized ingredient phrases in the input, without pantry staples."""
+    return frozenset(parse_ingredient_list(ingredients_text)) - PANTRY_STAPLES
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def _token_hash(token):
+    digest = hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') % PRIME
+
+
+def minhash(ingredients):
+    """MinHash signature of a non-empty set of phrases, PERMUTATIONS values long."""
+    hashes = np.array([_token_hash(token) for token in ingredients], dtype=np.uint64)
+    return ((np.outer(hashes, _A) + _B) % PRIME).min(axis=0)
+
+
+def band_keys(signature):
+    return [(band, signature[band * ROWS:(band + 1) * ROWS].tobytes()) for band in range(BANDS)]
+
+
+class _Entry:
+    __slots__ = ('ingredients', 'bands', 'result', 'expires_at')
+
+    def __init__(self, ingredients, bands, result, expires_at):
+        self.ingredients = ingredients
+        self.bands = bands
+        self.result = result
+        self.expires_at = expires_at
+
+
+class LSHIndex:
+    """Recently generated recipes of one restriction profile."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # ingredient set -> _Entry, oldest first
+        self._buckets = defaultdict(set)  # band key -> ingredient sets
+
+    def _remove(self, ingredients):
+        entry = self._entries.pop(ingredients)
+        for key in entry.bands:
+            bucket = self._buckets[key]
+            bucket.discard(ingredients)
+            if not bucket:
+                del self._buckets[key]
+
+    def _expire(self, now):
+        while self._entries:
+            ingredients, entry = next(iter(self._entries.items()))
+            if entry.expires_at > now and len(self._entries) <= self.maxsize:
+                break
+            self._remove(ingredients)
+
+    def add(self, ingredients, result, expires_at):
+        if ingredients in self._entries:
+            self._remove(ingredients)
+        bands = band_keys(minhash(ingredients))
+        self._entries[ingredients] = _Entry(ingredients, bands, result, expires_at)
+        for key in bands:
+            self._buckets[key].add(ingredients)
+        self._expire(time.time())
+
+    def find(self, ingredients, threshold):
+        """
+        Return (result, similarity) of the most similar entry at or above
+        ``threshold`` whose ingredients are all in ``ingredients``, else None.
+        """
+        self._expire(time.time())
+        entry = self._entries.get(ingredients)
+        if entry is not None:
+            return entry.result, 1.0
+        candidates = set()
+        for key in band_keys(minhash(ingredients)):
+            candidates |= self._buckets.get(key, set())
+        best = None
+        for candidate in candidates:
+            if not candidate <= ingredients:
+                continue
+            similarity = jaccard(ingredients, candidate)
+            if similarity >= threshold and (best is None or similarity > best[1]):
+                best = (self._entries[candidate].result, similarity)
+        return best
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class GenerationCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles = {}
+
+    def _index(self, profile):
+        index = self._profiles.get(profile)
+        if index is None:
+            index = self._profiles[profile] = LSHIndex(getattr(settings, 'GENERATION_CACHE_SIZE', 256))
+        return index
+
+    def get(self, ingredients, profile):
+        """(recipe, similarity) of a cached generation close enough to ``ingredients``, or None."""
+        if not ingredients:
+            return None
+        threshold = getattr(settings, 'GENERATION_CACHE_SIMILARITY', 0.8)
+        with self._lock:
+            index = self._profiles.get(profile)
+            if index is None:
+                return None
+            match = index.find(ingredients, threshold)
+            if not len(index):
+                del self._profiles[profile]
+            return match
+
+    def add(self, ingredients, profile, recipe):
+        if not ingredients:
+            return
+        expires_at = time.time() + getattr(settings, 'GENERATION_CACHE_TIMEOUT', 24 * 3600)
+        with self._lock:
+            self._index(profile).add(ingredients, recipe, expires_at)
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+
+
+generation_cache = GenerationCache()
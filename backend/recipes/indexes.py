@@ -0,0 +1,76 @@
+"""
+Base class for the in-process indexes built from the catalog (pantry, similarity).
+"""
+import threading
+import time
+
+from django.db import connections
+
+
+class RebuildingIndex:
+    """
+    Writes mark recipes dirty via signals. The first build runs in the
+    request that needs it; later rebuilds run in a background thread while
+    lookups keep using the current data.
+
+    Subclasses implement ``load()``, which reads the catalog without holding
+    any lock, ``install(data)``, which swaps the loaded data in under
+    ``_lock``, and ``is_stale(built_at)``.
+    """
+    thread_name = 'index-rebuild'
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._rebuild_lock = threading.Lock()
+        self._dirty = set()
+        self._built_at = None
+
+    def mark_dirty(self, recipe_ids):
+        with self._lock:
+            self._dirty.update(recipe_ids)
+
+    def load(self):
+        raise NotImplementedError
+
+    def install(self, data):
+        raise NotImplementedError
+
+    def is_stale(self, built_at):
+        raise NotImplementedError
+
+    def refresh_dirty(self):
+        """Called under ``_lock`` before each lookup while no rebuild is running."""
+
+    @property
+    def rebuilding(self):
+        return self._rebuild_lock.locked()
+
+    def rebuild(self):
+        with self._lock:
+            # Marks made while the catalog is loading stay dirty
+            dirty = set(self._dirty)
+        data = self.load()
+        with self._lock:
+            self.install(data)
+            self._dirty -= dirty
+            self._built_at = time.monotonic()
+
+    def refresh(self):
+        with self._lock:
+            built_at = self._built_at
+            if built_at is not None and not self.rebuilding:
+                self.refresh_dirty()
+            stale = built_at is not None and self.is_stale(built_at)
+        if built_at is None:
+            with self._rebuild_lock:
+                if self._built_at is None:
+                    self.rebuild()
+        elif stale and self._rebuild_lock.acquire(blocking=False):
+            threading.Thread(target=self._rebuild_in_background, name=self.thread_name, daemon=True).start()
+
+    def _rebuild_in_background(self):
+        try:
+            self.rebuild()
+        finally:
+            self._rebuild_lock.release()
+            connections.close_all()
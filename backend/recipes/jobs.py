@@ -0,0 +1,147 @@
+"""
+Asynchronous recipe generation. GenerationJob rows are the queue; jobs are
+claimed with a conditional UPDATE, so any process can work them at most once.
+"""
+import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .ai_utils import generate_recipe_with_cache
+from .models import GenerationJob
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'GENERATION_WORKERS', 4),
+                thread_name_prefix='generate-recipe',
+            )
+        return _executor
+
+
+def backlog():
+    """Queued and running jobs, not counting those left behind by a dead worker."""
+    cutoff = timezone.now() - datetime.timedelta(seconds=getattr(settings, 'GENERATION_JOB_TIMEOUT', 300))
+    return GenerationJob.objects.filter(
+        Q(status=GenerationJob.PENDING, created_at__gte=cutoff) | Q(status=GenerationJob.RUNNING, started_at__gte=cutoff)
+    ).count()
+
+
+def enqueue_generation(user, ingredients, restrictions='', allergies='', fresh=False):
+    if not isinstance(ingredients, str) or not ingredients.strip():
+        raise ValueError("ingredients must be a non-empty string")
+    job = GenerationJob.objects.create(
+        user=user,
+        params={'ingredients': ingredients, 'restrictions': restrictions, 'allergies': allergies, 'fresh': fresh},
+    )
+    transaction.on_commit(lambda: get_executor().submit(run_job, job.pk))
+    maybe_sweep()
+    return job
+
+
+def claim(job_id):
+    updated = GenerationJob.objects.filter(pk=job_id, status=GenerationJob.PENDING).update(
+        status=GenerationJob.RUNNING, started_at=timezone.now(),
+    )
+    return updated == 1
+
+
+def claim_next():
+    """Claim the oldest pending job. Returns its id, or None if the queue is empty."""
+    while True:
+        job_id = (
+            GenerationJob.objects.filter(status=GenerationJob.PENDING)
+            .order_by('created_at').values_list('pk', flat=True).first()
+        )
+        if job_id is None or claim(job_id):
+            return job_id
+
+
+def requeue_stale_jobs(timeout=None):
+    """Put jobs whose worker died mid-run back in the queue."""
+    timeout = timeout or getattr(settings, 'GENERATION_JOB_TIMEOUT', 300)
+    cutoff = timezone.now() - datetime.timedelta(seconds=timeout)
+    return GenerationJob.objects.filter(status=GenerationJob.RUNNING, started_at__lt=cutoff).update(
+        status=GenerationJob.PENDING, started_at=None,
+    )
+
+
+def purge_finished_jobs(retention=None):
+    """Delete succeeded and failed jobs created more than ``retention`` seconds ago."""
+    retention = retention or getattr(settings, 'GENERATION_JOB_RETENTION', 7 * 24 * 3600)
+    cutoff = timezone.now() - datetime.timedelta(seconds=retention)
+    deleted, _ = GenerationJob.objects.filter(
+        status__in=[GenerationJob.SUCCEEDED, GenerationJob.FAILED], created_at__lt=cutoff,
+    ).delete()
+    return deleted
+
+
+def sweep():
+    """Recover jobs lost by restarted processes and delete old finished ones."""
+    try:
+        requeue_stale_jobs()
+        cutoff = timezone.now() - datetime.timedelta(seconds=getattr(settings, 'GENERATION_SWEEP_INTERVAL', 60))
+        orphans = (
+            GenerationJob.objects.filter(status=GenerationJob.PENDING, created_at__lt=cutoff)
+            .order_by('created_at').values_list('pk', flat=True)[:getattr(settings, 'GENERATION_WORKERS', 4)]
+        )
+        for job_id in orphans:
+            # run_job claims the job first, so one still queued elsewhere runs only once
+            get_executor().submit(run_job, job_id)
+        purge_finished_jobs()
+    finally:
+        connections.close_all()
+
+
+_last_sweep = None
+_sweep_lock = threading.Lock()
+
+
+def maybe_sweep():
+    """Schedule a sweep on the pool unless this process ran one in the last GENERATION_SWEEP_INTERVAL seconds."""
+    global _last_sweep
+    with _sweep_lock:
+        now = time.monotonic()
+        if _last_sweep is not None and now - _last_sweep < getattr(settings, 'GENERATION_SWEEP_INTERVAL', 60):
+            return
+        _last_sweep = now
+    get_executor().submit(sweep)
+
+
+def finish(job_id, status, result=None, error=''):
+    GenerationJob.objects.filter(pk=job_id).update(
+        status=status, result=result, error=error, finished_at=timezone.now(),
+    )
+
+
+def run_job(job_id, claimed=False):
+    try:
+        if not claimed and not claim(job_id):
+            return
+        params = GenerationJob.objects.values_list('params', flat=True).get(pk=job_id)
+        try:
+            recipe_data, _ = generate_recipe_with_cache(
+                params['ingredients'], params.get('restrictions', ''), params.get('allergies', ''),
+                fresh=params.get('fresh', False),
+            )
+        except Exception as e:
+            finish(job_id, GenerationJob.FAILED, error=str(e))
+            return
+        if "error" in recipe_data:
+            finish(job_id, GenerationJob.FAILED, result=recipe_data, error=recipe_data["error"])
+        else:
+            finish(job_id, GenerationJob.SUCCEEDED, result=recipe_data)
+    finally:
+        # Pool threads are long-lived; do not keep a connection open per thread
+        connections.close_all()
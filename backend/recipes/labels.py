@@ -0,0 +1,63 @@
+"""
+Keeps the RecipeLabel table in sync with Recipe.tags / Recipe.dietary_labels
+and filters recipes through it.
+"""
+import re
+
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Recipe, RecipeLabel
+
+LABEL_FIELDS = {
+    'tags': RecipeLabel.TAG,
+    'dietary_labels': RecipeLabel.DIETARY,
+}
+
+
+def normalize_label(value):
+    """'Gluten Free', 'gluten_free' and 'Gluten-Free' all become 'gluten-free'."""
+    return re.sub(r'[\s_-]+', '-', str(value).strip().lower()).strip('-')
+
+
+def parse_labels(value):
+    labels = []
+    for item in value.split(','):
+        label = normalize_label(item)
+        if label and label not in labels:
+            labels.append(label)
+    return labels
+
+
+def build_labels(recipe_id, tags, dietary_labels):
+    rows = {}
+    for kind, values in ((RecipeLabel.TAG, tags), (RecipeLabel.DIETARY, dietary_labels)):
+        for value in values if isinstance(values, list) else []:
+            label = normalize_label(value)[:100]
+            if label:
+                rows[(kind, label)] = RecipeLabel(recipe_id=recipe_id, kind=kind, value=label)
+    return list(rows.values())
+
+
+def sync_recipe_labels(recipe_ids):
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    recipes = Recipe.objects.filter(pk__in=recipe_ids).values_list('pk', 'tags', 'dietary_labels')
+    rows = [row for recipe in recipes for row in build_labels(*recipe)]
+    with transaction.atomic():
+        RecipeLabel.objects.filter(recipe_id__in=recipe_ids).delete()
+        RecipeLabel.objects.bulk_create(rows)
+
+
+def filter_by_labels(queryset, kind, labels, match_all=True):
+    """
+    Restrict ``queryset`` to recipes carrying all (AND) or any (OR) of
+    ``labels``, resolved with a single lookup on the label index.
+    """
+    if not labels:
+        return queryset
+    matches = RecipeLabel.objects.filter(kind=kind, value__in=labels).order_by()
+    if match_all:
+        matches = matches.values('recipe_id').annotate(matched=Count('pk')).filter(matched=len(labels))
+    return queryset.filter(pk__in=matches.values('recipe_id'))
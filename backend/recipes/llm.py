@@ -0,0 +1,344 @@
+"""
+Pluggable LLM providers.
+
+ai_utils talks to the model through ``get_provider()`` instead of a client
+built at import time. LLM_PROVIDER selects the backend:
+
+- ``groq``: the Groq API (GROQ_API_KEY). The client is created on first use.
+- ``fake``: a local stand-in that sleeps for LLM_FAKE_LATENCY seconds, fails
+  LLM_FAKE_ERROR_RATE of the calls and answers with canned JSON. Use it to
+  load-test and benchmark the AI endpoints offline (see the benchmark_ai
+  command).
+
+``build_provider`` wraps either one in a ResilientProvider, which gives
+every call a deadline, retries transient failures with jittered backoff
+and stops calling a failing provider for a while (see resilience.py).
+"""
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+from .resilience import CircuitBreaker, Deadline, backoff_delay
+
+Completion = namedtuple('Completion', ['text', 'model', 'prompt_tokens', 'completion_tokens'])
+
+
+class LLMError(Exception):
+    """A provider call failed."""
+
+
+class LLMTimeout(LLMError):
+    """A provider call did not answer within its timeout."""
+
+
+class LLMProvider:
+    name = None
+
+    def complete(self, messages, model, json_mode=False, temperature=None, timeout=None):
+        """Return the Completion of a chat conversation."""
+        raise NotImplementedError
+
+    def stream(self, messages, model, temperature=None, timeout=None):
+        """Yield the text of a chat completion in pieces as it is generated."""
+        raise NotImplementedError
+
+    def is_transient(self, error):
+        """Whether a failed call is worth retrying."""
+        return isinstance(error, LLMTimeout)
+
+    def retry_after(self, error):
+        """Seconds the provider asked us to wait before retrying, if it said."""
+        return None
+
+    def check_available(self):
+        """Raise CircuitOpenError if calls are currently refused."""
+
+
+class GroqProvider(LLMProvider):
+    name = 'groq'
+
+    def __init__(self, api_key=None):
+        self.api_key = api_key
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                import httpx
+                from groq import DefaultHttpxClient, Groq
+                # One pooled client per process: connections are kept alive
+                # between calls instead of paying a TLS handshake each time
+                http_client = DefaultHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=getattr(settings, 'LLM_POOL_CONNECTIONS', 20),
+                        max_keepalive_connections=getattr(settings, 'LLM_POOL_KEEPALIVE', 10),
+                        keepalive_expiry=getattr(settings, 'LLM_POOL_KEEPALIVE_EXPIRY', 60),
+                    ),
+                )
+                # Retries and timeouts are handled by ResilientProvider
+                self._client = Groq(
+                    api_key=self.api_key or os.getenv("GROQ_API_KEY"),
+                    http_client=http_client,
+                    max_retries=0,
+                    timeout=self._timeout(getattr(settings, 'LLM_TIMEOUT', 30)),
+                )
+            return self._client
+
+    def _timeout(self, timeout):
+        import httpx
+        return httpx.Timeout(timeout, connect=min(getattr(settings, 'LLM_CONNECT_TIMEOUT', 5), timeout))
+
+    def _options(self, temperature, timeout):
+        options = {} if temperature is None else {'temperature': temperature}
+        if timeout is not None:
+            options['timeout'] = self._timeout(timeout)
+        return options
+
+    def complete(self, messages, model, json_mode=False, temperature=None, timeout=None):
+        options = self._options(temperature, timeout)
+        if json_mode:
+            options['response_format'] = {"type": "json_object"}
+        chat_completion = self.client.chat.completions.create(messages=messages, model=model, **options)
+        usage = chat_completion.usage
+        return Completion(
+            chat_completion.choices[0].message.content,
+            chat_completion.model or model,
+            usage.prompt_tokens if usage else None,
+            usage.completion_tokens if usage else None,
+        )
+
+    def stream(self, messages, model, temperature=None, timeout=None):
+        stream = self.client.chat.completions.create(
+            messages=messages, model=model, stream=True, **self._options(temperature, timeout),
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def is_transient(self, error):
+        import groq
+        if isinstance(error, groq.APIConnectionError):  # includes APITimeoutError
+            return True
+        return isinstance(error, groq.APIStatusError) and (
+            error.status_code in (408, 409, 429) or error.status_code >= 500
+        )
+
+    def retry_after(self, error):
+        response = getattr(error, 'response', None)
+        try:
+            return float(response.headers['retry-after'])
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return None
+
+
+FAKE_SUBSTITUTE = {
+    "alternatives": [
+        {"name": "Olive oil", "reason": "Neutral fat that works in most savory dishes.", "texture_impact": "Slightly softer"},
+        {"name": "Coconut oil", "reason": "Solid at room temperature like butter.", "texture_impact": "Similar"},
+        {"name": "Applesauce", "reason": "Adds moisture in baking with less fat.", "texture_impact": "Denser, moister"},
+    ],
+}
+
+FAKE_RECIPE = {
+    "title": "Test Kitchen Frittata",
+    "description": "A quick frittata generated by the fake LLM provider.",
+    "ingredients": [
+        {"name": "eggs", "amount": "6", "unit": ""},
+        {"name": "spinach", "amount": "2", "unit": "cups"},
+        {"name": "feta", "amount": "100", "unit": "g"},
+    ],
+    "instructions": [
+        "Heat the oven to 200C.",
+        "Whisk the eggs with a pinch of salt.",
+        "Wilt the spinach in an oven-safe pan.",
+        "Pour in the eggs, crumble the feta on top and bake for 15 minutes.",
+    ],
+    "prep_time": 10,
+    "cook_time": 15,
+    "servings": 4,
+    "category": "Healthy",
+}
+
+
+class FakeProvider(LLMProvider):
+    """
+    Answers after ``latency`` seconds (+/- ``jitter``) with canned JSON: the
+    substitution answer when the prompt asks for alternatives, a recipe
+    otherwise. ``responses`` overrides them ({"substitute": ..., "recipe": ...}).
+    """
+    name = 'fake'
+
+    def __init__(self, latency=0.5, jitter=0.0, error_rate=0.0, responses=None, stream_chunk_size=16):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.responses = {'substitute': FAKE_SUBSTITUTE, 'recipe': FAKE_RECIPE, **(responses or {})}
+        self.stream_chunk_size = stream_chunk_size
+
+    def _answer(self, messages):
+        prompt = ' '.join(message.get('content', '') for message in messages)
+        if 'keyed by the item number' in prompt:
+            # Batch substitution: one canned answer per numbered ingredient
+            count = len(re.findall(r'^\s*\d+\. ', prompt, flags=re.MULTILINE))
+            answer = self.responses['substitute']
+            answer = json.loads(answer) if isinstance(answer, str) else answer
+            return json.dumps({str(number): answer for number in range(1, count + 1)})
+        kind = 'substitute' if 'alternatives' in prompt else 'recipe'
+        answer = self.responses[kind]
+        return answer if isinstance(answer, str) else json.dumps(answer)
+
+    def _delay(self):
+        return max(self.latency + random.uniform(-self.jitter, self.jitter), 0)
+
+    def _maybe_fail(self):
+        if self.error_rate and random.random() < self.error_rate:
+            raise LLMError("Fake provider error")
+
+    def _wait(self, delay, timeout):
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise LLMTimeout("Fake provider timed out")
+        time.sleep(delay)
+
+    def is_transient(self, error):
+        # Injected errors stand in for provider outages
+        return isinstance(error, LLMError)
+
+    def complete(self, messages, model, json_mode=False, temperature=None, timeout=None):
+        self._wait(self._delay(), timeout)
+        self._maybe_fail()
+        text = self._answer(messages)
+        prompt_tokens = sum(len(message.get('content', '')) for message in messages) // 4
+        return Completion(text, model, prompt_tokens, len(text) // 4)
+
+    def stream(self, messages, model, temperature=None, timeout=None):
+        text = self._answer(messages)
+        chunks = [text[i:i + self.stream_chunk_size] for i in range(0, len(text), self.stream_chunk_size)]
+        pause = self._delay() / max(len(chunks), 1)
+        self._maybe_fail()
+        for chunk in chunks:
+            # Like an HTTP read timeout, the limit applies to each wait for data
+            self._wait(pause, timeout)
+            yield chunk
+
+
+class ResilientProvider(LLMProvider):
+    """
+    Wraps a provider with a per-call deadline, bounded jittered retries of
+    transient failures and a circuit breaker.
+    """
+
+    def __init__(self, provider, timeout=None, max_retries=None, breaker=None):
+        self.provider = provider
+        self.name = provider.name
+        self.timeout = timeout if timeout is not None else getattr(settings, 'LLM_TIMEOUT', 30)
+        self.max_retries = max_retries if max_retries is not None else getattr(settings, 'LLM_MAX_RETRIES', 2)
+        self.breaker = breaker or CircuitBreaker()
+
+    def check_available(self):
+        self.breaker.check()
+
+    def _retry_delay(self, error, attempt, deadline):
+        """Seconds to sleep before the next attempt, or None if it should not be made."""
+        if attempt >= self.max_retries or not self.provider.is_transient(error):
+            return None
+        delay = max(backoff_delay(attempt), self.provider.retry_after(error) or 0)
+        return delay if delay < deadline.remaining() else None
+
+    def complete(self, messages, model, json_mode=False, temperature=None, timeout=None):
+        deadline = Deadline(timeout or self.timeout)
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                completion = self.provider.complete(
+                    messages, model, json_mode=json_mode, temperature=temperature, timeout=deadline.remaining(),
+                )
+            except Exception as e:
+                self.breaker.record(self.provider.is_transient(e))
+                delay = self._retry_delay(e, attempt, deadline)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.breaker.record(False)
+            return completion
+
+    def stream(self, messages, model, temperature=None, timeout=None):
+        # Only failures before the first chunk are retried: once text has
+        # been handed on, a retry would repeat it
+        deadline = Deadline(timeout or self.timeout)
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            started = False
+            failed = False
+            try:
+                for chunk in self.provider.stream(
+                    messages, model, temperature=temperature, timeout=deadline.remaining(),
+                ):
+                    started = True
+                    yield chunk
+            except Exception as e:
+                failed = self.provider.is_transient(e)
+                delay = None if started else self._retry_delay(e, attempt, deadline)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            finally:
+                # Also reached when the client disconnects mid-stream
+                self.breaker.record(failed)
+            return
+
+
+def build_provider(name=None, **options):
+    """The provider called ``name`` (default LLM_PROVIDER) wrapped in a ResilientProvider."""
+    return ResilientProvider(_build_provider(name, **options))
+
+
+def _build_provider(name=None, **options):
+    name = name or getattr(settings, 'LLM_PROVIDER', 'groq')
+    if name == 'groq':
+        return GroqProvider(**options)
+    if name == 'fake':
+        defaults = {
+            'latency': getattr(settings, 'LLM_FAKE_LATENCY', 0.5),
+            'error_rate': getattr(settings, 'LLM_FAKE_ERROR_RATE', 0.0),
+        }
+        responses_file = getattr(settings, 'LLM_FAKE_RESPONSES_FILE', '')
+        if responses_file:
+            with open(responses_file) as f:
+                defaults['responses'] = json.load(f)
+        return FakeProvider(**{**defaults, **options})
+    raise ValueError(f"Unknown LLM provider: {name}")
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = build_provider()
+        return _provider
+
+
+def set_provider(provider):
+    """Replace the process-wide provider (benchmarks, tests). Returns the previous one."""
+    global _provider
+    with _provider_lock:
+        previous, _provider = _provider, provider
+        return previous
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from recipes.models import Ingredient
+from recipes.units import backfill_quantities
+from recipes.cache import invalidate_recipes
+
+
+class Command(BaseCommand):
+    help = 'Parses the amount and unit of every ingredient into numeric quantities in canonical units'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        recipe_ids = backfill_quantities(Ingredient, batch_size=options['batch_size'])
+        invalidate_recipes(recipe_ids)
+        self.stdout.write(self.style.SUCCESS(f'Updated ingredient quantities of {len(recipe_ids)} recipes.'))
@@ -0,0 +1,121 @@
+import logging
+import string
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from recipes.llm import build_provider, set_provider
+
+ENDPOINTS = {
+    'substitute': '/api/recipes/substitute/',
+    'generate_recipe': '/api/generate-recipe/',
+}
+
+
+def word(number):
+    # Ingredient names are normalized to letters only, so inputs are told apart by letters
+    letters = ''
+    while True:
+        number, digit = divmod(number, 26)
+        letters = string.ascii_lowercase[digit] + letters
+        if not number:
+            return letters
+
+
+class Command(BaseCommand):
+    help = (
+        'Drives the substitute and generate-recipe endpoints in-process at a given concurrency '
+        'and reports throughput and latency percentiles'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', choices=[*ENDPOINTS, 'all'], default='all')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=100, help='Requests per endpoint')
+        parser.add_argument(
+            '--distinct', type=int, default=0,
+            help='Number of distinct inputs to cycle through (0: every request is distinct, so nothing is cached)',
+        )
+        parser.add_argument('--provider', choices=['fake', 'groq', 'settings'], default='fake')
+        parser.add_argument('--latency', type=float, default=None, help='Fake provider latency in seconds')
+        parser.add_argument('--error-rate', type=float, default=None, help='Fake provider error rate (0..1)')
+        parser.add_argument('--username', default='benchmark')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError('--concurrency and --requests must be positive')
+
+        provider_options = {}
+        if options['latency'] is not None:
+            provider_options['latency'] = options['latency']
+        if options['error_rate'] is not None:
+            provider_options['error_rate'] = options['error_rate']
+        previous = None
+        if options['provider'] != 'settings':
+            previous = set_provider(build_provider(options['provider'], **provider_options))
+
+        user, _ = User.objects.get_or_create(username=options['username'])
+        endpoints = list(ENDPOINTS) if options['endpoint'] == 'all' else [options['endpoint']]
+        # Fresh inputs per run so answers cached by earlier runs are not reused
+        run_id = word(uuid.uuid4().int % 26 ** 8)
+        # Injected provider errors would otherwise log a traceback per request
+        request_logger = logging.getLogger('django.request')
+        log_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        # Answers cached during the run stay out of the persistent AI cache
+        ai_cache_settings = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark-ai'}
+        try:
+            with override_settings(CACHES={**settings.CACHES, settings.AI_CACHE_ALIAS: ai_cache_settings}):
+                for endpoint in endpoints:
+                    self.report(endpoint, self.run(endpoint, user, run_id, options), options)
+        finally:
+            request_logger.setLevel(log_level)
+            if options['provider'] != 'settings':
+                set_provider(previous)
+
+    def payload(self, endpoint, index, run_id, distinct):
+        item = word(index % distinct if distinct else index)
+        if endpoint == 'substitute':
+            return {'ingredient': f'butter {run_id} {item}', 'restrictions': 'vegan'}
+        return {'ingredients': f'eggs, spinach, feta, item {run_id} {item}'}
+
+    def run(self, endpoint, user, run_id, options):
+        local = threading.local()
+
+        def request(index):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = APIClient(SERVER_NAME='localhost')
+                client.force_authenticate(user)
+            data = self.payload(endpoint, index, run_id, options['distinct'])
+            start = time.perf_counter()
+            response = client.post(ENDPOINTS[endpoint], data, format='json')
+            return time.perf_counter() - start, response.status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(executor.map(request, range(options['requests'])))
+        return time.perf_counter() - started, results
+
+    def report(self, endpoint, run, options):
+        elapsed, results = run
+        latencies = np.array([latency for latency, _ in results]) * 1000
+        statuses = Counter(status for _, status in results)
+        p50, p90, p95, p99 = np.percentile(latencies, [50, 90, 95, 99])
+        self.stdout.write(self.style.SUCCESS(
+            f"{endpoint}: {len(results)} requests, concurrency {options['concurrency']}, "
+            f"{len(results) / elapsed:.1f} req/s"
+        ))
+        self.stdout.write(
+            f"  latency ms  p50 {p50:.1f}  p90 {p90:.1f}  p95 {p95:.1f}  p99 {p99:.1f}  max {latencies.max():.1f}"
+        )
+        self.stdout.write('  status  ' + '  '.join(f'{code}: {count}' for code, count in sorted(statuses.items())))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from recipes.recommendations import build_model, save_model
+
+
+class Command(BaseCommand):
+    help = 'Builds the item-item recommendation model from favorites and ratings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--neighbors', type=int, default=20, help='Neighbours kept per recipe')
+        parser.add_argument('--min-similarity', type=float, default=0.0)
+
+    def handle(self, *args, **options):
+        model = build_model(neighbors=options['neighbors'], min_similarity=options['min_similarity'])
+        if model is None:
+            self.stdout.write(self.style.WARNING('No favorites or ratings yet, nothing to build.'))
+            return
+        path = save_model(model)
+        self.stdout.write(self.style.SUCCESS(f"Built recommendations for {len(model['recipe_ids'])} recipes in {path}"))
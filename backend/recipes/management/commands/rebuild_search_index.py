@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from recipes import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index for all recipes'
+
+    def handle(self, *args, **kwargs):
+        if not search.is_supported():
+            self.stdout.write(self.style.WARNING('Full-text search is not supported on this database backend.'))
+            return
+        search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from recipes.models import Recipe
+from recipes.allergens import update_recipe_flags
+from recipes.cache import invalidate_recipes
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the allergen flags of every recipe from its ingredients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        recipe_ids = list(Recipe.objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(recipe_ids), batch_size):
+            batch = recipe_ids[start:start + batch_size]
+            update_recipe_flags(batch)
+            invalidate_recipes(batch)
+        self.stdout.write(self.style.SUCCESS(f'Recomputed allergen flags for {len(recipe_ids)} recipes.'))
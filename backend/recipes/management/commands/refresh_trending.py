@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from recipes.trending import refresh_trending
+
+
+class Command(BaseCommand):
+    help = 'Decays the stored trending scores and adds favorites and ratings recorded since the last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Recompute every score from the events in TRENDING_WINDOW, picking up removed favorites',
+        )
+
+    def handle(self, *args, **options):
+        updated = refresh_trending(full=options['full'])
+        mode = 'Recomputed' if options['full'] else 'Refreshed'
+        self.stdout.write(self.style.SUCCESS(f'{mode} trending scores ({updated} recipes with new activity).'))
@@ -0,0 +1,35 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from recipes.jobs import claim_next, purge_finished_jobs, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Runs pending AI recipe generation jobs from the job table with a bounded pool of threads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+        processed = 0
+        running = set()
+        purge_finished_jobs()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='generate-recipe') as executor:
+            while True:
+                running = {future for future in running if not future.done()}
+                job_id = None
+                if len(running) < workers:
+                    requeue_stale_jobs()
+                    job_id = claim_next()
+                if job_id is not None:
+                    running.add(executor.submit(run_job, job_id, claimed=True))
+                    processed += 1
+                    continue
+                if options['once'] and not running:
+                    break
+                time.sleep(options['poll_interval'])
+        self.stdout.write(self.style.SUCCESS(f'Ran {processed} generation jobs.'))
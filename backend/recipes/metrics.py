@@ -0,0 +1,178 @@
+"""
+LLM call and HTTP request histograms, rendered in the Prometheus text format.
+"""
+import bisect
+import json
+import threading
+import time
+
+from .llm import LLMTimeout
+from .resilience import CircuitOpenError
+
+OK = 'ok'
+JSON_ERROR = 'json_error'
+TIMEOUT = 'timeout'
+CIRCUIT_OPEN = 'circuit_open'
+CANCELLED = 'cancelled'
+ERROR = 'error'
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(float(bound) for bound in buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # label values -> [counts per bucket + overflow, sum]
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((key, list(counts), total) for key, (counts, total) in self._series.items())
+        for key, counts, total in series:
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                le = bound if bound == '+Inf' else _format_number(bound)
+                lines.append(f'{self.name}_bucket{_format_labels(labels + [("le", le)])} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {_format_number(total)}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {cumulative}')
+        return '\n'.join(lines)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        return ''.join(metric.render() + '\n' for metric in self.metrics)
+
+    def clear(self):
+        for metric in self.metrics:
+            metric.clear()
+
+
+registry = Registry()
+
+llm_duration = registry.register(Histogram(
+    'llm_request_duration_seconds', 'Wall time of LLM calls, retries included.',
+    ['operation', 'model', 'outcome'], LATENCY_BUCKETS,
+))
+llm_time_to_first_byte = registry.register(Histogram(
+    'llm_time_to_first_byte_seconds', 'Time until the first part of an LLM answer arrived.',
+    ['operation', 'model'], LATENCY_BUCKETS,
+))
+llm_prompt_tokens = registry.register(Histogram(
+    'llm_prompt_tokens', 'Prompt tokens per LLM call.', ['operation', 'model'], TOKEN_BUCKETS,
+))
+llm_completion_tokens = registry.register(Histogram(
+    'llm_completion_tokens', 'Completion tokens per LLM call.', ['operation', 'model'], TOKEN_BUCKETS,
+))
+
+http_request_duration = registry.register(Histogram(
+    'http_request_duration_seconds', 'Wall time of HTTP requests in the Django process.',
+    ['view', 'method', 'status'], LATENCY_BUCKETS,
+))
+
+
+def outcome_of(error):
+    if isinstance(error, CircuitOpenError):
+        return CIRCUIT_OPEN
+    if isinstance(error, GeneratorExit):
+        return CANCELLED
+    if isinstance(error, ValueError):  # json.JSONDecodeError included
+        return JSON_ERROR
+    if isinstance(error, (LLMTimeout, TimeoutError)) or 'Timeout' in type(error).__name__:
+        return TIMEOUT
+    return ERROR
+
+
+class LLMCall:
+    """
+    Times one model call. Use as a context manager around the call and the
+    parsing of its answer; an exception leaving the block sets the outcome.
+    """
+
+    def __init__(self, operation, model):
+        self.operation = operation
+        self.model = model
+        self.outcome = OK
+        self.prompt_tokens = None
+        self.completion_tokens = None
+        self._started = None
+        self._first_byte = None
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.outcome = outcome_of(exc)
+        self.record(time.perf_counter())
+        return False
+
+    def received(self):
+        """Mark the arrival of (the first part of) the answer."""
+        if self._first_byte is None:
+            self._first_byte = time.perf_counter()
+
+    def completed(self, completion):
+        self.received()
+        self.model = completion.model or self.model
+        self.prompt_tokens = completion.prompt_tokens
+        self.completion_tokens = completion.completion_tokens
+
+    def check_json(self, text):
+        """Set the json_error outcome if ``text`` is not valid JSON."""
+        try:
+            json.loads(text)
+        except ValueError:
+            self.outcome = JSON_ERROR
+
+    def record(self, finished):
+        labels = {'operation': self.operation, 'model': self.model}
+        llm_duration.observe(finished - self._started, outcome=self.outcome, **labels)
+        if self._first_byte is not None:
+            llm_time_to_first_byte.observe(self._first_byte - self._started, **labels)
+        if self.prompt_tokens is not None:
+            llm_prompt_tokens.observe(self.prompt_tokens, **labels)
+        if self.completion_tokens is not None:
+            llm_completion_tokens.observe(self.completion_tokens, **labels)
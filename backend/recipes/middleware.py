@@ -0,0 +1,21 @@
+import time
+
+from .metrics import http_request_duration
+
+
+class RequestMetricsMiddleware:
+    """Observes the duration of every request in http_request_duration_seconds."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        # The URL name, not the path, so ids do not create a series each
+        view = match.view_name if match is not None else 'unmatched'
+        http_request_duration.observe(
+            time.perf_counter() - started, view=view, method=request.method, status=response.status_code,
+        )
+        return response
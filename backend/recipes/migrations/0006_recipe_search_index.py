@@ -0,0 +1,68 @@
+from django.db import migrations
+
+# A copy of recipes.search as of this migration, so later changes there do
+# not rewrite history
+FTS_TABLE = 'recipes_recipe_fts'
+
+SQLITE_CREATE_SQL = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE}
+USING fts5(title, description, tags, ingredients, tokenize='porter unicode61')
+"""
+
+SQLITE_INDEX_SQL = f"""
+INSERT INTO {FTS_TABLE} (rowid, title, description, tags, ingredients)
+SELECT r.id, r.title, r.description, r.tags,
+       COALESCE((SELECT group_concat(i.name, ' ') FROM recipes_ingredient i WHERE i.recipe_id = r.id), '')
+FROM recipes_recipe r
+"""
+
+POSTGRES_CREATE_SQL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {FTS_TABLE} (
+        recipe_id bigint PRIMARY KEY REFERENCES recipes_recipe (id) ON DELETE CASCADE,
+        document tsvector NOT NULL
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS {FTS_TABLE}_document_idx ON {FTS_TABLE} USING GIN (document)",
+]
+
+POSTGRES_INDEX_SQL = f"""
+INSERT INTO {FTS_TABLE} (recipe_id, document)
+SELECT r.id,
+       setweight(to_tsvector('english', r.title), 'A') ||
+       setweight(to_tsvector('english', r.tags::text), 'B') ||
+       setweight(to_tsvector('english', COALESCE(
+           (SELECT string_agg(i.name, ' ') FROM recipes_ingredient i WHERE i.recipe_id = r.id), ''
+       )), 'B') ||
+       setweight(to_tsvector('english', r.description), 'C')
+FROM recipes_recipe r
+ON CONFLICT (recipe_id) DO UPDATE SET document = EXCLUDED.document
+"""
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(SQLITE_CREATE_SQL)
+        schema_editor.execute(f"DELETE FROM {FTS_TABLE}")
+        schema_editor.execute(SQLITE_INDEX_SQL)
+    elif vendor == 'postgresql':
+        for sql in POSTGRES_CREATE_SQL:
+            schema_editor.execute(sql)
+        schema_editor.execute(POSTGRES_INDEX_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_alter_ingredient_amount'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_search_index'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='ingredient',
+            options={'ordering': ['position', 'id']},
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='position',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:55
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def normalize_label(value):
+    # A copy of recipes.labels.normalize_label as of this migration
+    return re.sub(r'[\s_-]+', '-', str(value).strip().lower()).strip('-')
+
+
+def backfill_labels(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeLabel = apps.get_model('recipes', 'RecipeLabel')
+    rows = []
+    for recipe_id, tags, dietary_labels in Recipe.objects.values_list('pk', 'tags', 'dietary_labels').iterator():
+        labels = set()
+        for kind, values in (('tag', tags), ('dietary', dietary_labels)):
+            for value in values if isinstance(values, list) else []:
+                label = normalize_label(value)[:100]
+                if label:
+                    labels.add((kind, label))
+        rows.extend(RecipeLabel(recipe_id=recipe_id, kind=kind, value=value) for kind, value in sorted(labels))
+    RecipeLabel.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_ingredient_position'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeLabel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('tag', 'Tag'), ('dietary', 'Dietary label')], max_length=10)),
+                ('value', models.CharField(max_length=100)),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='labels', to='recipes.recipe')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'value', 'recipe'], name='recipes_label_lookup_idx')],
+                'unique_together': {('recipe', 'kind', 'value')},
+            },
+        ),
+        migrations.RunPython(backfill_labels, migrations.RunPython.noop),
+    ]
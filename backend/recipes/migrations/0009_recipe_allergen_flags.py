@@ -0,0 +1,196 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:57
+
+import re
+from collections import defaultdict
+
+from django.db import migrations, models
+
+# A copy of recipes.vocabulary and recipes.allergens as of this migration,
+# so later changes to the dictionaries do not rewrite history. Run the
+# recompute_allergen_flags command to apply newer ones.
+DESCRIPTORS = {
+    'fresh', 'freshly', 'large', 'small', 'medium', 'chopped', 'diced', 'minced', 'sliced',
+    'grated', 'shredded', 'crushed', 'dried', 'frozen', 'ripe', 'raw', 'cooked',
+    'boneless', 'skinless', 'organic', 'whole', 'finely', 'roughly', 'thinly', 'peeled',
+    'softened', 'melted', 'beaten', 'optional', 'to', 'taste', 'of', 'a', 'an', 'the',
+}
+
+MEASURES = {
+    'g', 'gr', 'gram', 'gramme', 'kg', 'kilo', 'kilogram', 'mg', 'milligram', 'oz', 'ounce',
+    'lb', 'lbs', 'pound', 'ml', 'millilitre', 'milliliter', 'cl', 'dl', 'l', 'litre', 'liter',
+    'tsp', 'teaspoon', 'tbsp', 'tbs', 'tablespoon', 'fl', 'fluid', 'cup', 'pint', 'quart', 'gallon',
+    'pc', 'pcs', 'piece', 'unit', 'x',
+    'can', 'tin', 'jar', 'bottle', 'carton', 'packet', 'package', 'pack', 'bag', 'box',
+    'bunch', 'clove', 'head', 'stalk', 'sprig', 'handful', 'pinch', 'dash', 'splash', 'knob',
+    'slice', 'stick', 'sheet', 'cube',
+}
+
+SYNONYMS = {
+    'scallion': 'green onion',
+    'spring onion': 'green onion',
+    'cilantro': 'coriander',
+    'garbanzo bean': 'chickpea',
+    'garbanzo': 'chickpea',
+    'aubergine': 'eggplant',
+    'courgette': 'zucchini',
+    'capsicum': 'bell pepper',
+    'confectioners sugar': 'powdered sugar',
+    'icing sugar': 'powdered sugar',
+    'caster sugar': 'sugar',
+    'granulated sugar': 'sugar',
+    'white sugar': 'sugar',
+    'all purpose flour': 'flour',
+    'plain flour': 'flour',
+    'bicarbonate soda': 'baking soda',
+    'prawn': 'shrimp',
+    'beef mince': 'ground beef',
+    'double cream': 'heavy cream',
+    'heavy whipping cream': 'heavy cream',
+    'olive oil': 'oil',
+    'vegetable oil': 'oil',
+    'canola oil': 'oil',
+    'sea salt': 'salt',
+    'kosher salt': 'salt',
+    'black pepper': 'pepper',
+    'yoghurt': 'yogurt',
+}
+
+SINGULARS = {
+    'leaves': 'leaf', 'loaves': 'loaf', 'halves': 'half', 'knives': 'knife',
+    'tomatoes': 'tomato', 'potatoes': 'potato', 'mangoes': 'mango',
+    'molasses': 'molasses', 'hummus': 'hummus', 'asparagus': 'asparagus',
+    'couscous': 'couscous', 'swiss': 'swiss', 'citrus': 'citrus', 'lentils': 'lentil',
+}
+
+
+def singularize(word):
+    if word in SINGULARS:
+        return SINGULARS[word]
+    if len(word) <= 3 or word.endswith(('ss', 'us', 'is')):
+        return word
+    if word.endswith('ies'):
+        return word[:-3] + 'y'
+    if word.endswith(('ches', 'shes', 'xes', 'sses', 'zes')):
+        return word[:-2]
+    if word.endswith('s'):
+        return word[:-1]
+    return word
+
+
+def normalize_ingredient(name):
+    words = re.sub(r'[^a-z\s]', ' ', (name or '').lower()).split()
+    words = [singularize(word) for word in words if word not in DESCRIPTORS]
+    # Keep the measure words when they are all there is ("cloves" the spice)
+    phrase = ' '.join(word for word in words if word not in MEASURES) or ' '.join(words)
+    return SYNONYMS.get(phrase, phrase)
+
+
+GLUTEN = 1 << 0
+DAIRY = 1 << 1
+EGG = 1 << 2
+PEANUT = 1 << 3
+TREE_NUT = 1 << 4
+SOY = 1 << 5
+FISH = 1 << 6
+SHELLFISH = 1 << 7
+SESAME = 1 << 8
+MEAT = 1 << 9
+HONEY = 1 << 10
+
+PHRASE_FLAGS = {
+    'peanut butter': PEANUT,
+    'almond butter': TREE_NUT,
+    'almond milk': TREE_NUT,
+    'cashew milk': TREE_NUT,
+    'soy milk': SOY,
+    'soy sauce': SOY | GLUTEN,
+    'coconut milk': 0,
+    'coconut cream': 0,
+    'oat milk': 0,
+    'rice milk': 0,
+    'vegan butter': 0,
+    'cream tartar': 0,
+    'gluten free flour': 0,
+    'rice flour': 0,
+    'almond flour': TREE_NUT,
+    'coconut flour': 0,
+    'corn flour': 0,
+    'fish sauce': FISH,
+    'oyster sauce': SHELLFISH,
+    'sesame oil': SESAME,
+    'egg noodle': EGG | GLUTEN,
+}
+
+WORD_FLAGS = {
+    GLUTEN: {
+        'flour', 'wheat', 'bread', 'breadcrumb', 'pasta', 'spaghetti', 'penne', 'macaroni', 'noodle',
+        'barley', 'rye', 'couscous', 'semolina', 'dough', 'tortilla', 'pita', 'bun', 'cracker', 'seitan',
+        'lasagna', 'fettuccine', 'linguine', 'croissant', 'panko',
+    },
+    DAIRY: {
+        'milk', 'cheese', 'butter', 'cream', 'yogurt', 'mozzarella', 'parmesan', 'pecorino', 'cheddar',
+        'ricotta', 'feta', 'mascarpone', 'ghee', 'buttermilk', 'gruyere', 'brie', 'paneer', 'whey',
+    },
+    EGG: {'egg', 'mayonnaise', 'mayo', 'meringue', 'aioli'},
+    PEANUT: {'peanut'},
+    TREE_NUT: {
+        'almond', 'walnut', 'cashew', 'pecan', 'pistachio', 'hazelnut', 'macadamia', 'nut', 'praline',
+        'marzipan',
+    },
+    SOY: {'soy', 'tofu', 'tempeh', 'edamame', 'miso', 'soybean'},
+    FISH: {'fish', 'salmon', 'tuna', 'cod', 'anchovy', 'sardine', 'trout', 'halibut', 'tilapia', 'mackerel'},
+    SHELLFISH: {'shrimp', 'crab', 'lobster', 'mussel', 'clam', 'oyster', 'scallop', 'crawfish', 'squid'},
+    SESAME: {'sesame', 'tahini'},
+    MEAT: {
+        'chicken', 'beef', 'pork', 'bacon', 'guanciale', 'pancetta', 'lamb', 'turkey', 'ham', 'sausage',
+        'veal', 'duck', 'prosciutto', 'salami', 'chorizo', 'steak', 'mince', 'gelatin', 'pepperoni',
+    },
+    HONEY: {'honey'},
+}
+
+
+def ingredient_flags(name):
+    phrase = normalize_ingredient(name)
+    flags = 0
+    for override, override_flags in PHRASE_FLAGS.items():
+        pattern = r'\b%s\b' % re.escape(override)
+        if re.search(pattern, phrase):
+            flags |= override_flags
+            phrase = re.sub(pattern, ' ', phrase)
+    for word in phrase.split():
+        for flag, words in WORD_FLAGS.items():
+            if word in words:
+                flags |= flag
+    return flags
+
+
+def backfill_allergen_flags(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    flags = defaultdict(int)
+    for recipe_id, name in Ingredient.objects.order_by().values_list('recipe_id', 'name').iterator():
+        flags[recipe_id] |= ingredient_flags(name)
+    # One UPDATE per distinct flag value rather than per recipe
+    by_value = defaultdict(list)
+    for recipe_id, value in flags.items():
+        if value:
+            by_value[value].append(recipe_id)
+    for value, recipe_ids in by_value.items():
+        for start in range(0, len(recipe_ids), 500):
+            Recipe.objects.filter(pk__in=recipe_ids[start:start + 500]).update(allergen_flags=value)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipelabel'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='allergen_flags',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_allergen_flags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,156 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:05
+
+import re
+
+from django.db import migrations, models
+
+# A copy of recipes.units (and the vocabulary it uses) as of this migration,
+# so later changes there do not rewrite history. Run the
+# backfill_ingredient_quantities command to apply newer parsing rules.
+DESCRIPTORS = {
+    'fresh', 'freshly', 'large', 'small', 'medium', 'chopped', 'diced', 'minced', 'sliced',
+    'grated', 'shredded', 'crushed', 'dried', 'frozen', 'ripe', 'raw', 'cooked',
+    'boneless', 'skinless', 'organic', 'whole', 'finely', 'roughly', 'thinly', 'peeled',
+    'softened', 'melted', 'beaten', 'optional', 'to', 'taste', 'of', 'a', 'an', 'the',
+}
+
+SINGULARS = {
+    'leaves': 'leaf', 'loaves': 'loaf', 'halves': 'half', 'knives': 'knife',
+    'tomatoes': 'tomato', 'potatoes': 'potato', 'mangoes': 'mango',
+    'molasses': 'molasses', 'hummus': 'hummus', 'asparagus': 'asparagus',
+    'couscous': 'couscous', 'swiss': 'swiss', 'citrus': 'citrus', 'lentils': 'lentil',
+}
+
+
+def singularize(word):
+    if word in SINGULARS:
+        return SINGULARS[word]
+    if len(word) <= 3 or word.endswith(('ss', 'us', 'is')):
+        return word
+    if word.endswith('ies'):
+        return word[:-3] + 'y'
+    if word.endswith(('ches', 'shes', 'xes', 'sses', 'zes')):
+        return word[:-2]
+    if word.endswith('s'):
+        return word[:-1]
+    return word
+
+
+GRAM = 'g'
+MILLILITRE = 'ml'
+PIECE = 'pc'
+
+UNITS = {
+    'g': (GRAM, 1.0), 'gr': (GRAM, 1.0), 'gram': (GRAM, 1.0), 'gramme': (GRAM, 1.0),
+    'kg': (GRAM, 1000.0), 'kilo': (GRAM, 1000.0), 'kilogram': (GRAM, 1000.0),
+    'mg': (GRAM, 0.001), 'milligram': (GRAM, 0.001),
+    'oz': (GRAM, 28.3495), 'ounce': (GRAM, 28.3495),
+    'lb': (GRAM, 453.592), 'lbs': (GRAM, 453.592), 'pound': (GRAM, 453.592),
+    'ml': (MILLILITRE, 1.0), 'millilitre': (MILLILITRE, 1.0), 'milliliter': (MILLILITRE, 1.0),
+    'cl': (MILLILITRE, 10.0), 'dl': (MILLILITRE, 100.0),
+    'l': (MILLILITRE, 1000.0), 'litre': (MILLILITRE, 1000.0), 'liter': (MILLILITRE, 1000.0),
+    'tsp': (MILLILITRE, 4.92892), 'teaspoon': (MILLILITRE, 4.92892),
+    'tbsp': (MILLILITRE, 14.7868), 'tbs': (MILLILITRE, 14.7868), 'tablespoon': (MILLILITRE, 14.7868),
+    'fl oz': (MILLILITRE, 29.5735), 'fluid ounce': (MILLILITRE, 29.5735),
+    'cup': (MILLILITRE, 236.588), 'pint': (MILLILITRE, 473.176),
+    'quart': (MILLILITRE, 946.353), 'gallon': (MILLILITRE, 3785.41),
+    '': (PIECE, 1.0), 'pc': (PIECE, 1.0), 'pcs': (PIECE, 1.0), 'piece': (PIECE, 1.0),
+    'whole': (PIECE, 1.0), 'unit': (PIECE, 1.0), 'x': (PIECE, 1.0),
+}
+
+FRACTIONS = {'½': '1/2', '⅓': '1/3', '⅔': '2/3', '¼': '1/4', '¾': '3/4', '⅛': '1/8', '⅜': '3/8', '⅝': '5/8', '⅞': '7/8'}
+
+_NUMBER = r'(?:\d+\s+\d+/\d+|\d+/\d+|\d+(?:[.,]\d+)?)'
+_AMOUNT_RE = re.compile(r'^\s*(%s)(?:\s*(?:-|–|to)\s*(%s))?\s*(.*)$' % (_NUMBER, _NUMBER))
+
+
+def parse_number(text):
+    text = text.replace(',', '.')
+    total = 0.0
+    for part in text.split():
+        if '/' in part:
+            numerator, denominator = part.split('/')
+            if float(denominator) == 0:
+                return None
+            total += float(numerator) / float(denominator)
+        else:
+            total += float(part)
+    return total
+
+
+def _expand_fractions(text):
+    # "1½" -> "1 1/2" so vulgar fractions parse like written ones
+    for symbol, fraction in FRACTIONS.items():
+        text = text.replace(symbol, f' {fraction}')
+    return text
+
+
+def canonical_unit(unit):
+    key = re.sub(r'[^a-z\s]', ' ', (unit or '').lower())
+    key = ' '.join(word for word in key.split() if word not in DESCRIPTORS)
+    if key in UNITS:
+        return UNITS[key]
+    key = ' '.join(singularize(word) for word in key.split())
+    if key in UNITS:
+        return UNITS[key]
+    if not key:
+        return UNITS['']
+    return key, 1.0
+
+
+def parse_quantity(amount, unit):
+    match = _AMOUNT_RE.match(_expand_fractions(amount or ''))
+    if not match:
+        return None, None, ''
+    low, high, rest = match.groups()
+    low = parse_number(low)
+    high = parse_number(high) if high else None
+    if low is None:
+        return None, None, ''
+    # "200g" with the unit field left blank or holding a stray number
+    if rest and (not (unit or '').strip() or re.fullmatch(r'[\d.\s]*', unit or '')):
+        unit = rest
+    name, factor = canonical_unit(unit)
+    return low * factor, (high * factor if high is not None else None), name
+
+
+def backfill_quantities(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    fields = ['quantity', 'quantity_max', 'canonical_unit']
+    batch = []
+    for ingredient in Ingredient.objects.order_by('pk').only('pk', 'amount', 'unit').iterator(chunk_size=1000):
+        ingredient.quantity, ingredient.quantity_max, ingredient.canonical_unit = parse_quantity(
+            ingredient.amount, ingredient.unit,
+        )
+        batch.append(ingredient)
+        if len(batch) >= 1000:
+            Ingredient.objects.bulk_update(batch, fields)
+            batch = []
+    if batch:
+        Ingredient.objects.bulk_update(batch, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipe_trending_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='canonical_unit',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='quantity',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='quantity_max',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_quantities, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,13 @@
+import uuid
+
 from django.db import models
+from django.utils import timezone
+from django.db.models import Avg, Count, OuterRef, Subquery, FloatField, IntegerField
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 
+from .units import QUANTITY_FIELDS, parse_quantity
+
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     avatar_url = models.URLField(max_length=500, blank=True)
@@ -11,6 +18,22 @@ class Profile(models.Model):
     def __str__(self):
         return self.user.username
 
+class RecipeQuerySet(models.QuerySet):
+    def with_ratings(self):
+        # Correlated subqueries keep the aggregate independent of any joins
+        # added later by search/filter backends.
+        ratings = Rating.objects.filter(recipe=OuterRef('pk')).order_by().values('recipe')
+        return self.annotate(
+            rating_avg=Coalesce(
+                Subquery(ratings.annotate(avg=Avg('score')).values('avg'), output_field=FloatField()),
+                0.0,
+            ),
+            rating_count=Coalesce(
+                Subquery(ratings.annotate(count=Count('pk')).values('count'), output_field=IntegerField()),
+                0,
+            ),
+        )
+
 class Recipe(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recipes')
     title = models.CharField(max_length=255)
@@ -25,15 +48,43 @@ class Recipe(models.Model):
     tags = models.JSONField(default=list)
     dietary_labels = models.JSONField(default=list, blank=True)
     is_public = models.BooleanField(default=True)
+    # Bitmask of allergen/diet flags of the ingredients, see allergens.py
+    allergen_flags = models.IntegerField(default=0)
+    # Time-decayed engagement score, refreshed by the refresh_trending command
+    trending_score = models.FloatField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = RecipeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [models.Index(fields=['-trending_score', '-id'], name='recipes_trending_idx')]
+
+    def _load_rating_stats(self):
+        stats = self.ratings.aggregate(avg=Avg('score'), count=Count('pk'))
+        self._rating_avg = stats['avg'] or 0
+        self._rating_count = stats['count']
+
     @property
     def rating_avg(self):
-        ratings = self.ratings.all()
-        if not ratings:
-            return 0
-        return sum(r.score for r in ratings) / len(ratings)
+        # Set directly by RecipeQuerySet.with_ratings(); falls back to one aggregate query.
+        if not hasattr(self, '_rating_avg'):
+            self._load_rating_stats()
+        return self._rating_avg
+
+    @rating_avg.setter
+    def rating_avg(self, value):
+        self._rating_avg = value or 0
+
+    @property
+    def rating_count(self):
+        if not hasattr(self, '_rating_count'):
+            self._load_rating_stats()
+        return self._rating_count
+
+    @rating_count.setter
+    def rating_count(self, value):
+        self._rating_count = value or 0
 
     def __str__(self):
         return self.title
@@ -44,13 +95,54 @@ class Ingredient(models.Model):
     amount = models.CharField(max_length=50)
     unit = models.CharField(max_length=50)
     notes = models.TextField(blank=True)
+    position = models.PositiveIntegerField(default=0)
+    # amount/unit parsed into canonical units (g, ml or a count unit), see units.py
+    quantity = models.FloatField(null=True, blank=True)
+    quantity_max = models.FloatField(null=True, blank=True)
+    canonical_unit = models.CharField(max_length=50, blank=True)
+
+    class Meta:
+        ordering = ['position', 'id']
+
+    def parse_quantity(self):
+        self.quantity, self.quantity_max, self.canonical_unit = parse_quantity(self.amount, self.unit)
+
+    def save(self, *args, **kwargs):
+        self.parse_quantity()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'amount', 'unit'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | set(QUANTITY_FIELDS)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.amount} {self.unit} of {self.name}"
 
+class RecipeLabel(models.Model):
+    """
+    One row per normalized tag / dietary label of a recipe, mirroring the
+    Recipe.tags and Recipe.dietary_labels JSON fields so they can be
+    filtered through an index.
+    """
+    TAG = 'tag'
+    DIETARY = 'dietary'
+    KIND_CHOICES = [(TAG, 'Tag'), (DIETARY, 'Dietary label')]
+
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='labels')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    value = models.CharField(max_length=100)
+
+    class Meta:
+        unique_together = ('recipe', 'kind', 'value')
+        indexes = [models.Index(fields=['kind', 'value', 'recipe'], name='recipes_label_lookup_idx')]
+
+    def __str__(self):
+        return f"{self.kind}:{self.value}"
+
 class Favorite(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='favorites')
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='favorited_by')
+    # Null for favorites saved before this was recorded
+    created_at = models.DateTimeField(default=timezone.now, null=True, db_index=True)
 
     class Meta:
         unique_together = ('user', 'recipe')
@@ -60,7 +152,47 @@ class Rating(models.Model):
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='ratings')
     score = models.IntegerField()
     comment = models.TextField(blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     class Meta:
         unique_together = ('user', 'recipe')
+
+
+class TrendingState(models.Model):
+    """Single row remembering when trending scores were last refreshed."""
+    refreshed_at = models.DateTimeField()
+
+
+class GenerationJob(models.Model):
+    """An AI recipe generation run asynchronously, polled by the client."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (SUCCEEDED, 'Succeeded'), (FAILED, 'Failed')]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='generation_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    params = models.JSONField(default=dict)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'created_at'], name='recipes_genjob_queue_idx')]
+
+    def __str__(self):
+        return f"{self.id} ({self.status})"
+
+
+class AICallLock(models.Model):
+    """Marks an AI call in flight so identical calls in other processes wait for its result."""
+    key = models.CharField(max_length=100, primary_key=True)
+    owner = models.CharField(max_length=64)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.key
@@ -0,0 +1,128 @@
+"""
+"What can I cook?" matching over an in-memory inverted index.
+
+Every recipe's ingredient names are normalized (see vocabulary.py) into
+phrases. The index maps each phrase to the recipes using it, and each
+word to the phrases containing it, so a pantry lookup only touches the
+postings of the phrases the user actually has.
+
+Dirty recipes are reloaded on the next lookup, and the whole index is
+rebuilt every PANTRY_INDEX_MAX_AGE seconds to pick up writes made by other
+processes (see indexes.py).
+"""
+import heapq
+import time
+from collections import Counter, defaultdict, namedtuple
+
+from django.conf import settings
+
+from .indexes import RebuildingIndex
+from .models import Ingredient
+from .vocabulary import PANTRY_STAPLES, normalize_ingredient
+
+PantryMatch = namedtuple('PantryMatch', ['recipe_id', 'matched', 'missing'])
+
+
+class PantryIndex(RebuildingIndex):
+    thread_name = 'pantry-rebuild'
+
+    def __init__(self):
+        super().__init__()
+        self.phrase_ids = {}
+        self.phrases = []
+        self.token_phrases = defaultdict(set)
+        self.phrase_recipes = defaultdict(set)
+        # recipe id -> {phrase id: ingredient name as written in the recipe}
+        self.recipe_ingredients = {}
+
+    def _phrase_id(self, phrase):
+        phrase_id = self.phrase_ids.get(phrase)
+        if phrase_id is None:
+            phrase_id = self.phrase_ids[phrase] = len(self.phrases)
+            self.phrases.append(phrase)
+            for token in phrase.split():
+                self.token_phrases[token].add(phrase_id)
+        return phrase_id
+
+    def _remove_recipe(self, recipe_id):
+        for phrase_id in self.recipe_ingredients.pop(recipe_id, {}):
+            self.phrase_recipes[phrase_id].discard(recipe_id)
+
+    def _add_ingredient(self, recipe_id, name):
+        phrase = normalize_ingredient(name)
+        if not phrase or phrase in PANTRY_STAPLES:
+            return
+        phrase_id = self._phrase_id(phrase)
+        self.recipe_ingredients.setdefault(recipe_id, {}).setdefault(phrase_id, name)
+        self.phrase_recipes[phrase_id].add(recipe_id)
+
+    def _load(self, recipe_ids=None):
+        rows = Ingredient.objects.order_by().values_list('recipe_id', 'name')
+        if recipe_ids is not None:
+            rows = rows.filter(recipe_id__in=recipe_ids)
+        for recipe_id, name in rows.iterator(chunk_size=5000):
+            self._add_ingredient(recipe_id, name)
+
+    def load(self):
+        fresh = PantryIndex()
+        fresh._load()
+        return fresh
+
+    def install(self, fresh):
+        self.phrase_ids = fresh.phrase_ids
+        self.phrases = fresh.phrases
+        self.token_phrases = fresh.token_phrases
+        self.phrase_recipes = fresh.phrase_recipes
+        self.recipe_ingredients = fresh.recipe_ingredients
+
+    def refresh_dirty(self):
+        # During a rebuild dirty recipes wait for the fresh index instead
+        if not self._dirty:
+            return
+        dirty, self._dirty = list(self._dirty), set()
+        for recipe_id in dirty:
+            self._remove_recipe(recipe_id)
+        self._load(dirty)
+
+    def is_stale(self, built_at):
+        return time.monotonic() - built_at > getattr(settings, 'PANTRY_INDEX_MAX_AGE', 600)
+
+    def match(self, pantry, limit=20, max_missing=3):
+        """
+        Rank recipes by how much of their ingredient list ``pantry`` (a list
+        of normalized phrases) covers: fewest missing ingredients first,
+        then highest coverage. A pantry phrase covers every recipe
+        ingredient containing all of its words, so "chicken" covers
+        "chicken breast".
+        """
+        self.refresh()
+        with self._lock:
+            have = set()
+            for phrase in pantry:
+                postings = [self.token_phrases.get(token, set()) for token in phrase.split()]
+                if postings:
+                    have |= set.intersection(*postings)
+
+            covered = Counter()
+            for phrase_id in have:
+                covered.update(self.phrase_recipes.get(phrase_id, ()))
+
+            candidates = []
+            for recipe_id, count in covered.items():
+                total = len(self.recipe_ingredients[recipe_id])
+                missing = total - count
+                if missing <= max_missing:
+                    candidates.append((missing, -count / total, -count, recipe_id))
+
+            matches = []
+            for _, _, _, recipe_id in heapq.nsmallest(limit, candidates):
+                ingredients = self.recipe_ingredients[recipe_id]
+                matches.append(PantryMatch(
+                    recipe_id,
+                    [name for phrase_id, name in ingredients.items() if phrase_id in have],
+                    [name for phrase_id, name in ingredients.items() if phrase_id not in have],
+                ))
+            return matches
+
+
+pantry_index = PantryIndex()
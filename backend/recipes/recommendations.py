@@ -0,0 +1,185 @@
+"""
+Item-item collaborative filtering over favorites and ratings.
+
+``build_model`` (run offline by the build_recommendations command) turns
+every Favorite and Rating into a sparse user x recipe matrix, computes the
+cosine similarity between recipe columns and keeps the top-K neighbours of
+each recipe. The result is written as plain .npy arrays into a new
+directory under RECOMMENDATIONS_DIR and published by rewriting the
+``CURRENT`` pointer file, so workers never see a half-written model.
+
+Workers open the arrays memory-mapped, so the model is shared through the
+page cache instead of being copied into every process, and recommending is
+a lookup of the user's recipes plus a small merge of their neighbour lists.
+"""
+import os
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from scipy import sparse
+
+from .models import Favorite, Rating
+
+FAVORITE_WEIGHT = 1.0
+# Ratings below this score are not treated as a positive signal
+MIN_POSITIVE_SCORE = 3
+MODEL_FILES = ('recipe_ids', 'neighbor_ids', 'neighbor_scores')
+
+
+def get_model_dir():
+    return str(getattr(settings, 'RECOMMENDATIONS_DIR', os.path.join(settings.BASE_DIR, 'var', 'recommendations')))
+
+
+def user_interactions(user_ids=None):
+    """Yield (user_id, recipe_id, weight) for every positive interaction."""
+    favorites = Favorite.objects.order_by().values_list('user_id', 'recipe_id')
+    ratings = Rating.objects.filter(score__gte=MIN_POSITIVE_SCORE).order_by().values_list('user_id', 'recipe_id', 'score')
+    if user_ids is not None:
+        favorites = favorites.filter(user_id__in=user_ids)
+        ratings = ratings.filter(user_id__in=user_ids)
+    for user_id, recipe_id in favorites.iterator():
+        yield user_id, recipe_id, FAVORITE_WEIGHT
+    for user_id, recipe_id, score in ratings.iterator():
+        yield user_id, recipe_id, score / 5.0
+
+
+def build_model(neighbors=20, min_similarity=0.0):
+    """Compute the top-K neighbour arrays. Returns None if there is no signal."""
+    rows, cols, weights = [], [], []
+    for user_id, recipe_id, weight in user_interactions():
+        rows.append(user_id)
+        cols.append(recipe_id)
+        weights.append(weight)
+    if not rows:
+        return None
+
+    user_index, user_rows = np.unique(np.asarray(rows, dtype=np.int64), return_inverse=True)
+    recipe_ids, recipe_cols = np.unique(np.asarray(cols, dtype=np.int64), return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.asarray(weights, dtype=np.float32), (user_rows, recipe_cols)),
+        shape=(len(user_index), len(recipe_ids)),
+    )
+    # Duplicate (user, recipe) pairs - favorited and rated - are summed
+    matrix.sum_duplicates()
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    norms[norms == 0] = 1.0
+    normalized = matrix @ sparse.diags(1.0 / norms)
+    similarity = (normalized.T @ normalized).tocsr()
+    similarity.setdiag(0)
+    similarity.eliminate_zeros()
+
+    neighbor_ids = np.full((len(recipe_ids), neighbors), -1, dtype=np.int64)
+    neighbor_scores = np.zeros((len(recipe_ids), neighbors), dtype=np.float32)
+    for row in range(len(recipe_ids)):
+        start, end = similarity.indptr[row], similarity.indptr[row + 1]
+        cols_in_row = similarity.indices[start:end]
+        scores = similarity.data[start:end]
+        keep = scores > min_similarity
+        cols_in_row, scores = cols_in_row[keep], scores[keep]
+        if len(scores) > neighbors:
+            top = np.argpartition(-scores, neighbors)[:neighbors]
+            cols_in_row, scores = cols_in_row[top], scores[top]
+        order = np.argsort(-scores, kind='stable')
+        count = len(order)
+        neighbor_ids[row, :count] = recipe_ids[cols_in_row[order]]
+        neighbor_scores[row, :count] = scores[order]
+
+    return {'recipe_ids': recipe_ids, 'neighbor_ids': neighbor_ids, 'neighbor_scores': neighbor_scores}
+
+
+def save_model(model, model_dir=None):
+    model_dir = model_dir or get_model_dir()
+    name = f'model-{time.time_ns()}'
+    target = os.path.join(model_dir, name)
+    os.makedirs(target, exist_ok=True)
+    for key in MODEL_FILES:
+        np.save(os.path.join(target, f'{key}.npy'), model[key])
+    pointer = os.path.join(model_dir, 'CURRENT')
+    with open(pointer + '.tmp', 'w') as f:
+        f.write(name)
+    os.replace(pointer + '.tmp', pointer)
+    prune_models(model_dir)
+    return target
+
+
+def prune_models(model_dir, keep=3):
+    # Older models may still be mapped by workers that have not re-checked
+    # CURRENT yet; unlinking is safe for them since mappings outlive the file.
+    models = sorted(name for name in os.listdir(model_dir) if name.startswith('model-'))
+    for name in models[:-keep]:
+        path = os.path.join(model_dir, name)
+        for key in MODEL_FILES:
+            try:
+                os.remove(os.path.join(path, f'{key}.npy'))
+            except OSError:
+                pass
+        try:
+            os.rmdir(path)
+        except OSError:
+            pass
+
+
+class RecommendationModel:
+    """Memory-mapped view of the current model, reloaded when it is republished."""
+    check_interval = 30  # seconds between checks of the CURRENT pointer
+
+    def __init__(self, model_dir=None):
+        self.model_dir = model_dir
+        self.name = None
+        self.arrays = None
+        self._checked_at = 0
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self.arrays is not None and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        model_dir = self.model_dir or get_model_dir()
+        try:
+            with open(os.path.join(model_dir, 'CURRENT')) as f:
+                name = f.read().strip()
+        except OSError:
+            self.arrays = None
+            return
+        if name != self.name:
+            path = os.path.join(model_dir, name)
+            self.arrays = {key: np.load(os.path.join(path, f'{key}.npy'), mmap_mode='r') for key in MODEL_FILES}
+            self.name = name
+
+    def recommend(self, seeds, limit=20):
+        """
+        Merge the neighbour lists of ``seeds`` ({recipe_id: weight}) into
+        a ranked list of recipe ids, excluding the seeds themselves.
+        """
+        self._refresh()
+        if self.arrays is None or not seeds:
+            return []
+        recipe_ids = self.arrays['recipe_ids']
+        seed_ids = np.fromiter(seeds.keys(), dtype=np.int64)
+        positions = np.searchsorted(recipe_ids, seed_ids)
+        positions = np.clip(positions, 0, max(len(recipe_ids) - 1, 0))
+        found = recipe_ids[positions] == seed_ids
+
+        scores = defaultdict(float)
+        for seed_id, position in zip(seed_ids[found], positions[found]):
+            weight = seeds[int(seed_id)]
+            for neighbor_id, score in zip(self.arrays['neighbor_ids'][position], self.arrays['neighbor_scores'][position]):
+                if neighbor_id < 0:
+                    break
+                scores[int(neighbor_id)] += weight * float(score)
+        for seed_id in seeds:
+            scores.pop(seed_id, None)
+        return sorted(scores, key=lambda recipe_id: (-scores[recipe_id], recipe_id))[:limit]
+
+
+recommendation_model = RecommendationModel()
+
+
+def recommend_for_user(user, limit=20):
+    seeds = defaultdict(float)
+    for _, recipe_id, weight in user_interactions(user_ids=[user.pk]):
+        seeds[recipe_id] += weight
+    return recommendation_model.recommend(dict(seeds), limit=limit)
@@ -0,0 +1,116 @@
+"""
+Failure isolation for LLM calls: per-call deadlines, jittered retry backoff
+and a circuit breaker.
+"""
+import math
+import random
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitOpenError(Exception):
+    """The provider is failing; calls are refused for ``retry_after`` seconds."""
+
+    def __init__(self, retry_after):
+        self.retry_after = max(int(math.ceil(retry_after)), 1)
+        super().__init__(f"The AI service is unavailable, retry in {self.retry_after} seconds")
+
+
+class Deadline:
+    def __init__(self, timeout):
+        self.expires_at = time.monotonic() + timeout
+
+    def remaining(self):
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+
+def backoff_delay(attempt, base=None, cap=None):
+    """Full-jitter exponential backoff: a random delay in [0, min(cap, base * 2**attempt)]."""
+    base = getattr(settings, 'LLM_RETRY_BACKOFF', 0.5) if base is None else base
+    cap = getattr(settings, 'LLM_RETRY_MAX_BACKOFF', 4.0) if cap is None else cap
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    def __init__(self, window=None, min_calls=None, error_rate=None, cooldown=None):
+        self.window = window if window is not None else getattr(settings, 'LLM_BREAKER_WINDOW', 60)
+        self.min_calls = min_calls if min_calls is not None else getattr(settings, 'LLM_BREAKER_MIN_CALLS', 10)
+        self.error_rate = error_rate if error_rate is not None else getattr(settings, 'LLM_BREAKER_ERROR_RATE', 0.5)
+        self.cooldown = cooldown if cooldown is not None else getattr(settings, 'LLM_BREAKER_COOLDOWN', 30)
+        self._lock = threading.Lock()
+        self._outcomes = deque()  # (monotonic time, failed)
+        self._failures = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                return HALF_OPEN
+            return self._state
+
+    def _trim(self, now):
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            _, failed = self._outcomes.popleft()
+            self._failures -= failed
+
+    def _retry_after(self, now):
+        return self.cooldown - (now - self._opened_at)
+
+    def check(self):
+        """Raise CircuitOpenError while the breaker is open, without claiming the probe call."""
+        with self._lock:
+            now = time.monotonic()
+            if self._state == OPEN and self._retry_after(now) > 0:
+                raise CircuitOpenError(self._retry_after(now))
+            if self._state == HALF_OPEN and self._probing:
+                raise CircuitOpenError(1)
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError."""
+        with self._lock:
+            now = time.monotonic()
+            if self._state == OPEN:
+                if self._retry_after(now) > 0:
+                    raise CircuitOpenError(self._retry_after(now))
+                self._state = HALF_OPEN
+                self._probing = False
+            if self._state == HALF_OPEN:
+                if self._probing:
+                    raise CircuitOpenError(1)
+                self._probing = True
+
+    def record(self, failed):
+        with self._lock:
+            now = time.monotonic()
+            if self._state == HALF_OPEN:
+                self._probing = False
+                if failed:
+                    self._state, self._opened_at = OPEN, now
+                else:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                    self._failures = 0
+                return
+            self._outcomes.append((now, failed))
+            self._failures += failed
+            self._trim(now)
+            calls = len(self._outcomes)
+            if self._state == CLOSED and calls >= self.min_calls and self._failures / calls >= self.error_rate:
+                self._state, self._opened_at = OPEN, now
+
+    def reset(self):
+        with self._lock:
+            self._outcomes.clear()
+            self._failures = 0
+            self._state = CLOSED
+            self._probing = False
@@ -0,0 +1,159 @@
+"""
+Full-text search over recipes.
+
+Recipes are indexed into a sidecar ``recipes_recipe_fts`` table holding the
+title, description, tags and ingredient names of each recipe:
+
+- SQLite: an FTS5 virtual table keyed by rowid = recipe id, ranked with bm25().
+- PostgreSQL: a (recipe_id, document tsvector) table with a GIN index, ranked
+  with ts_rank().
+
+Other database backends fall back to DRF's icontains SearchFilter.
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+FTS_TABLE = 'recipes_recipe_fts'
+MAX_TERMS = 8
+
+# bm25() column weights: title, description, tags, ingredients
+SQLITE_WEIGHTS = '10.0, 1.0, 5.0, 4.0'
+
+SQLITE_CREATE_SQL = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE}
+USING fts5(title, description, tags, ingredients, tokenize='porter unicode61')
+"""
+
+SQLITE_INDEX_SQL = f"""
+INSERT INTO {FTS_TABLE} (rowid, title, description, tags, ingredients)
+SELECT r.id, r.title, r.description, r.tags,
+       COALESCE((SELECT group_concat(i.name, ' ') FROM recipes_ingredient i WHERE i.recipe_id = r.id), '')
+FROM recipes_recipe r
+"""
+
+POSTGRES_CREATE_SQL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {FTS_TABLE} (
+        recipe_id bigint PRIMARY KEY REFERENCES recipes_recipe (id) ON DELETE CASCADE,
+        document tsvector NOT NULL
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS {FTS_TABLE}_document_idx ON {FTS_TABLE} USING GIN (document)",
+]
+
+POSTGRES_INDEX_SQL = f"""
+INSERT INTO {FTS_TABLE} (recipe_id, document)
+SELECT r.id,
+       setweight(to_tsvector('english', r.title), 'A') ||
+       setweight(to_tsvector('english', r.tags::text), 'B') ||
+       setweight(to_tsvector('english', COALESCE(
+           (SELECT string_agg(i.name, ' ') FROM recipes_ingredient i WHERE i.recipe_id = r.id), ''
+       )), 'B') ||
+       setweight(to_tsvector('english', r.description), 'C')
+FROM recipes_recipe r
+"""
+
+
+def is_supported(conn=connection):
+    return conn.vendor in ('sqlite', 'postgresql')
+
+
+def create_index(schema_editor):
+    """Create the index table and fill it from the current recipes."""
+    conn = schema_editor.connection
+    if conn.vendor == 'sqlite':
+        schema_editor.execute(SQLITE_CREATE_SQL)
+        schema_editor.execute(f"DELETE FROM {FTS_TABLE}")
+        schema_editor.execute(SQLITE_INDEX_SQL)
+    elif conn.vendor == 'postgresql':
+        for sql in POSTGRES_CREATE_SQL:
+            schema_editor.execute(sql)
+        schema_editor.execute(POSTGRES_INDEX_SQL + " ON CONFLICT (recipe_id) DO UPDATE SET document = EXCLUDED.document")
+
+
+def drop_index(schema_editor):
+    if is_supported(schema_editor.connection):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def _id_placeholders(recipe_ids):
+    return ', '.join(['%s'] * len(recipe_ids))
+
+
+def remove_recipes(recipe_ids):
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids or not is_supported():
+        return
+    key = 'rowid' if connection.vendor == 'sqlite' else 'recipe_id'
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE {key} IN ({_id_placeholders(recipe_ids)})", recipe_ids)
+
+
+def index_recipes(recipe_ids):
+    """(Re)build the search documents for the given recipe ids."""
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids or not is_supported():
+        return
+    where = f" WHERE r.id IN ({_id_placeholders(recipe_ids)})"
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({_id_placeholders(recipe_ids)})", recipe_ids)
+            cursor.execute(SQLITE_INDEX_SQL + where, recipe_ids)
+        else:
+            cursor.execute(
+                POSTGRES_INDEX_SQL + where + " ON CONFLICT (recipe_id) DO UPDATE SET document = EXCLUDED.document",
+                recipe_ids,
+            )
+
+
+def rebuild_index():
+    with connection.schema_editor() as schema_editor:
+        create_index(schema_editor)
+
+
+def parse_terms(query):
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def search_recipes(queryset, query):
+    """
+    Restrict ``queryset`` to recipes matching every term of ``query`` (each
+    term is prefix-matched) and order them by relevance.
+    """
+    terms = parse_terms(query)
+    if not terms:
+        return queryset
+
+    if connection.vendor == 'sqlite':
+        expression = ' '.join(f'"{term}"*' for term in terms)
+        matches = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+        rank = (
+            f"SELECT -bm25({FTS_TABLE}, {SQLITE_WEIGHTS}) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = recipes_recipe.id"
+        )
+    else:
+        expression = ' & '.join(f'{term}:*' for term in terms)
+        matches = f"SELECT recipe_id FROM {FTS_TABLE} WHERE document @@ to_tsquery('english', %s)"
+        rank = (
+            f"SELECT ts_rank(document, to_tsquery('english', %s)) FROM {FTS_TABLE} "
+            f"WHERE recipe_id = recipes_recipe.id"
+        )
+
+    return queryset.filter(pk__in=RawSQL(matches, [expression])).annotate(
+        search_rank=RawSQL(rank, [expression])
+    ).order_by('-search_rank', '-created_at')
+
+
+class RecipeSearchFilter(filters.SearchFilter):
+    """
+    ``?search=`` backed by the full-text index. Explicit ``?ordering=`` still
+    takes precedence since OrderingFilter runs afterwards.
+    """
+    def filter_queryset(self, request, queryset, view):
+        if not is_supported():
+            return super().filter_queryset(request, queryset, view)
+        query = request.query_params.get(self.search_param, '')
+        return search_recipes(queryset, query)
@@ -1,6 +1,11 @@
-from rest_framework import serializers
+from collections import OrderedDict
+from rest_framework import serializers, permissions
 from django.contrib.auth.models import User
-from .models import Recipe, Ingredient, Profile, Rating, Favorite
+from django.db import transaction
+from .models import Recipe, Ingredient, Profile, Rating, Favorite, GenerationJob
+from .signals import recipes_changed
+from .allergens import flag_names
+from .units import QUANTITY_FIELDS
 import json
 
 class UserSerializer(serializers.ModelSerializer):
@@ -18,37 +23,140 @@ class ProfileSerializer(serializers.ModelSerializer):
 class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ingredient
-        fields = ['id', 'name', 'amount', 'unit', 'notes']
+        fields = ['id', 'name', 'amount', 'unit', 'notes', 'quantity', 'quantity_max', 'canonical_unit']
+        read_only_fields = QUANTITY_FIELDS
 
-class RecipeSerializer(serializers.ModelSerializer):
-    ingredients = IngredientSerializer(many=True)
-    author = UserSerializer(read_only=True)
+class RecipeIngredientSerializer(IngredientSerializer):
+    # Writable so that updates can match incoming rows to existing ones.
+    id = serializers.IntegerField(required=False)
+
+class RecipeListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        recipes = list(data.all() if hasattr(data, 'all') else data)
+        self.child.load_user_state(recipes)
+        return super().to_representation(recipes)
+
+def parse_field_list(request, param):
+    if request is None:
+        return []
+    value = request.query_params.get(param, '')
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+class SparseFieldsetMixin:
+    """
+    Lets read requests trim the representation with ``?fields=a,b`` and pull
+    optional fields listed in ``Meta.expandable_fields`` with ``?expand=x,y``.
+    """
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in permissions.SAFE_METHODS:
+            return fields
+
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        for name in parse_field_list(request, 'expand'):
+            if name in expandable and name not in fields:
+                fields[name] = expandable[name]()
+
+        requested = parse_field_list(request, 'fields')
+        if requested:
+            fields = OrderedDict((name, field) for name, field in fields.items() if name in requested or name == 'id')
+        return fields
+
+class RecipeStateMixin:
+    """Computed per-user and rating fields shared by the recipe serializers."""
+
+    def _get_user(self):
+        request = self.context.get('request')
+        return request.user if request else None
+
+    def load_user_state(self, recipes):
+        """
+        Fetch the current user's favorites and ratings for a whole page of
+        recipes in two queries and keep them in the serializer context.
+        """
+        user = self._get_user()
+        if not user or not user.is_authenticated:
+            return
+        recipe_ids = [recipe.pk for recipe in recipes]
+        self.context['favorite_ids'] = set(
+            Favorite.objects.filter(user=user, recipe_id__in=recipe_ids).values_list('recipe_id', flat=True)
+        )
+        self.context['user_ratings'] = dict(
+            Rating.objects.filter(user=user, recipe_id__in=recipe_ids).values_list('recipe_id', 'score')
+        )
+
+    def get_rating_avg(self, obj):
+        # Annotated by RecipeViewSet.get_queryset(); see RecipeQuerySet.with_ratings()
+        return obj.rating_avg
+
+    def get_rating_count(self, obj):
+        return obj.rating_count
+
+    def get_is_favorited(self, obj):
+        user = self._get_user()
+        if not user or not user.is_authenticated:
+            return False
+        favorite_ids = self.context.get('favorite_ids')
+        if favorite_ids is not None:
+            return obj.pk in favorite_ids
+        return obj.favorited_by.filter(user=user).exists()
+
+    def get_user_rating(self, obj):
+        user = self._get_user()
+        if not user or not user.is_authenticated:
+            return 0
+        user_ratings = self.context.get('user_ratings')
+        if user_ratings is not None:
+            return user_ratings.get(obj.pk, 0)
+        rating = obj.ratings.filter(user=user).first()
+        return rating.score if rating else 0
+
+class RecipeSummarySerializer(SparseFieldsetMixin, RecipeStateMixin, serializers.ModelSerializer):
+    """
+    Compact representation used for recipe feeds. Heavier fields can be
+    requested with ``?expand=author,ingredients,description,instructions,tags``.
+    """
     rating_avg = serializers.SerializerMethodField()
+    rating_count = serializers.SerializerMethodField()
     is_favorited = serializers.SerializerMethodField()
     user_rating = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = '__all__'
+        fields = [
+            'id', 'title', 'image', 'image_url', 'prep_time', 'cook_time', 'servings', 'category',
+            'dietary_labels', 'rating_avg', 'rating_count', 'is_favorited', 'user_rating', 'created_at',
+        ]
+        read_only_fields = fields
+        list_serializer_class = RecipeListSerializer
+        expandable_fields = {
+            'author': lambda: UserSerializer(read_only=True),
+            'ingredients': lambda: IngredientSerializer(many=True, read_only=True),
+            'description': lambda: serializers.CharField(read_only=True),
+            'instructions': lambda: serializers.JSONField(read_only=True),
+            'tags': lambda: serializers.JSONField(read_only=True),
+        }
 
-    def get_rating_avg(self, obj):
-        ratings = obj.ratings.all()
-        if not ratings:
-            return 0
-        return sum(r.score for r in ratings) / len(ratings)
+class RecipeSerializer(SparseFieldsetMixin, RecipeStateMixin, serializers.ModelSerializer):
+    ingredients = RecipeIngredientSerializer(many=True)
+    author = UserSerializer(read_only=True)
+    rating_avg = serializers.SerializerMethodField()
+    rating_count = serializers.SerializerMethodField()
+    is_favorited = serializers.SerializerMethodField()
+    user_rating = serializers.SerializerMethodField()
 
-    def get_is_favorited(self, obj):
-        user = self.context.get('request').user
-        if user.is_authenticated:
-            return obj.favorited_by.filter(user=user).exists()
-        return False
+    allergens = serializers.SerializerMethodField()
 
-    def get_user_rating(self, obj):
-        user = self.context.get('request').user
-        if user.is_authenticated:
-            rating = obj.ratings.filter(user=user).first()
-            return rating.score if rating else 0
-        return 0
+    class Meta:
+        model = Recipe
+        # The trending score is maintained by refresh_trending and only used for ordering
+        exclude = ['trending_score']
+        read_only_fields = ['allergen_flags']
+        list_serializer_class = RecipeListSerializer
+
+    def get_allergens(self, obj):
+        return flag_names(obj.allergen_flags)
 
     def to_internal_value(self, data):
         # Handle multipart/form-data where complex fields are JSON strings
@@ -73,29 +181,118 @@ class RecipeSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         ingredients_data = validated_data.pop('ingredients')
-        recipe = Recipe.objects.create(**validated_data)
-        for ingredient_data in ingredients_data:
-            Ingredient.objects.create(recipe=recipe, **ingredient_data)
+        with transaction.atomic():
+            recipe = Recipe.objects.create(**validated_data)
+            Ingredient.objects.bulk_create(self.build_ingredients(recipe, ingredients_data))
+        recipes_changed([recipe.pk])
+        # The flags were written with a queryset update; return them too
+        recipe.refresh_from_db(fields=['allergen_flags'])
         return recipe
 
+    @staticmethod
+    def create_many(validated_items, **extra):
+        """
+        Insert many validated recipes with two bulk INSERTs (recipes, then
+        ingredients) inside one transaction.
+        """
+        ingredients_data = [item.pop('ingredients', []) for item in validated_items]
+        with transaction.atomic():
+            recipes = Recipe.objects.bulk_create([Recipe(**item, **extra) for item in validated_items])
+            Ingredient.objects.bulk_create([
+                ingredient
+                for recipe, rows in zip(recipes, ingredients_data)
+                for ingredient in RecipeSerializer.build_ingredients(recipe, rows)
+            ])
+        recipes_changed([recipe.pk for recipe in recipes])
+        return recipes
+
+    @staticmethod
+    def build_ingredients(recipe, ingredients_data):
+        rows = []
+        for position, ingredient_data in enumerate(ingredients_data):
+            ingredient_data = dict(ingredient_data, position=position)
+            ingredient_data.pop('id', None)
+            ingredient = Ingredient(recipe=recipe, **ingredient_data)
+            ingredient.parse_quantity()
+            rows.append(ingredient)
+        return rows
+
     def update(self, instance, validated_data):
         ingredients_data = validated_data.pop('ingredients', None)
-        
-        # Update recipe fields
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
 
-        # Update ingredients if provided
+        with transaction.atomic():
+            # Update recipe fields
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
+
+            # Update ingredients if provided
+            if ingredients_data is not None:
+                self.sync_ingredients(instance, ingredients_data)
+
         if ingredients_data is not None:
-            instance.ingredients.all().delete()
-            for ingredient_data in ingredients_data:
-                Ingredient.objects.create(recipe=instance, **ingredient_data)
-        
+            recipes_changed([instance.pk])
+            instance.refresh_from_db(fields=['allergen_flags'])
         return instance
 
+    def sync_ingredients(self, recipe, ingredients_data):
+        """
+        Diff the incoming ingredient list against the stored rows: rows are
+        matched by id, or else by name (preferring the same position). Only
+        changed rows are updated; new rows are bulk-inserted and missing
+        ones bulk-deleted.
+        """
+        existing = list(Ingredient.objects.filter(recipe=recipe))
+        by_id = {ingredient.pk: ingredient for ingredient in existing}
+        matched = {}
+        pending = []
+
+        for position, data in enumerate(ingredients_data):
+            ingredient = by_id.pop(data.get('id'), None)
+            if ingredient is not None:
+                matched[position] = ingredient
+            else:
+                pending.append(position)
+
+        for position in pending:
+            name = ingredients_data[position]['name'].strip().lower()
+            candidates = [ingredient for ingredient in by_id.values() if ingredient.name.strip().lower() == name]
+            if candidates:
+                same_position = [ingredient for ingredient in candidates if existing.index(ingredient) == position]
+                ingredient = (same_position or candidates)[0]
+                matched[position] = by_id.pop(ingredient.pk)
+
+        fields = ['name', 'amount', 'unit', 'notes', 'position']
+        to_create, to_update = [], []
+        for position, data in enumerate(ingredients_data):
+            values = {field: data.get(field, '') for field in fields if field != 'position'}
+            values['position'] = position
+            ingredient = matched.get(position)
+            if ingredient is None:
+                ingredient = Ingredient(recipe=recipe, **values)
+                ingredient.parse_quantity()
+                to_create.append(ingredient)
+            elif any(getattr(ingredient, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(ingredient, field, value)
+                ingredient.parse_quantity()
+                to_update.append(ingredient)
+
+        if by_id:
+            Ingredient.objects.filter(pk__in=list(by_id)).delete()
+        if to_update:
+            Ingredient.objects.bulk_update(to_update, fields + QUANTITY_FIELDS)
+        if to_create:
+            Ingredient.objects.bulk_create(to_create)
+
 class RatingSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     class Meta:
         model = Rating
         fields = '__all__'
+
+class GenerationJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = GenerationJob
+        fields = ['id', 'status', 'result', 'error', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
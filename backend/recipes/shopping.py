@@ -0,0 +1,73 @@
+"""
+Consolidated shopping list for several recipes.
+
+All ingredient rows of the requested recipes are read in one query and
+merged on (normalized name, canonical unit), using the quantities parsed
+at write time (see units.py). Amounts are scaled per recipe to the
+requested servings before they are summed. Quantities in different
+dimensions (cups of flour and grams of flour) stay separate lines, since
+converting between them would need a density.
+"""
+from collections import OrderedDict
+
+from .models import Ingredient
+from .units import format_amount, metric_unit
+from .vocabulary import normalize_ingredient
+
+
+def build_shopping_list(recipes, servings=None):
+    """
+    ``recipes`` maps recipe id -> stored servings, ``servings`` maps recipe
+    id -> requested servings. Returns the merged items sorted by name.
+    """
+    servings = servings or {}
+    rows = (
+        Ingredient.objects.filter(recipe_id__in=list(recipes)).order_by('recipe_id', 'position', 'id')
+        .values_list('recipe_id', 'name', 'amount', 'unit', 'quantity', 'quantity_max', 'canonical_unit')
+    )
+    items = OrderedDict()
+    for recipe_id, name, amount, unit, quantity, quantity_max, canonical_unit in rows:
+        key = (normalize_ingredient(name) or name.strip().lower(), canonical_unit if quantity is not None else '')
+        item = items.get(key)
+        if item is None:
+            item = items[key] = {
+                'name': name.strip(),
+                'quantity': None,
+                'quantity_max': None,
+                'ranged': False,
+                'canonical_unit': key[1],
+                'notes': [],
+                'recipes': [],
+            }
+        if recipe_id not in item['recipes']:
+            item['recipes'].append(recipe_id)
+        if quantity is None:
+            text = f'{amount} {unit}'.strip()
+            if text and text not in item['notes']:
+                item['notes'].append(text)
+            continue
+        ratio = servings[recipe_id] / recipes[recipe_id] if recipe_id in servings and recipes[recipe_id] > 0 else 1.0
+        # Track both ends of the range; it is reported only if some row had one
+        item['quantity'] = (item['quantity'] or 0.0) + quantity * ratio
+        item['quantity_max'] = (item['quantity_max'] or 0.0) + (quantity_max if quantity_max is not None else quantity) * ratio
+        item['ranged'] |= quantity_max is not None
+
+    results = []
+    for item in items.values():
+        if not item.pop('ranged'):
+            item['quantity_max'] = None
+        if item['quantity'] is not None:
+            display, factor = metric_unit(item['quantity'], item['canonical_unit'])
+            item['amount'] = format_amount(item['quantity'] / factor)
+            if item['quantity_max'] is not None:
+                item['amount'] += f"-{format_amount(item['quantity_max'] / factor)}"
+            item['unit'] = display
+            item['quantity'] = round(item['quantity'], 3)
+            if item['quantity_max'] is not None:
+                item['quantity_max'] = round(item['quantity_max'], 3)
+        else:
+            item['amount'] = ''
+            item['unit'] = ''
+        results.append(item)
+    results.sort(key=lambda item: (item['name'].lower(), item['canonical_unit']))
+    return results
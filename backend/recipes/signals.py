@@ -0,0 +1,64 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Recipe, Ingredient, Rating, Favorite
+from . import search
+from .cache import invalidate_recipe, invalidate_recipes
+from .pantry import pantry_index
+from .labels import sync_recipe_labels
+from .allergens import update_recipe_flags
+from .similarity import similarity_index
+
+
+def recipes_changed(recipe_ids):
+    """
+    Refresh everything derived from recipes after bulk writes, which bypass
+    model signals (bulk_create, queryset update/delete).
+    """
+    recipe_ids = list(recipe_ids)
+    update_recipe_flags(recipe_ids)
+    sync_recipe_labels(recipe_ids)
+    search.index_recipes(recipe_ids)
+    invalidate_recipes(recipe_ids)
+    pantry_index.mark_dirty(recipe_ids)
+    similarity_index.mark_dirty(recipe_ids)
+
+
+@receiver(post_save, sender=Recipe)
+def index_saved_recipe(sender, instance, **kwargs):
+    search.index_recipes([instance.pk])
+    similarity_index.mark_dirty([instance.pk])
+    update_fields = kwargs.get('update_fields')
+    if update_fields is None or {'tags', 'dietary_labels'} & set(update_fields):
+        sync_recipe_labels([instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_deleted_recipe(sender, instance, **kwargs):
+    search.remove_recipes([instance.pk])
+    pantry_index.mark_dirty([instance.pk])
+    similarity_index.mark_dirty([instance.pk])
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def reindex_ingredient_recipe(sender, instance, **kwargs):
+    update_recipe_flags([instance.recipe_id])
+    search.index_recipes([instance.recipe_id])
+    pantry_index.mark_dirty([instance.recipe_id])
+    similarity_index.mark_dirty([instance.recipe_id])
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_cached_recipe(sender, instance, **kwargs):
+    invalidate_recipe(instance.pk)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def invalidate_cached_related_recipe(sender, instance, **kwargs):
+    invalidate_recipe(instance.recipe_id)
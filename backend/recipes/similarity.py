@@ -0,0 +1,163 @@
+"""
+Content-based "similar recipes" over a sparse TF-IDF matrix.
+
+Each recipe is described by its normalized ingredient phrases, its tags
+and its category. The whole catalog is vectorized in one batch into an
+L2-normalized CSR matrix, so finding the neighbours of a recipe is a
+single sparse vector x matrix product followed by a partial sort.
+
+A dirty matrix is rebuilt at most every SIMILARITY_REBUILD_INTERVAL
+seconds (see indexes.py); in the meantime a dirty query recipe is
+re-vectorized from the database so its own edits show immediately.
+"""
+import math
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from scipy import sparse
+
+from .indexes import RebuildingIndex
+from .labels import normalize_label
+from .models import Ingredient, Recipe
+from .vocabulary import PANTRY_STAPLES, normalize_ingredient
+
+INGREDIENT_WEIGHT = 1.0
+TAG_WEIGHT = 0.7
+CATEGORY_WEIGHT = 0.5
+
+
+def recipe_features(tags, category, ingredient_names):
+    """Weighted bag of terms describing a recipe."""
+    features = {}
+    for name in ingredient_names:
+        phrase = normalize_ingredient(name)
+        if phrase and phrase not in PANTRY_STAPLES:
+            features[f'ingredient:{phrase}'] = INGREDIENT_WEIGHT
+    for tag in tags if isinstance(tags, list) else []:
+        label = normalize_label(tag)
+        if label:
+            features[f'tag:{label}'] = TAG_WEIGHT
+    if category:
+        features[f'category:{normalize_label(category)}'] = CATEGORY_WEIGHT
+    return features
+
+
+def load_features(recipe_ids=None):
+    recipes = Recipe.objects.order_by('pk').values_list('pk', 'tags', 'category')
+    ingredients = Ingredient.objects.order_by().values_list('recipe_id', 'name')
+    if recipe_ids is not None:
+        recipes = recipes.filter(pk__in=recipe_ids)
+        ingredients = ingredients.filter(recipe_id__in=recipe_ids)
+    names = defaultdict(list)
+    for recipe_id, name in ingredients.iterator(chunk_size=5000):
+        names[recipe_id].append(name)
+    return {
+        recipe_id: recipe_features(tags, category, names[recipe_id])
+        for recipe_id, tags, category in recipes.iterator(chunk_size=5000)
+    }
+
+
+class SimilarityIndex(RebuildingIndex):
+    thread_name = 'similarity-rebuild'
+
+    def __init__(self):
+        super().__init__()
+        self.vocabulary = {}
+        self.idf = None
+        self.recipe_ids = np.zeros(0, dtype=np.int64)
+        self.rows = {}
+        self.matrix = None
+        self.matrix_t = None
+
+    def load(self):
+        features = load_features()
+        vocabulary = {}
+        document_frequency = defaultdict(int)
+        for terms in features.values():
+            for term in terms:
+                if term not in vocabulary:
+                    vocabulary[term] = len(vocabulary)
+                document_frequency[vocabulary[term]] += 1
+
+        total = len(features)
+        idf = np.ones(len(vocabulary), dtype=np.float32)
+        for column, frequency in document_frequency.items():
+            idf[column] = math.log((1 + total) / (1 + frequency)) + 1
+
+        indptr, indices, data = [0], [], []
+        for terms in features.values():
+            for term, weight in terms.items():
+                indices.append(vocabulary[term])
+                data.append(weight)
+            indptr.append(len(indices))
+        matrix = sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+            shape=(total, len(vocabulary)),
+        )
+        matrix = self._normalize(matrix @ sparse.diags(idf))
+
+        recipe_ids = np.fromiter(features.keys(), dtype=np.int64, count=total)
+        return vocabulary, idf, recipe_ids, matrix, matrix.T.tocsr()
+
+    def install(self, data):
+        self.vocabulary, self.idf, self.recipe_ids, self.matrix, self.matrix_t = data
+        self.rows = {int(recipe_id): row for row, recipe_id in enumerate(self.recipe_ids)}
+
+    @staticmethod
+    def _normalize(matrix):
+        matrix = matrix.tocsr()
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sparse.diags(1.0 / norms) @ matrix
+
+    def is_stale(self, built_at):
+        interval = getattr(settings, 'SIMILARITY_REBUILD_INTERVAL', 300)
+        return bool(self._dirty) and time.monotonic() - built_at > interval
+
+    def vectorize(self, features, vocabulary, idf):
+        """
+        Vectorize ``features`` against ``vocabulary`` and ``idf``, which must
+        come from the same build as the matrix the vector is compared to.
+        """
+        columns, values = [], []
+        for term, weight in features.items():
+            column = vocabulary.get(term)
+            if column is not None:
+                columns.append(column)
+                values.append(weight * idf[column])
+        vector = sparse.csr_matrix(
+            (np.asarray(values, dtype=np.float32), (np.zeros(len(columns), dtype=np.int32), columns)),
+            shape=(1, len(vocabulary)),
+        )
+        return self._normalize(vector)
+
+    def similar(self, recipe_id, limit=10):
+        """Return [(recipe_id, cosine similarity)] of the closest recipes."""
+        self.refresh()
+        with self._lock:
+            # A background rebuild may swap all of these; take them as one set
+            vocabulary, idf = self.vocabulary, self.idf
+            matrix_t, recipe_ids = self.matrix_t, self.recipe_ids
+            row = self.rows.get(recipe_id)
+            dirty = recipe_id in self._dirty
+            vector = self.matrix[row] if row is not None and not dirty else None
+        if vector is None:
+            features = load_features([recipe_id]).get(recipe_id)
+            if not features:
+                return []
+            vector = self.vectorize(features, vocabulary, idf)
+
+        scores = (vector @ matrix_t).tocsr()
+        candidates, values = scores.indices, scores.data
+        keep = recipe_ids[candidates] != recipe_id
+        candidates, values = candidates[keep], values[keep]
+        if len(values) > limit:
+            top = np.argpartition(-values, limit)[:limit]
+            candidates, values = candidates[top], values[top]
+        order = np.argsort(-values, kind='stable')
+        return [(int(recipe_ids[candidates[i]]), round(float(values[i]), 4)) for i in order]
+
+
+similarity_index = SimilarityIndex()
@@ -0,0 +1,107 @@
+"""
+Server-Sent Events for streamed recipe generation.
+
+The model writes the recipe as one JSON object, in the field order the
+prompt asks for (title, description, ingredients, instructions, ...).
+JSONFieldStream watches the growing text and reports each top-level member
+as soon as its value is complete, so the client can show the title and
+description while the ingredients and steps are still being generated.
+The last event carries the whole recipe after validation.
+"""
+import json
+
+from .ai_utils import parse_recipe_text, validate_generated_recipe
+
+RECIPE_FIELDS = (
+    'title', 'description', 'ingredients', 'instructions', 'prep_time', 'cook_time', 'servings', 'category',
+)
+WHITESPACE = ' \t\n\r'
+
+_decoder = json.JSONDecoder()
+
+
+class JSONFieldStream:
+    """Incremental reader of the top-level members of a JSON object."""
+
+    def __init__(self):
+        self.buffer = ''
+        self.pos = None
+        self.done = False
+
+    def feed(self, text):
+        """Add ``text`` and return the (key, value) members it completed."""
+        self.buffer += text
+        if self.pos is None:
+            start = self.buffer.find('{')
+            if start < 0:
+                return []
+            self.pos = start + 1
+        members = []
+        while not self.done:
+            member = self._next_member()
+            if member is None:
+                break
+            members.append(member)
+        return members
+
+    def _skip(self, pos):
+        while pos < len(self.buffer) and self.buffer[pos] in WHITESPACE:
+            pos += 1
+        return pos
+
+    def _next_member(self):
+        buffer = self.buffer
+        pos = self._skip(self.pos)
+        if pos < len(buffer) and buffer[pos] == ',':
+            pos = self._skip(pos + 1)
+        if pos >= len(buffer):
+            return None
+        if buffer[pos] != '"':
+            # '}' closes the object; anything else is not JSON we can follow
+            self.done = True
+            return None
+        try:
+            key, pos = _decoder.raw_decode(buffer, pos)
+            pos = self._skip(pos)
+            if pos >= len(buffer):
+                return None
+            if buffer[pos] != ':':
+                self.done = True
+                return None
+            pos = self._skip(pos + 1)
+            value, end = _decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Incomplete so far
+            return None
+        # A number at the very end of the text may still be growing ("1" -> "15")
+        if end >= len(buffer) and isinstance(value, (int, float)) and not isinstance(value, bool):
+            return None
+        self.pos = end
+        return key, value
+
+
+def sse_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+def recipe_events(chunks):
+    """Turn the streamed response text of a recipe generation into SSE events."""
+    parser = JSONFieldStream()
+    text = []
+    try:
+        for chunk in chunks:
+            text.append(chunk)
+            for key, value in parser.feed(chunk):
+                if key in RECIPE_FIELDS:
+                    yield sse_event(key, value)
+    except Exception as e:
+        yield sse_event('error', {'error': str(e)})
+        return
+
+    raw_response = ''.join(text)
+    try:
+        recipe_data = validate_generated_recipe(parse_recipe_text(raw_response))
+    except ValueError as e:
+        yield sse_event('error', {'error': 'Failed to parse AI response', 'detail': str(e), 'raw_response': raw_response})
+        return
+    yield sse_event('done', recipe_data)
@@ -0,0 +1,70 @@
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from ..allergens import DAIRY, EGG, GLUTEN, MEAT, PEANUT, SOY, TREE_NUT, ingredient_flags, preference_mask
+from ..cache import get_cache
+from ..models import Profile
+from .utils import make_recipe
+
+
+class IngredientFlagsTests(SimpleTestCase):
+    def test_words_and_phrases(self):
+        self.assertEqual(ingredient_flags('2 Large Eggs'), EGG)
+        self.assertEqual(ingredient_flags('unsalted butter'), DAIRY)
+        self.assertEqual(ingredient_flags('peanut butter'), PEANUT)
+        self.assertEqual(ingredient_flags('1 can coconut milk'), 0)
+        self.assertEqual(ingredient_flags('soy sauce'), SOY | GLUTEN)
+        self.assertEqual(ingredient_flags('almond flour'), TREE_NUT)
+        self.assertEqual(ingredient_flags('chicken breasts'), MEAT)
+
+    def test_preference_mask(self):
+        self.assertEqual(preference_mask(['Gluten Free'], ['peanuts']), GLUTEN | PEANUT)
+        self.assertTrue(preference_mask(['vegan'], []) & (MEAT | DAIRY | EGG))
+        self.assertEqual(preference_mask(['keto'], []), 0)
+
+
+class SafeForMeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('cook')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        make_recipe(self.user, 'Omelette', ['eggs', 'butter'])
+        make_recipe(self.user, 'Satay', ['chicken', 'peanut butter'])
+        make_recipe(self.user, 'Salad', ['lettuce', 'tomato', 'olive oil'])
+
+    def titles(self, client=None, **params):
+        response = (client or self.client).get('/api/recipes/', params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(recipe['title'] for recipe in response.json()['results'])
+
+    def set_preferences(self, restrictions, allergies):
+        Profile.objects.filter(user=self.user).update(dietary_restrictions=restrictions, allergies=allergies)
+
+    def test_hides_recipes_the_profile_rules_out(self):
+        self.set_preferences(['vegetarian'], ['peanut'])
+        self.assertEqual(self.titles(safe_for_me='1'), ['Omelette', 'Salad'])
+        self.set_preferences(['vegan'], [])
+        self.assertEqual(self.titles(safe_for_me='true'), ['Salad'])
+
+    def test_ignored_when_off_or_anonymous(self):
+        self.set_preferences(['vegan'], [])
+        self.assertEqual(self.titles(safe_for_me='0'), ['Omelette', 'Salad', 'Satay'])
+        get_cache().clear()
+        self.assertEqual(self.titles(APIClient(), safe_for_me='1'), ['Omelette', 'Salad', 'Satay'])
+
+    def test_flags_follow_ingredient_changes(self):
+        response = self.client.post('/api/recipes/', {
+            'title': 'Toast', 'description': 'Buttered toast', 'prep_time': 1, 'cook_time': 2, 'servings': 1,
+            'ingredients': [{'name': 'bread', 'amount': '2', 'unit': 'slices'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['allergens'], ['gluten'])
+
+        url = f"/api/recipes/{response.json()['id']}/"
+        response = self.client.patch(url, {
+            'ingredients': [{'name': 'bread', 'amount': '2', 'unit': 'slices'}, {'name': 'butter', 'amount': '1', 'unit': 'tbsp'}],
+        }, format='json')
+        self.assertEqual(response.json()['allergens'], ['gluten', 'dairy'])
+        self.set_preferences(['dairy free'], [])
+        self.assertNotIn('Toast', self.titles(safe_for_me='1'))
@@ -0,0 +1,80 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from ..cache import get_cache
+from ..models import Rating, Recipe
+from ..signals import recipes_changed
+from .utils import make_recipe
+
+
+class CachedReadTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.addCleanup(get_cache().clear)
+        self.user = User.objects.create_user('cook')
+        self.recipe = make_recipe(self.user, 'Pancakes', ['flour', 'egg'])
+        self.other = make_recipe(self.user, 'Omelette', ['egg'])
+        self.client = APIClient()
+
+    def detail_url(self, recipe):
+        return f'/api/recipes/{recipe.pk}/'
+
+    def test_anonymous_reads_are_served_from_cache(self):
+        first = self.client.get('/api/recipes/')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/recipes/')
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_query_string_is_part_of_the_key(self):
+        self.client.get('/api/recipes/', {'search': 'pancakes'})
+        response = self.client.get('/api/recipes/', {'search': 'omelette'})
+        self.assertEqual([recipe['title'] for recipe in response.json()['results']], ['Omelette'])
+
+    def test_if_none_match_answers_304(self):
+        etag = self.client.get(self.detail_url(self.recipe))['ETag']
+        response = self.client.get(self.detail_url(self.recipe), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        response = self.client.get(self.detail_url(self.recipe), HTTP_IF_NONE_MATCH='"stale", ' + etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(self.detail_url(self.recipe), HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_authenticated_reads_are_revalidated_but_not_cached(self):
+        self.client.force_authenticate(self.user)
+        etag = self.client.get(self.detail_url(self.recipe))['ETag']
+        self.assertEqual(self.client.get(self.detail_url(self.recipe), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Recipe.objects.filter(pk=self.recipe.pk).update(title='Crepes')
+        response = self.client.get(self.detail_url(self.recipe), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['title'], 'Crepes')
+
+    def test_saving_a_recipe_invalidates_its_detail_and_the_lists(self):
+        etag = self.client.get(self.detail_url(self.recipe))['ETag']
+        self.client.get('/api/recipes/')
+        self.client.get(self.detail_url(self.other))
+
+        self.recipe.title = 'Crepes'
+        self.recipe.save()
+        response = self.client.get(self.detail_url(self.recipe), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['title'], 'Crepes')
+        self.assertIn('Crepes', [recipe['title'] for recipe in self.client.get('/api/recipes/').json()['results']])
+        # Other recipes keep their cached detail
+        with self.assertNumQueries(0):
+            self.client.get(self.detail_url(self.other))
+
+    def test_related_writes_invalidate_the_recipe(self):
+        self.client.get(self.detail_url(self.recipe))
+        Rating.objects.create(user=self.user, recipe=self.recipe, score=4)
+        self.assertEqual(self.client.get(self.detail_url(self.recipe)).json()['rating_count'], 1)
+
+    def test_bulk_writes_invalidate_through_recipes_changed(self):
+        self.client.get(self.detail_url(self.recipe))
+        Recipe.objects.filter(pk=self.recipe.pk).update(title='Crepes')
+        self.assertEqual(self.client.get(self.detail_url(self.recipe)).json()['title'], 'Pancakes')
+        recipes_changed([self.recipe.pk])
+        self.assertEqual(self.client.get(self.detail_url(self.recipe)).json()['title'], 'Crepes')
@@ -0,0 +1,97 @@
+import datetime
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from .. import coalesce
+from ..ai_cache import ai_cache
+from ..models import AICallLock
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        # Only the in-process coalescing; call_across_processes is covered below
+        patcher = mock.patch.object(coalesce, 'call_across_processes', lambda key, fn: fn())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.flight = coalesce.SingleFlight()
+
+    def run_concurrently(self, key, fn, callers=5):
+        results, errors = [], []
+
+        def call():
+            try:
+                results.append(self.flight.do(key, fn))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(callers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        return results, errors
+
+    def slow_call(self, result=None, error=None):
+        release = threading.Event()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            release.wait(5)
+            if error is not None:
+                raise error
+            return result
+
+        # Hold the leader until every caller has joined its flight
+        threading.Timer(0.2, release.set).start()
+        return fn, calls
+
+    def test_concurrent_callers_share_one_call(self):
+        fn, calls = self.slow_call(result={'alternatives': []})
+        results, errors = self.run_concurrently('ai:substitute:x', fn)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'alternatives': []}] * 5)
+        self.assertEqual(errors, [])
+
+    def test_errors_reach_every_caller(self):
+        fn, calls = self.slow_call(error=RuntimeError('model down'))
+        results, errors = self.run_concurrently('ai:substitute:x', fn)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([str(e) for e in errors], ['model down'] * 5)
+
+    def test_later_calls_are_not_coalesced(self):
+        self.assertEqual(self.flight.do('key', lambda: 1), 1)
+        self.assertEqual(self.flight.do('key', lambda: 2), 2)
+
+
+class CallAcrossProcessesTests(TestCase):
+    KEY = 'ai:substitute:x'
+
+    def setUp(self):
+        ai_cache.shared.clear()
+        self.addCleanup(ai_cache.shared.clear)
+
+    def hold_lock(self, expires_in=60):
+        AICallLock.objects.create(
+            key=self.KEY, owner='other-process', expires_at=timezone.now() + datetime.timedelta(seconds=expires_in),
+        )
+
+    def test_leader_publishes_and_releases(self):
+        self.assertEqual(coalesce.call_across_processes(self.KEY, lambda: 'answer'), 'answer')
+        self.assertFalse(AICallLock.objects.exists())
+        self.assertEqual(ai_cache.shared.get(f'{self.KEY}:result'), {'value': 'answer'})
+
+    def test_waits_for_the_other_process(self):
+        self.hold_lock()
+        ai_cache.shared.set(f'{self.KEY}:result', {'value': 'theirs'})
+        fn = mock.Mock(return_value='ours')
+        self.assertEqual(coalesce.call_across_processes(self.KEY, fn), 'theirs')
+        fn.assert_not_called()
+
+    def test_takes_over_an_expired_lock(self):
+        self.hold_lock(expires_in=-1)
+        self.assertEqual(coalesce.call_across_processes(self.KEY, lambda: 'ours'), 'ours')
+        self.assertFalse(AICallLock.objects.exists())
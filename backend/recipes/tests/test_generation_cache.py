@@ -0,0 +1,69 @@
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from ..ai_utils import generation_cache
+from ..generation_cache import GenerationCache, canonical_ingredients
+from ..llm import FAKE_RECIPE, FakeProvider, set_provider
+from ..models import Profile
+
+BASE = frozenset(['chicken', 'rice', 'onion', 'garlic', 'spinach'])
+VEGAN = (('vegan',), (), 'model')
+
+
+class GenerationCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = GenerationCache()
+        self.cache.add(BASE, (), {'title': 'Chicken rice'})
+
+    def test_near_duplicates_hit(self):
+        self.assertEqual(self.cache.get(BASE, ()), ({'title': 'Chicken rice'}, 1.0))
+        recipe, similarity = self.cache.get(BASE | {'ginger'}, ())
+        self.assertEqual(recipe, {'title': 'Chicken rice'})
+        self.assertAlmostEqual(similarity, 5 / 6)
+        self.assertIsNone(self.cache.get(BASE | {'ginger', 'leek'}, ()))
+
+    def test_cached_ingredients_must_all_be_available(self):
+        self.assertIsNone(self.cache.get(BASE - {'garlic'} | {'ginger'}, ()))
+        self.assertIsNone(self.cache.get(BASE - {'garlic'}, ()))
+
+    def test_profiles_are_kept_apart(self):
+        self.assertIsNone(self.cache.get(BASE, VEGAN))
+        self.cache.add(BASE, VEGAN, {'title': 'Tofu rice'})
+        self.assertEqual(self.cache.get(BASE, VEGAN)[0], {'title': 'Tofu rice'})
+        self.assertEqual(self.cache.get(BASE, ())[0], {'title': 'Chicken rice'})
+
+    def test_staples_are_ignored(self):
+        self.assertEqual(canonical_ingredients('Rice, 2 onions, salt, pepper'), canonical_ingredients('rice, onion'))
+
+
+class GenerateRecipeCacheTests(TestCase):
+    def setUp(self):
+        generation_cache.clear()
+        self.addCleanup(generation_cache.clear)
+        self.addCleanup(set_provider, set_provider(FakeProvider(latency=0)))
+        self.user = User.objects.create_user('cook')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def generate(self, ingredients, **data):
+        return self.client.post('/api/generate-recipe/', dict(data, ingredients=ingredients), format='json')
+
+    def test_similar_requests_are_served_from_cache(self):
+        response = self.generate('chicken, rice, onion, garlic, spinach')
+        self.assertEqual((response.status_code, response['X-Cache']), (200, 'miss'))
+        self.assertEqual(response.json()['title'], FAKE_RECIPE['title'])
+
+        response = self.generate('chicken, rice, onion, garlic, spinach, ginger')
+        self.assertEqual((response['X-Cache'], response['X-Cache-Similarity']), ('similar', '0.83'))
+        self.assertTrue(response.json()['cached'])
+        self.assertEqual(self.generate('chicken, rice, onion, garlic, spinach', fresh=True)['X-Cache'], 'miss')
+
+        Profile.objects.filter(user=self.user).update(dietary_restrictions=['vegan'])
+        self.assertEqual(self.generate('chicken, rice, onion, garlic, spinach')['X-Cache'], 'miss')
+
+    def test_ingredients_must_be_text(self):
+        for ingredients in [['eggs'], {'name': 'eggs'}, 5, '   ']:
+            with self.subTest(ingredients=ingredients):
+                response = self.generate(ingredients)
+                self.assertEqual(response.status_code, 400)
@@ -0,0 +1,41 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from ..models import Ingredient
+from ..serializers import RecipeSerializer
+from .utils import make_recipe
+
+
+class SyncIngredientsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('cook')
+        self.recipe = make_recipe(self.user, 'Pancakes', ['flour', 'egg', 'milk'])
+        self.ids = {row.name: row.pk for row in self.recipe.ingredients.all()}
+
+    def sync(self, ingredients):
+        data = [dict({'amount': '1', 'unit': 'pc', 'notes': ''}, **item) for item in ingredients]
+        RecipeSerializer().sync_ingredients(self.recipe, data)
+        return list(self.recipe.ingredients.order_by('position').values_list('pk', 'name', 'position'))
+
+    def test_matches_by_name_when_reordered(self):
+        rows = self.sync([{'name': 'milk'}, {'name': 'Flour'}, {'name': 'egg'}])
+        self.assertEqual(rows, [(self.ids['milk'], 'milk', 0), (self.ids['flour'], 'Flour', 1), (self.ids['egg'], 'egg', 2)])
+
+    def test_id_match_wins_over_name(self):
+        rows = self.sync([{'id': self.ids['egg'], 'name': 'duck egg'}, {'name': 'flour'}, {'name': 'milk'}])
+        self.assertEqual(rows[0], (self.ids['egg'], 'duck egg', 0))
+        self.assertEqual([row[0] for row in rows[1:]], [self.ids['flour'], self.ids['milk']])
+
+    def test_duplicate_names_prefer_same_position(self):
+        recipe = make_recipe(self.user, 'Salt twice', ['salt', 'pepper', 'salt'])
+        first, _, last = recipe.ingredients.order_by('position').values_list('pk', flat=True)
+        self.recipe = recipe
+        rows = self.sync([{'name': 'oil'}, {'name': 'pepper'}, {'name': 'salt'}])
+        self.assertEqual(rows[2][0], last)
+        self.assertNotIn(first, [row[0] for row in rows])
+
+    def test_new_rows_created_and_missing_deleted(self):
+        rows = self.sync([{'name': 'flour'}, {'name': 'sugar'}])
+        self.assertEqual(rows[0][0], self.ids['flour'])
+        self.assertNotIn(rows[1][0], self.ids.values())
+        self.assertFalse(Ingredient.objects.filter(pk__in=[self.ids['egg'], self.ids['milk']]).exists())
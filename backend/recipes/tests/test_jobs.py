@@ -0,0 +1,119 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .. import jobs
+from ..models import GenerationJob
+
+
+class GenerationJobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('cook')
+        patcher = mock.patch.object(jobs, 'get_executor')
+        self.executor = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def make_job(self, status=GenerationJob.PENDING, age=0, **fields):
+        job = GenerationJob.objects.create(user=self.user, status=status, params={'ingredients': 'eggs'}, **fields)
+        if age:
+            created_at = timezone.now() - datetime.timedelta(seconds=age)
+            started_at = created_at if status == GenerationJob.RUNNING else None
+            GenerationJob.objects.filter(pk=job.pk).update(created_at=created_at, started_at=started_at)
+        return job
+
+    def test_enqueue_submits_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            job = jobs.enqueue_generation(self.user, 'eggs, flour', 'vegetarian')
+            self.assertNotIn(mock.call(jobs.run_job, job.pk), self.executor.submit.call_args_list)
+        self.assertEqual(len(callbacks), 1)
+        self.executor.submit.assert_any_call(jobs.run_job, job.pk)
+        self.assertEqual(job.params['restrictions'], 'vegetarian')
+
+    def test_enqueue_rejects_non_text_ingredients(self):
+        for ingredients in ['', '  ', ['eggs'], None]:
+            with self.subTest(ingredients=ingredients), self.assertRaises(ValueError):
+                jobs.enqueue_generation(self.user, ingredients)
+        self.assertFalse(GenerationJob.objects.exists())
+
+    def test_a_job_is_claimed_once(self):
+        job = self.make_job()
+        self.assertEqual(jobs.claim_next(), job.pk)
+        self.assertFalse(jobs.claim(job.pk))
+        self.assertIsNone(jobs.claim_next())
+
+    def test_run_job_records_the_result(self):
+        recipe = {'title': 'Omelette'}
+        job = self.make_job()
+        with mock.patch.object(jobs, 'generate_recipe_with_cache', return_value=(recipe, None)):
+            jobs.run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), (GenerationJob.SUCCEEDED, recipe))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_run_job_records_failures(self):
+        job = self.make_job()
+        with mock.patch.object(jobs, 'generate_recipe_with_cache', side_effect=RuntimeError('model down')):
+            jobs.run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (GenerationJob.FAILED, 'model down'))
+
+        job = self.make_job()
+        with mock.patch.object(jobs, 'generate_recipe_with_cache', return_value=({'error': 'bad JSON'}, None)):
+            jobs.run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (GenerationJob.FAILED, 'bad JSON'))
+
+    def test_stale_jobs_are_requeued_and_not_counted(self):
+        stale = self.make_job(GenerationJob.RUNNING, age=3600)
+        self.make_job(GenerationJob.RUNNING, started_at=timezone.now())
+        self.make_job()
+        self.assertEqual(jobs.backlog(), 2)
+        self.assertEqual(jobs.requeue_stale_jobs(timeout=60), 1)
+        stale.refresh_from_db()
+        self.assertEqual((stale.status, stale.started_at), (GenerationJob.PENDING, None))
+
+    def test_purge_keeps_recent_and_unfinished_jobs(self):
+        self.make_job(GenerationJob.SUCCEEDED, age=3600)
+        self.make_job(GenerationJob.FAILED, age=3600)
+        recent = self.make_job(GenerationJob.SUCCEEDED)
+        pending = self.make_job(age=3600)
+        self.assertEqual(jobs.purge_finished_jobs(retention=60), 2)
+        self.assertEqual(set(GenerationJob.objects.values_list('pk', flat=True)), {recent.pk, pending.pk})
+
+
+class GenerationJobEndpointTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('cook')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        patcher = mock.patch.object(jobs, 'get_executor')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_async_generation_is_polled(self):
+        response = self.client.post('/api/generate-recipe/', {'ingredients': 'eggs, flour', 'async': True}, format='json')
+        self.assertEqual(response.status_code, 202)
+        status_url = response.json()['status_url']
+
+        response = self.client.get(status_url)
+        self.assertEqual(response.json()['status'], GenerationJob.PENDING)
+        self.assertEqual(response['Retry-After'], '1')
+
+        GenerationJob.objects.update(status=GenerationJob.SUCCEEDED, result={'title': 'Crepes'})
+        response = self.client.get(status_url)
+        self.assertEqual(response.json()['result'], {'title': 'Crepes'})
+        self.assertFalse(response.has_header('Retry-After'))
+
+    def test_jobs_are_private(self):
+        job = GenerationJob.objects.create(user=User.objects.create_user('other'))
+        self.assertEqual(self.client.get(f'/api/generate-recipe/{job.pk}/').status_code, 404)
+
+    def test_full_queue_answers_503(self):
+        with self.settings(GENERATION_QUEUE_LIMIT=0):
+            response = self.client.post('/api/generate-recipe/', {'ingredients': 'eggs', 'async': True}, format='json')
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(GenerationJob.objects.exists())
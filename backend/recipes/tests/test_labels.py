@@ -0,0 +1,45 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from ..models import Recipe, RecipeLabel
+from ..signals import recipes_changed
+from .utils import make_recipe
+
+
+class LabelFilterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('cook')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.salad = make_recipe(self.user, 'Salad', tags=['Quick', 'Summer'], dietary_labels=['Vegan', 'Gluten Free'])
+        self.stew = make_recipe(self.user, 'Stew', tags=['winter', 'quick'], dietary_labels=['gluten_free'])
+        self.cake = make_recipe(self.user, 'Cake', tags=['Dessert'], dietary_labels=[])
+
+    def titles(self, **params):
+        response = self.client.get('/api/recipes/', params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(recipe['title'] for recipe in response.json()['results'])
+
+    def test_labels_are_normalized(self):
+        self.assertEqual(
+            sorted(RecipeLabel.objects.filter(recipe=self.salad).values_list('kind', 'value')),
+            [('dietary', 'gluten-free'), ('dietary', 'vegan'), ('tag', 'quick'), ('tag', 'summer')],
+        )
+        self.assertEqual(self.titles(dietary_labels='GLUTEN-free'), ['Salad', 'Stew'])
+
+    def test_all_labels_must_match_by_default(self):
+        self.assertEqual(self.titles(tags='quick,summer'), ['Salad'])
+        self.assertEqual(self.titles(tags='quick,summer', tags_match='any'), ['Salad', 'Stew'])
+        self.assertEqual(self.titles(tags='dessert,winter', tags_match='any'), ['Cake', 'Stew'])
+        self.assertEqual(self.titles(tags='quick', dietary_labels='vegan'), ['Salad'])
+        self.assertEqual(self.titles(tags='unknown'), [])
+
+    def test_labels_follow_recipe_updates(self):
+        self.cake.tags = ['Quick']
+        self.cake.save(update_fields=['tags'])
+        self.assertEqual(self.titles(tags='quick'), ['Cake', 'Salad', 'Stew'])
+        # Bulk updates bypass the save signal and go through recipes_changed
+        Recipe.objects.filter(pk=self.salad.pk).update(tags=[])
+        recipes_changed([self.salad.pk])
+        self.assertEqual(self.titles(tags='quick'), ['Cake', 'Stew'])
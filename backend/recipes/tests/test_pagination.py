@@ -0,0 +1,66 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from ..models import Recipe
+from .utils import make_recipe
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('cook', password='secret')
+        # Authenticated requests bypass the anonymous response cache
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_page(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def walk(self, params):
+        """Follow next links from the first page, then previous links back."""
+        pages = [self.get_page('/api/recipes/', params)]
+        while pages[-1]['next']:
+            pages.append(self.get_page(pages[-1]['next']))
+        forward = [[recipe['id'] for recipe in page['results']] for page in pages]
+        backward = [forward[-1]]
+        page = pages[-1]
+        while page['previous']:
+            page = self.get_page(page['previous'])
+            backward.append([recipe['id'] for recipe in page['results']])
+        return forward, backward[::-1]
+
+    def test_round_trip_with_ties(self):
+        ids = [make_recipe(self.user, f'Recipe {number}').pk for number in range(7)]
+        # Identical timestamps leave the order to the id tiebreaker
+        Recipe.objects.update(created_at=Recipe.objects.first().created_at)
+        forward, backward = self.walk({'page_size': 3})
+        ids.reverse()
+        self.assertEqual(forward, [ids[0:3], ids[3:6], ids[6:]])
+        self.assertEqual(backward, forward)
+
+    def test_round_trip_with_ordering(self):
+        ids = [
+            make_recipe(self.user, f'Recipe {number}', prep_time=prep_time).pk
+            for number, prep_time in enumerate([30, 10, 20, 10, 40])
+        ]
+        forward, backward = self.walk({'page_size': 2, 'ordering': 'prep_time'})
+        self.assertEqual(forward, [[ids[1], ids[3]], [ids[2], ids[0]], [ids[4]]])
+        self.assertEqual(backward, forward)
+
+    def test_round_trip_with_search_ranking(self):
+        ids = [
+            make_recipe(self.user, f'Tomato soup {number}', ['tomato'] * (number % 2 + 1)).pk
+            for number in range(5)
+        ]
+        make_recipe(self.user, 'Pancakes', ['flour'])
+        forward, backward = self.walk({'page_size': 2, 'search': 'tomato'})
+        self.assertEqual(sorted(recipe_id for page in forward for recipe_id in page), ids)
+        self.assertEqual(backward, forward)
+
+    def test_tampered_cursor_is_not_found(self):
+        make_recipe(self.user, 'Recipe')
+        for cursor in ['not base64!', 'eyJ2IjpbImFiYyIsMV0sInIiOjB9']:  # {"v":["abc",1],"r":0}
+            response = self.client.get('/api/recipes/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 404)
@@ -0,0 +1,46 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from ..models import Ingredient
+from ..pantry import PantryIndex
+from .utils import make_recipe
+
+
+class PantryIndexTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('cook')
+        self.pancakes = make_recipe(user, 'Pancakes', ['2 cups flour', 'Eggs', 'milk', 'salt'])
+        self.curry = make_recipe(user, 'Curry', ['chicken breast', 'coconut milk', 'rice', 'onion', 'garlic'])
+        self.index = PantryIndex()
+
+    def test_fewest_missing_first(self):
+        matches = self.index.match(['flour', 'egg', 'chicken'])
+        self.assertEqual([match.recipe_id for match in matches], [self.pancakes.pk])
+        self.assertEqual(matches[0].matched, ['2 cups flour', 'Eggs'])
+        # Staples are never missing
+        self.assertEqual(matches[0].missing, ['milk'])
+
+    def test_phrase_covers_longer_ingredients(self):
+        matches = self.index.match(['chicken', 'milk', 'rice', 'onion'], max_missing=2)
+        self.assertEqual([match.recipe_id for match in matches], [self.curry.pk, self.pancakes.pk])
+        self.assertEqual(matches[0].matched, ['chicken breast', 'coconut milk', 'rice', 'onion'])
+        self.assertEqual(matches[0].missing, ['garlic'])
+
+    def test_dirty_recipes_are_reloaded(self):
+        self.index.match(['flour'])
+        Ingredient.objects.create(recipe=self.pancakes, name='butter', amount='1', unit='tbsp', position=4)
+        self.index.mark_dirty([self.pancakes.pk])
+        match = self.index.match(['flour', 'egg', 'milk'])[0]
+        self.assertEqual(match.missing, ['butter'])
+
+
+class PantryEndpointTests(TestCase):
+    def test_ingredients_must_be_text(self):
+        client = APIClient()
+        for ingredients in [5, {'name': 'egg'}, ['egg', 3]]:
+            with self.subTest(ingredients=ingredients):
+                response = client.post('/api/recipes/pantry/', {'ingredients': ingredients}, format='json')
+                self.assertEqual(response.status_code, 400)
+        response = client.post('/api/recipes/pantry/', {'ingredients': ['egg', 'flour']}, format='json')
+        self.assertEqual(response.status_code, 200)
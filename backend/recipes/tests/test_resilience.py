@@ -0,0 +1,142 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..llm import Completion, LLMError, LLMProvider, ResilientProvider
+from ..resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('recipes.resilience.time')
+        patcher.start().monotonic.side_effect = lambda: self.now
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(window=60, min_calls=4, error_rate=0.5, cooldown=30)
+
+    def fail(self, times):
+        for _ in range(times):
+            self.breaker.before_call()
+            self.breaker.record(True)
+
+    def test_stays_closed_below_min_calls(self):
+        self.fail(3)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_opens_at_error_rate(self):
+        self.breaker.before_call()
+        self.breaker.record(False)
+        self.fail(2)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.fail(1)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.now += 10
+        with self.assertRaises(CircuitOpenError) as raised:
+            self.breaker.before_call()
+        self.assertEqual(raised.exception.retry_after, 20)
+
+    def test_old_outcomes_leave_the_window(self):
+        self.fail(3)
+        self.now += 61
+        self.fail(1)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_half_open_probe_closes_on_success(self):
+        self.fail(4)
+        self.now += 30
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.breaker.before_call()
+        # Only one probe at a time
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.check()
+        self.breaker.record(False)
+        self.assertEqual(self.breaker.state, CLOSED)
+        # The failures before the outage no longer count
+        self.fail(3)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_half_open_probe_reopens_on_failure(self):
+        self.fail(4)
+        self.now += 30
+        self.fail(1)
+        self.assertEqual(self.breaker.state, OPEN)
+        with self.assertRaises(CircuitOpenError) as raised:
+            self.breaker.check()
+        self.assertEqual(raised.exception.retry_after, 30)
+
+
+class FlakyProvider(LLMProvider):
+    """Raises the queued errors, one per call, then answers."""
+    name = 'flaky'
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def is_transient(self, error):
+        return isinstance(error, LLMError)
+
+    def complete(self, messages, model, json_mode=False, temperature=None, timeout=None):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return Completion('{}', model, 1, 1)
+
+    def stream(self, messages, model, temperature=None, timeout=None):
+        self.calls += 1
+        yield 'par'
+        if self.errors:
+            raise self.errors.pop(0)
+        yield 'tial'
+
+
+class ResilientProviderTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch('recipes.llm.time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def provider(self, *errors, max_retries=2):
+        inner = FlakyProvider(*errors)
+        breaker = CircuitBreaker(window=60, min_calls=3, error_rate=0.5, cooldown=30)
+        return inner, ResilientProvider(inner, timeout=30, max_retries=max_retries, breaker=breaker)
+
+    def test_retries_transient_errors(self):
+        inner, provider = self.provider(LLMError('busy'), LLMError('busy'))
+        self.assertEqual(provider.complete([], 'model').text, '{}')
+        self.assertEqual(inner.calls, 3)
+        self.assertEqual(self.sleep.call_count, 2)
+
+    def test_gives_up_after_max_retries(self):
+        inner, provider = self.provider(*[LLMError('busy')] * 3, max_retries=1)
+        with self.assertRaises(LLMError):
+            provider.complete([], 'model')
+        self.assertEqual(inner.calls, 2)
+
+    def test_other_errors_are_not_retried(self):
+        inner, provider = self.provider(ValueError('bad request'))
+        with self.assertRaises(ValueError):
+            provider.complete([], 'model')
+        self.assertEqual(inner.calls, 1)
+        self.assertEqual(provider.breaker.state, CLOSED)
+
+    def test_open_breaker_refuses_calls(self):
+        inner, provider = self.provider(*[LLMError('down')] * 4, max_retries=0)
+        for _ in range(3):
+            with self.assertRaises(LLMError):
+                provider.complete([], 'model')
+        with self.assertRaises(CircuitOpenError):
+            provider.check_available()
+        with self.assertRaises(CircuitOpenError):
+            provider.complete([], 'model')
+        self.assertEqual(inner.calls, 3)
+
+    def test_streams_are_not_retried_after_the_first_chunk(self):
+        inner, provider = self.provider(LLMError('reset'))
+        chunks = []
+        with self.assertRaises(LLMError):
+            for chunk in provider.stream([], 'model'):
+                chunks.append(chunk)
+        self.assertEqual((chunks, inner.calls), (['par'], 1))
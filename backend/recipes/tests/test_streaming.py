@@ -0,0 +1,42 @@
+from django.test import SimpleTestCase
+
+from ..streaming import JSONFieldStream
+
+
+class JSONFieldStreamTests(SimpleTestCase):
+    TEXT = (
+        'Here you go: {"title": "Soup {for} \\"two\\"", "ingredients": [{"name": "leek", "amount": "2"}],\n'
+        '  "servings": 12, "vegan": true, "prep_time": 15}'
+    )
+
+    def feed_in_chunks(self, size):
+        stream = JSONFieldStream()
+        members = []
+        for start in range(0, len(self.TEXT), size):
+            members.extend(stream.feed(self.TEXT[start:start + size]))
+        return stream, members
+
+    def test_members_in_order_for_any_chunking(self):
+        expected = [
+            ('title', 'Soup {for} "two"'),
+            ('ingredients', [{'name': 'leek', 'amount': '2'}]),
+            ('servings', 12),
+            ('vegan', True),
+            ('prep_time', 15),
+        ]
+        for size in (1, 2, 7, len(self.TEXT)):
+            with self.subTest(size=size):
+                stream, members = self.feed_in_chunks(size)
+                self.assertEqual(members, expected)
+                self.assertTrue(stream.done)
+
+    def test_number_at_the_end_waits_for_more_text(self):
+        stream = JSONFieldStream()
+        self.assertEqual(stream.feed('{"prep_time": 1'), [])
+        self.assertEqual(stream.feed('5'), [])
+        self.assertEqual(stream.feed('}'), [('prep_time', 15)])
+
+    def test_value_split_inside_a_string(self):
+        stream = JSONFieldStream()
+        self.assertEqual(stream.feed('{"title": "Pan'), [])
+        self.assertEqual(stream.feed('cakes", "desc'), [('title', 'Pancakes')])
@@ -0,0 +1,87 @@
+import json
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from ..ai_cache import MEMORY, ai_cache
+from ..ai_utils import substitute_with_cache, substitutes_with_cache
+from ..llm import FAKE_SUBSTITUTE, Completion, FakeProvider, set_provider
+
+
+class BatchSubstituteTests(TestCase):
+    def setUp(self):
+        ai_cache.memory.clear()
+        ai_cache.shared.clear()
+        self.addCleanup(ai_cache.memory.clear)
+        self.addCleanup(ai_cache.shared.clear)
+        provider = FakeProvider(latency=0)
+        self.addCleanup(set_provider, set_provider(provider))
+        patcher = mock.patch.object(provider, 'complete', wraps=provider.complete)
+        self.complete = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def prompt(self, call):
+        return call.kwargs['messages'][-1]['content']
+
+    def test_only_misses_go_upstream_in_one_call(self):
+        answers = substitutes_with_cache(['butter', 'milk', 'Butter'], ['vegan'])
+        self.assertEqual(self.complete.call_count, 1)
+        self.assertIn('1. butter', self.prompt(self.complete.call_args))
+        self.assertNotIn('3. ', self.prompt(self.complete.call_args))
+        self.assertEqual([tier for _, tier in answers], [None, None, None])
+        self.assertEqual(answers[0][0], FAKE_SUBSTITUTE)
+
+        answers = substitutes_with_cache(['milk', 'eggs'], 'Vegan')
+        self.assertEqual(self.complete.call_count, 2)
+        self.assertIn('1. eggs', self.prompt(self.complete.call_args))
+        self.assertNotIn('milk', self.prompt(self.complete.call_args))
+        self.assertEqual([tier for _, tier in answers], [MEMORY, None])
+
+    def test_answers_are_shared_with_single_requests(self):
+        substitutes_with_cache(['butter'])
+        self.assertEqual(substitute_with_cache('butter'), (FAKE_SUBSTITUTE, MEMORY))
+        substitute_with_cache('cream')
+        self.assertEqual(substitutes_with_cache(['cream'])[0][1], MEMORY)
+        self.assertEqual(self.complete.call_count, 2)
+
+    def test_missing_answers_are_errors_and_not_cached(self):
+        self.complete.side_effect = lambda messages, model, **kwargs: Completion(
+            json.dumps({'1': FAKE_SUBSTITUTE}), model, 0, 0,
+        )
+        answers = substitutes_with_cache(['butter', 'milk'])
+        self.assertEqual(answers[0], (FAKE_SUBSTITUTE, None))
+        self.assertIn('error', answers[1][0])
+
+        self.complete.side_effect = None
+        self.assertEqual(substitutes_with_cache(['milk'])[0], (FAKE_SUBSTITUTE, None))
+        self.assertEqual(self.complete.call_count, 2)
+
+
+class BatchSubstituteEndpointTests(TestCase):
+    def setUp(self):
+        ai_cache.memory.clear()
+        ai_cache.shared.clear()
+        self.addCleanup(ai_cache.memory.clear)
+        self.addCleanup(ai_cache.shared.clear)
+        self.addCleanup(set_provider, set_provider(FakeProvider(latency=0)))
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('cook'))
+
+    def substitute(self, ingredients):
+        return self.client.post('/api/recipes/substitute/', {'ingredients': ingredients}, format='json')
+
+    def test_results_follow_the_request_order(self):
+        self.substitute(['milk'])
+        response = self.substitute('butter, milk')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(result['ingredient'], result['cached']) for result in response.json()['results']],
+            [('butter', False), ('milk', True)],
+        )
+
+    def test_rejects_bad_batches(self):
+        for ingredients in [{'name': 'milk'}, [' ', ''], ['milk'] * 31]:
+            with self.subTest(ingredients=ingredients):
+                self.assertEqual(self.substitute(ingredients).status_code, 400)
@@ -0,0 +1,69 @@
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from ..models import Ingredient
+from ..units import parse_quantity
+from .utils import make_recipe
+
+
+class ParseQuantityTests(SimpleTestCase):
+    def assertQuantity(self, amount, unit, expected):
+        quantity, quantity_max, canonical = parse_quantity(amount, unit)
+        low, high, expected_unit = expected
+        self.assertEqual(canonical, expected_unit)
+        self.assertAlmostEqual(quantity, low, places=3)
+        if high is None:
+            self.assertIsNone(quantity_max)
+        else:
+            self.assertAlmostEqual(quantity_max, high, places=3)
+
+    def test_fractions(self):
+        self.assertQuantity('1 1/2', 'cups', (1.5 * 236.588, None, 'ml'))
+        self.assertQuantity('1½', 'tsp', (1.5 * 4.92892, None, 'ml'))
+        self.assertQuantity('3/4', 'cup', (0.75 * 236.588, None, 'ml'))
+        self.assertQuantity('1,5', 'kg', (1500, None, 'g'))
+
+    def test_ranges(self):
+        self.assertQuantity('2-3', 'cloves', (2, 3, 'clove'))
+        self.assertQuantity('1 to 2', 'lbs', (453.592, 907.184, 'g'))
+
+    def test_unit_inside_amount(self):
+        self.assertQuantity('200g', '', (200, None, 'g'))
+        self.assertQuantity('500 ml', '500', (500, None, 'ml'))
+        self.assertQuantity('2', '', (2, None, 'pc'))
+
+    def test_without_number(self):
+        self.assertEqual(parse_quantity('to taste', ''), (None, None, ''))
+        self.assertEqual(parse_quantity('1/0', 'cup'), (None, None, ''))
+
+
+class ScaledEndpointTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('cook')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.recipe = make_recipe(user, 'Bread', servings=4)
+        for position, (name, amount, unit) in enumerate([
+            ('flour', '500', 'g'), ('water', '1 1/2', 'cups'), ('garlic', '2-3', 'cloves'), ('salt', 'to taste', ''),
+        ]):
+            Ingredient.objects.create(recipe=self.recipe, name=name, amount=amount, unit=unit, position=position)
+
+    def scaled(self, **params):
+        return self.client.get(f'/api/recipes/{self.recipe.pk}/scaled/', params)
+
+    def test_scales_in_written_units(self):
+        ingredients = self.scaled(servings=6).json()['ingredients']
+        self.assertEqual(
+            [(row['amount'], row['unit'], row['scaled']) for row in ingredients],
+            [('750', 'g', True), ('2 1/4', 'cups', True), ('3-4 1/2', 'cloves', True), ('to taste', '', False)],
+        )
+
+    def test_metric_units(self):
+        ingredients = self.scaled(servings=8, units='metric').json()['ingredients']
+        self.assertEqual([(row['amount'], row['unit']) for row in ingredients[:2]], [('1', 'kg'), ('710', 'ml')])
+
+    def test_rejects_bad_parameters(self):
+        for params in [{}, {'servings': 'many'}, {'servings': 0}, {'servings': 2, 'units': 'imperial'}]:
+            with self.subTest(params=params):
+                self.assertEqual(self.scaled(**params).status_code, 400)
@@ -0,0 +1,9 @@
+from ..models import Ingredient, Recipe
+
+
+def make_recipe(author, title, ingredients=(), **fields):
+    fields = {'prep_time': 10, 'cook_time': 10, 'servings': 2, **fields}
+    recipe = Recipe.objects.create(author=author, title=title, description='', **fields)
+    for position, name in enumerate(ingredients):
+        Ingredient.objects.create(recipe=recipe, name=name, amount='1', unit='pc', position=position)
+    return recipe
@@ -0,0 +1,91 @@
+"""
+Time-decayed "trending" score per recipe.
+
+Every favorite and rating contributes its weight, halved every
+TRENDING_HALF_LIFE seconds since it happened. All scores decay by the same
+factor, so a refresh never re-reads old events: it multiplies the stored
+scores by the decay since the previous refresh and adds the decayed weight
+of the events recorded since then.
+
+Scores are stored in Recipe.trending_score, indexed together with id, so
+``?ordering=-trending`` pages through an index instead of aggregating the
+ratings and favorites tables per request. Removed favorites and changed
+ratings are only picked up by a full recompute (``refresh_trending --full``),
+which reads the events of the last TRENDING_WINDOW seconds.
+"""
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.utils import timezone
+
+from .cache import invalidate_recipe
+from .models import Favorite, Rating, Recipe, TrendingState
+
+FAVORITE_WEIGHT = 1.0
+# Scores below this are reset to 0 so the decay step only touches active recipes
+MIN_SCORE = 1e-3
+UPDATE_BATCH_SIZE = 500
+
+
+def decay(seconds, half_life):
+    return 0.5 ** (max(seconds, 0) / half_life)
+
+
+def recent_events(since, until):
+    """Yield (recipe_id, created_at, weight) for favorites and ratings in (since, until]."""
+    favorites = Favorite.objects.filter(created_at__gt=since, created_at__lte=until).order_by()
+    ratings = Rating.objects.filter(created_at__gt=since, created_at__lte=until).order_by()
+    for recipe_id, created_at in favorites.values_list('recipe_id', 'created_at').iterator():
+        yield recipe_id, created_at, FAVORITE_WEIGHT
+    for recipe_id, created_at, score in ratings.values_list('recipe_id', 'created_at', 'score').iterator():
+        yield recipe_id, created_at, score / 5.0
+
+
+def event_scores(since, until, half_life):
+    scores = defaultdict(float)
+    for recipe_id, created_at, weight in recent_events(since, until):
+        scores[recipe_id] += weight * decay((until - created_at).total_seconds(), half_life)
+    return scores
+
+
+def add_scores(scores):
+    items = list(scores.items())
+    for start in range(0, len(items), UPDATE_BATCH_SIZE):
+        batch = items[start:start + UPDATE_BATCH_SIZE]
+        delta = Case(
+            *[When(pk=recipe_id, then=Value(score)) for recipe_id, score in batch],
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+        Recipe.objects.filter(pk__in=[recipe_id for recipe_id, _ in batch]).update(
+            trending_score=F('trending_score') + delta,
+        )
+
+
+def refresh_trending(full=False, now=None):
+    """
+    Bring the stored scores up to ``now``. Returns the number of recipes
+    that had new activity.
+    """
+    now = now or timezone.now()
+    half_life = getattr(settings, 'TRENDING_HALF_LIFE', 48 * 3600)
+    window = getattr(settings, 'TRENDING_WINDOW', 14 * 24 * 3600)
+    with transaction.atomic():
+        state = TrendingState.objects.select_for_update().filter(pk=1).first()
+        if full or state is None or state.refreshed_at > now:
+            Recipe.objects.exclude(trending_score=0).update(trending_score=0)
+            since = now - datetime.timedelta(seconds=window)
+        else:
+            factor = decay((now - state.refreshed_at).total_seconds(), half_life)
+            Recipe.objects.filter(trending_score__gt=0).update(trending_score=F('trending_score') * factor)
+            Recipe.objects.filter(trending_score__gt=0, trending_score__lt=MIN_SCORE).update(trending_score=0)
+            since = state.refreshed_at
+        scores = event_scores(since, now, half_life)
+        add_scores(scores)
+        TrendingState.objects.update_or_create(pk=1, defaults={'refreshed_at': now})
+    # Listings sorted by trending change; detail responses do not include the score
+    invalidate_recipe(None)
+    return len(scores)
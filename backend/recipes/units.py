@@ -0,0 +1,214 @@
+"""
+Numeric ingredient quantities.
+
+Ingredient.amount and Ingredient.unit are free text ("1 1/2" "cups",
+"2-3" "cloves", "200g"). At write time they are parsed into
+Ingredient.quantity / quantity_max, expressed in a canonical unit:
+grams for weights, millilitres for volumes, and the singular unit word for
+everything that is counted ("clove", "slice", "pc"). Rows whose amount
+has no number ("to taste") keep quantity NULL and are never scaled.
+
+Scaling a recipe is then plain array arithmetic over those columns (see
+``scale_ingredients``), including the conversion back to a display unit.
+"""
+import re
+
+import numpy as np
+
+from .vocabulary import DESCRIPTORS, singularize
+
+GRAM = 'g'
+MILLILITRE = 'ml'
+PIECE = 'pc'
+
+QUANTITY_FIELDS = ['quantity', 'quantity_max', 'canonical_unit']
+
+# alias -> (canonical unit, canonical units per 1 of this unit)
+UNITS = {
+    'g': (GRAM, 1.0), 'gr': (GRAM, 1.0), 'gram': (GRAM, 1.0), 'gramme': (GRAM, 1.0),
+    'kg': (GRAM, 1000.0), 'kilo': (GRAM, 1000.0), 'kilogram': (GRAM, 1000.0),
+    'mg': (GRAM, 0.001), 'milligram': (GRAM, 0.001),
+    'oz': (GRAM, 28.3495), 'ounce': (GRAM, 28.3495),
+    'lb': (GRAM, 453.592), 'lbs': (GRAM, 453.592), 'pound': (GRAM, 453.592),
+    'ml': (MILLILITRE, 1.0), 'millilitre': (MILLILITRE, 1.0), 'milliliter': (MILLILITRE, 1.0),
+    'cl': (MILLILITRE, 10.0), 'dl': (MILLILITRE, 100.0),
+    'l': (MILLILITRE, 1000.0), 'litre': (MILLILITRE, 1000.0), 'liter': (MILLILITRE, 1000.0),
+    'tsp': (MILLILITRE, 4.92892), 'teaspoon': (MILLILITRE, 4.92892),
+    'tbsp': (MILLILITRE, 14.7868), 'tbs': (MILLILITRE, 14.7868), 'tablespoon': (MILLILITRE, 14.7868),
+    'fl oz': (MILLILITRE, 29.5735), 'fluid ounce': (MILLILITRE, 29.5735),
+    'cup': (MILLILITRE, 236.588), 'pint': (MILLILITRE, 473.176),
+    'quart': (MILLILITRE, 946.353), 'gallon': (MILLILITRE, 3785.41),
+    '': (PIECE, 1.0), 'pc': (PIECE, 1.0), 'pcs': (PIECE, 1.0), 'piece': (PIECE, 1.0),
+    'whole': (PIECE, 1.0), 'unit': (PIECE, 1.0), 'x': (PIECE, 1.0),
+}
+
+# Display units for ?units=metric, smallest first: (unit, canonical units per 1, from quantity)
+METRIC_DISPLAY = {
+    GRAM: [('g', 1.0, 0.0), ('kg', 1000.0, 1000.0)],
+    MILLILITRE: [('ml', 1.0, 0.0), ('l', 1000.0, 1000.0)],
+}
+
+FRACTIONS = {'½': '1/2', '⅓': '1/3', '⅔': '2/3', '¼': '1/4', '¾': '3/4', '⅛': '1/8', '⅜': '3/8', '⅝': '5/8', '⅞': '7/8'}
+DISPLAY_FRACTIONS = [(0.25, '1/4'), (1 / 3, '1/3'), (0.5, '1/2'), (2 / 3, '2/3'), (0.75, '3/4')]
+
+_NUMBER = r'(?:\d+\s+\d+/\d+|\d+/\d+|\d+(?:[.,]\d+)?)'
+_AMOUNT_RE = re.compile(r'^\s*(%s)(?:\s*(?:-|–|to)\s*(%s))?\s*(.*)$' % (_NUMBER, _NUMBER))
+
+
+def parse_number(text):
+    text = text.replace(',', '.')
+    total = 0.0
+    for part in text.split():
+        if '/' in part:
+            numerator, denominator = part.split('/')
+            if float(denominator) == 0:
+                return None
+            total += float(numerator) / float(denominator)
+        else:
+            total += float(part)
+    return total
+
+
+def _expand_fractions(text):
+    # "1½" -> "1 1/2" so vulgar fractions parse like written ones
+    for symbol, fraction in FRACTIONS.items():
+        text = text.replace(symbol, f' {fraction}')
+    return text
+
+
+def canonical_unit(unit):
+    """Return (canonical unit, factor) for a unit as written."""
+    key = re.sub(r'[^a-z\s]', ' ', (unit or '').lower())
+    key = ' '.join(word for word in key.split() if word not in DESCRIPTORS)
+    if key in UNITS:
+        return UNITS[key]
+    key = ' '.join(singularize(word) for word in key.split())
+    if key in UNITS:
+        return UNITS[key]
+    if not key:
+        return UNITS['']
+    return key, 1.0
+
+
+def parse_quantity(amount, unit):
+    """
+    Parse an amount and unit as written into (quantity, quantity_max,
+    canonical unit). quantity is None when the amount has no number.
+    """
+    match = _AMOUNT_RE.match(_expand_fractions(amount or ''))
+    if not match:
+        return None, None, ''
+    low, high, rest = match.groups()
+    low = parse_number(low)
+    high = parse_number(high) if high else None
+    if low is None:
+        return None, None, ''
+    # "200g" with the unit field left blank or holding a stray number
+    if rest and (not (unit or '').strip() or re.fullmatch(r'[\d.\s]*', unit or '')):
+        unit = rest
+    name, factor = canonical_unit(unit)
+    return low * factor, (high * factor if high is not None else None), name
+
+
+def written_unit(ingredient):
+    """(unit, factor) to display a parsed ingredient in the unit it was written in."""
+    name, factor = canonical_unit(ingredient.unit)
+    if name != ingredient.canonical_unit:
+        # The unit came from the amount text ("200g"); show the canonical one
+        return ingredient.canonical_unit, 1.0
+    return ingredient.unit, factor
+
+
+def metric_unit(quantity, unit):
+    """(display unit, factor) for a quantity in canonical ``unit``: 1500 g -> kg."""
+    display, factor = unit, 1.0
+    for step_unit, step_factor, minimum in METRIC_DISPLAY.get(unit, ()):
+        if quantity >= minimum:
+            display, factor = step_unit, step_factor
+    return display, factor
+
+
+def format_amount(value):
+    if value >= 100:
+        return str(round(value))
+    whole = int(value)
+    remainder = value - whole
+    if remainder < 0.02:
+        return str(whole)
+    if remainder > 0.98:
+        return str(whole + 1)
+    for fraction, text in DISPLAY_FRACTIONS:
+        if abs(remainder - fraction) < 0.02:
+            return f'{whole} {text}' if whole else text
+    return f'{value:.{1 if value >= 10 else 2}f}'.rstrip('0').rstrip('.')
+
+
+def scale_ingredients(ingredients, ratio, units='original'):
+    """
+    Scale Ingredient rows by ``ratio`` in one array pass. With
+    ``units='original'`` amounts stay in the unit they were written in;
+    with ``units='metric'`` weights and volumes are shown in g/kg or ml/l.
+    Rows without a parsed quantity are returned unchanged.
+    """
+    ingredients = list(ingredients)
+    quantity = np.array([row.quantity if row.quantity is not None else np.nan for row in ingredients], dtype=np.float64)
+    quantity_max = np.array(
+        [row.quantity_max if row.quantity_max is not None else np.nan for row in ingredients], dtype=np.float64,
+    )
+    canonical = np.array([row.canonical_unit for row in ingredients], dtype=object)
+    written = [written_unit(row) for row in ingredients]
+    display_units = np.array([unit for unit, _ in written], dtype=object)
+    factors = np.array([factor for _, factor in written], dtype=np.float64)
+
+    quantity *= ratio
+    quantity_max *= ratio
+    if units == 'metric':
+        for unit_name, steps in METRIC_DISPLAY.items():
+            rows = canonical == unit_name
+            for display, factor, minimum in steps:
+                chosen = rows & (quantity >= minimum)
+                factors[chosen] = factor
+                display_units[chosen] = display
+    amounts = quantity / factors
+    amounts_max = quantity_max / factors
+
+    results = []
+    for index, row in enumerate(ingredients):
+        scaled = not np.isnan(amounts[index])
+        if scaled:
+            amount = format_amount(amounts[index])
+            if not np.isnan(amounts_max[index]):
+                amount = f'{amount}-{format_amount(amounts_max[index])}'
+        else:
+            amount = row.amount
+        results.append({
+            'id': row.pk,
+            'name': row.name,
+            'amount': amount,
+            'unit': display_units[index] if scaled else row.unit,
+            'notes': row.notes,
+            'quantity': round(float(quantity[index]), 3) if scaled else None,
+            'quantity_max': round(float(quantity_max[index]), 3) if not np.isnan(quantity_max[index]) else None,
+            'canonical_unit': row.canonical_unit,
+            'scaled': scaled,
+        })
+    return results
+
+
+def backfill_quantities(ingredient_model, batch_size=1000):
+    """Parse the amount/unit of every stored ingredient. Returns the ids of recipes that changed."""
+    recipe_ids = set()
+    rows = ingredient_model.objects.order_by('pk').only('pk', 'recipe_id', 'amount', 'unit', *QUANTITY_FIELDS)
+    batch = []
+    for ingredient in rows.iterator(chunk_size=batch_size):
+        parsed = parse_quantity(ingredient.amount, ingredient.unit)
+        if parsed != tuple(getattr(ingredient, field) for field in QUANTITY_FIELDS):
+            ingredient.quantity, ingredient.quantity_max, ingredient.canonical_unit = parsed
+            batch.append(ingredient)
+            recipe_ids.add(ingredient.recipe_id)
+        if len(batch) >= batch_size:
+            ingredient_model.objects.bulk_update(batch, QUANTITY_FIELDS)
+            batch = []
+    if batch:
+        ingredient_model.objects.bulk_update(batch, QUANTITY_FIELDS)
+    return recipe_ids
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import RecipeViewSet, ProfileViewSet, IngredientViewSet, register, login, get_current_user, generate_recipe
+from .views import RecipeViewSet, ProfileViewSet, IngredientViewSet, register, login, get_current_user, generate_recipe, generate_recipe_stream, generation_job, shopping_list, metrics
 
 router = DefaultRouter()
 router.register(r'recipes', RecipeViewSet)
@@ -13,5 +13,9 @@ urlpatterns = [
     path('auth/login/', login, name='login'),
     path('auth/me/', get_current_user, name='current-user'),
     path('generate-recipe/', generate_recipe, name='generate-recipe'),
+    path('generate-recipe/stream/', generate_recipe_stream, name='generate-recipe-stream'),
+    path('generate-recipe/<uuid:job_id>/', generation_job, name='generation-job'),
+    path('shopping-list/', shopping_list, name='shopping-list'),
+    path('metrics/', metrics, name='metrics'),
 ]
 
@@ -0,0 +1,6 @@
+"""Request parsing helpers shared by views and filters."""
+
+
+def parse_flag(value):
+    """True for the usual spellings of a boolean flag in query strings and bodies."""
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
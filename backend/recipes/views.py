@@ -1,18 +1,61 @@
-from rest_framework import viewsets, permissions, filters, status
+from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response  
 from rest_framework.permissions import AllowAny, IsAuthenticated, BasePermission
+from rest_framework.parsers import JSONParser
 from rest_framework_simplejwt.tokens import RefreshToken
+from django.conf import settings
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
+from django.db.models import Avg, Count
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from .models import Recipe, Profile, Ingredient, Rating, Favorite
-from .serializers import RecipeSerializer, ProfileSerializer, IngredientSerializer, RatingSerializer
+from django.http import HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from .models import Recipe, Profile, Ingredient, Rating, Favorite, GenerationJob
+from .serializers import RecipeSerializer, RecipeSummarySerializer, ProfileSerializer, parse_field_list, IngredientSerializer, RatingSerializer, GenerationJobSerializer
 from .auth_serializers import RegisterSerializer, LoginSerializer, UserSerializer
-from .ai_utils import get_ingredient_substitute, generate_recipe_from_ingredients
+from .search import RecipeSearchFilter
+from .filters import RecipeFilter, RecipeOrderingFilter
+from .pagination import IngredientPagination
+from .cache import CachedReadMixin, get_cache, get_version, recipe_version_key
+from .parsers import NDJSONParser
+from .pantry import pantry_index
+from .vocabulary import parse_ingredient_list
+from .recommendations import recommend_for_user
+from .similarity import similarity_index
+from .units import scale_ingredients
+from .shopping import build_shopping_list
+from .jobs import backlog, enqueue_generation, maybe_sweep
+from .ai_utils import substitute_with_cache, substitutes_with_cache, generate_recipe_with_cache, stream_recipe_from_ingredients
+from .streaming import recipe_events
+from .llm import get_provider
+from .resilience import CircuitOpenError
+from .metrics import registry
+from .utils import parse_flag
 import django_filters.rest_framework
-import json
+import ipaddress
+
+
+BULK_IMPORT_MAX_ITEMS = 500
+MAX_SCALED_SERVINGS = 1000
+SHOPPING_LIST_MAX_RECIPES = 50
+SUBSTITUTE_BATCH_MAX_ITEMS = 30
+
+
+def parse_limit(value, default=20, maximum=100):
+    try:
+        return min(max(int(value), 1), maximum)
+    except (TypeError, ValueError):
+        return default
+
+
+def ai_unavailable(error):
+    """503 for a call refused by the LLM circuit breaker."""
+    return Response(
+        {"error": str(error)}, status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={'Retry-After': str(error.retry_after)},
+    )
 
 
 class IsOwnerOrReadOnly(BasePermission):
@@ -27,14 +70,47 @@ class IsOwnerOrReadOnly(BasePermission):
         return obj.author == request.user
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class IsStaffOrInternalNetwork(BasePermission):
+    """
+    Allow staff users, and clients whose address is in METRICS_ALLOWED_NETWORKS.
+    """
+    def has_permission(self, request, view):
+        if request.user and request.user.is_staff:
+            return True
+        try:
+            address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+        except ValueError:
+            return False
+        return any(
+            address in ipaddress.ip_network(network)
+            for network in getattr(settings, 'METRICS_ALLOWED_NETWORKS', [])
+        )
+
+
+class RecipeViewSet(CachedReadMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all().order_by('-created_at')
     serializer_class = RecipeSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter, django_filters.rest_framework.DjangoFilterBackend]
+    filter_backends = [RecipeSearchFilter, RecipeOrderingFilter, django_filters.rest_framework.DjangoFilterBackend]
     search_fields = ['title', 'description', 'tags', 'ingredients__name']
-    filterset_fields = ['author', 'category']
-    ordering_fields = ['created_at', 'prep_time', 'cook_time']
+    filterset_class = RecipeFilter
+    ordering_fields = ['created_at', 'prep_time', 'cook_time', 'trending_score']
+
+    def get_queryset(self):
+        queryset = super().get_queryset().with_ratings()
+        if self.get_serializer_class() is RecipeSummarySerializer:
+            expand = parse_field_list(self.request, 'expand')
+            if 'author' in expand:
+                queryset = queryset.select_related('author')
+            if 'ingredients' in expand:
+                queryset = queryset.prefetch_related('ingredients')
+            return queryset
+        return queryset.select_related('author').prefetch_related('ingredients')
+
+    def get_serializer_class(self):
+        if self.action in ('list', 'my_favorites', 'pantry', 'recommended', 'similar'):
+            return RecipeSummarySerializer
+        return super().get_serializer_class()
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -50,6 +126,137 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated],
+            parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request):
+        """
+        Import many recipes at once from a JSON array or NDJSON body.
+        Valid items are inserted in one transaction; invalid ones are
+        reported by their index in the payload.
+        """
+        items = request.data
+        if not isinstance(items, list):
+            return Response({'error': 'Expected a list of recipes.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > BULK_IMPORT_MAX_ITEMS:
+            return Response({'error': f'At most {BULK_IMPORT_MAX_ITEMS} recipes per request.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        valid, errors = [], []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                errors.append({'index': index, 'errors': {'non_field_errors': ['Expected a recipe object.']}})
+                continue
+            serializer = RecipeSerializer(data=item, context=self.get_serializer_context())
+            if serializer.is_valid():
+                valid.append(serializer.validated_data)
+            else:
+                errors.append({'index': index, 'errors': serializer.errors})
+
+        recipes = RecipeSerializer.create_many(valid, author=request.user) if valid else []
+        if errors and not recipes:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif errors:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+        return Response({'created': [recipe.pk for recipe in recipes], 'errors': errors}, status=response_status)
+
+    @action(detail=False, methods=['post'], permission_classes=[AllowAny])
+    def pantry(self, request):
+        """
+        Rank existing recipes by how well they use the given pantry.
+        Expects: {"ingredients": "flour, eggs, sugar", "max_missing": 3, "limit": 20}
+        """
+        ingredients = request.data.get('ingredients') or ''
+        if not (isinstance(ingredients, str) or (
+                isinstance(ingredients, list) and all(isinstance(item, str) for item in ingredients))):
+            return Response({"error": "ingredients must be a string or a list of strings"}, status=status.HTTP_400_BAD_REQUEST)
+        pantry = parse_ingredient_list(ingredients)
+        if not pantry:
+            return Response({"error": "Ingredients are required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            max_missing = max(int(request.data.get('max_missing', 3)), 0)
+            limit = min(max(int(request.data.get('limit', 20)), 1), 100)
+        except (TypeError, ValueError):
+            return Response({"error": "max_missing and limit must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        matches = pantry_index.match(pantry, limit=limit, max_missing=max_missing)
+        recipes = self.get_queryset().in_bulk([match.recipe_id for match in matches])
+        found = [match for match in matches if match.recipe_id in recipes]
+        serializer = self.get_serializer([recipes[match.recipe_id] for match in found], many=True)
+        results = []
+        for match, data in zip(found, serializer.data):
+            data['matched_count'] = len(match.matched)
+            data['missing_count'] = len(match.missing)
+            data['missing_ingredients'] = match.missing
+            results.append(data)
+        return Response({'pantry': pantry, 'results': results})
+
+    @action(detail=False, methods=['get'])
+    def recommended(self, request):
+        """
+        Recipes liked by users with similar favorites and ratings. Falls back
+        to the best rated recipes for anonymous users or before the model
+        knows anything about the user.
+        """
+        limit = parse_limit(request.query_params.get('limit'))
+        recipe_ids = recommend_for_user(request.user, limit=limit) if request.user.is_authenticated else []
+        if recipe_ids:
+            recipes = self.get_queryset().in_bulk(recipe_ids)
+            recipes = [recipes[recipe_id] for recipe_id in recipe_ids if recipe_id in recipes]
+            source = 'personalized'
+        else:
+            recipes = list(self.get_queryset().order_by('-rating_avg', '-rating_count', '-created_at')[:limit])
+            source = 'popular'
+        serializer = self.get_serializer(recipes, many=True)
+        return Response({'source': source, 'results': serializer.data})
+
+    @action(detail=True, methods=['get'])
+    def scaled(self, request, pk=None):
+        """The recipe's ingredients scaled to ``?servings=N`` (``&units=metric`` converts to g/kg, ml/l)."""
+        recipe = self.get_object()
+        try:
+            servings = float(request.query_params.get('servings', ''))
+        except ValueError:
+            return Response({'error': 'servings must be a number.'}, status=400)
+        if not 0 < servings <= MAX_SCALED_SERVINGS:
+            return Response({'error': f'servings must be between 0 and {MAX_SCALED_SERVINGS}.'}, status=400)
+        units = request.query_params.get('units', 'original')
+        if units not in ('original', 'metric'):
+            return Response({'error': "units must be 'original' or 'metric'."}, status=400)
+        if recipe.servings <= 0:
+            return Response({'error': 'This recipe has no servings count to scale from.'}, status=400)
+
+        ratio = servings / recipe.servings
+        return Response({
+            'id': recipe.pk,
+            'title': recipe.title,
+            'servings': int(servings) if servings.is_integer() else servings,
+            'original_servings': recipe.servings,
+            'units': units,
+            'ingredients': scale_ingredients(recipe.ingredients.all(), ratio, units=units),
+        })
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """Recipes closest to this one by ingredients, tags and category."""
+        recipe = self.get_object()
+        limit = parse_limit(request.query_params.get('limit'), default=10, maximum=50)
+        cache = get_cache()
+        cache_key = f'recipes:similar:{recipe.pk}:{get_version(recipe_version_key(recipe.pk))}:{limit}'
+        neighbors = cache.get(cache_key)
+        if neighbors is None:
+            neighbors = similarity_index.similar(recipe.pk, limit=limit)
+            cache.set(cache_key, neighbors, settings.RECIPE_CACHE_TIMEOUT)
+
+        recipes = self.get_queryset().in_bulk([recipe_id for recipe_id, _ in neighbors])
+        found = [(recipes[recipe_id], score) for recipe_id, score in neighbors if recipe_id in recipes]
+        serializer = self.get_serializer([similar for similar, _ in found], many=True)
+        results = []
+        for (_, score), data in zip(found, serializer.data):
+            data['similarity'] = score
+            results.append(data)
+        return Response({'results': results})
+
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def toggle_favorite(self, request, pk=None):
         recipe = self.get_object()
@@ -76,13 +283,14 @@ class RecipeViewSet(viewsets.ModelViewSet):
         if not created:
             rating.score = score
             rating.save()
-            
-        return Response({'rating_avg': recipe.rating_avg}) # This will use the property if defined or the serializer method
+
+        stats = Rating.objects.filter(recipe=recipe).aggregate(rating_avg=Avg('score'), rating_count=Count('pk'))
+        return Response({'rating_avg': stats['rating_avg'] or 0, 'rating_count': stats['rating_count']})
 
     @action(detail=False, methods=['get'])
     def my_favorites(self, request):
         user = request.user
-        favorites = Recipe.objects.filter(favorited_by__user=user)
+        favorites = self.get_queryset().filter(favorited_by__user=user)
         page = self.paginate_queryset(favorites)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -92,6 +300,14 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['post'])
     def substitute(self, request):
+        """
+        Expects: {"ingredient": "butter", "restrictions": "...", "allergies": "..."}
+        or, for several ingredients in one call, {"ingredients": ["butter", "milk"]};
+        batch requests default to the user's profile restrictions and allergies.
+        """
+        if 'ingredients' in request.data:
+            return self.substitute_batch(request)
+
         ingredient = request.data.get('ingredient')
         restrictions = request.data.get('restrictions', "")
         allergies = request.data.get('allergies', "")
@@ -100,15 +316,46 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return Response({"error": "Ingredient is required"}, status=400)
             
         try:
-            result = get_ingredient_substitute(ingredient, restrictions, allergies)
-            return Response(json.loads(result))
+            result, cache_tier = substitute_with_cache(ingredient, restrictions, allergies)
+            return Response(dict(result, cached=cache_tier is not None), headers={'X-Cache': cache_tier or 'miss'})
+        except CircuitOpenError as e:
+            return ai_unavailable(e)
         except Exception as e:
             return Response({"error": str(e)}, status=500)
 
+    def substitute_batch(self, request):
+        ingredients = request.data.get('ingredients')
+        if isinstance(ingredients, str):
+            ingredients = ingredients.split(',')
+        if not isinstance(ingredients, list):
+            return Response({"error": "ingredients must be a list"}, status=400)
+        ingredients = [str(name).strip() for name in ingredients if str(name).strip()]
+        if not ingredients:
+            return Response({"error": "Ingredients are required"}, status=400)
+        if len(ingredients) > SUBSTITUTE_BATCH_MAX_ITEMS:
+            return Response({"error": f"At most {SUBSTITUTE_BATCH_MAX_ITEMS} ingredients per request"}, status=400)
+
+        profile_restrictions, profile_allergies = profile_preferences(request.user)
+        restrictions = request.data.get('restrictions', profile_restrictions)
+        allergies = request.data.get('allergies', profile_allergies)
+        try:
+            answers = substitutes_with_cache(ingredients, restrictions, allergies)
+        except CircuitOpenError as e:
+            return ai_unavailable(e)
+        except Exception as e:
+            return Response({"error": str(e)}, status=500)
+
+        results = [
+            dict(answer, ingredient=name, cached=cache_tier is not None)
+            for name, (answer, cache_tier) in zip(ingredients, answers)
+        ]
+        return Response({'results': results})
+
 class IngredientViewSet(viewsets.ModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = IngredientPagination
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -174,33 +421,155 @@ def login(request):
 def get_current_user(request):
     return Response(UserSerializer(request.user).data)
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def shopping_list(request):
+    """
+    Merge the ingredients of several recipes into one shopping list.
+    Expects: {"recipes": [{"id": 1, "servings": 4}, {"id": 2}]} (plain ids are accepted too)
+    """
+    entries = request.data.get('recipes')
+    if not isinstance(entries, list) or not entries:
+        return Response({"error": "recipes must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(entries) > SHOPPING_LIST_MAX_RECIPES:
+        return Response(
+            {"error": f"At most {SHOPPING_LIST_MAX_RECIPES} recipes per shopping list"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    recipe_ids, servings = [], {}
+    try:
+        for entry in entries:
+            recipe_id = int(entry['id'] if isinstance(entry, dict) else entry)
+            if isinstance(entry, dict) and entry.get('servings') is not None:
+                servings[recipe_id] = float(entry['servings'])
+                if not 0 < servings[recipe_id] <= MAX_SCALED_SERVINGS:
+                    raise ValueError
+            if recipe_id not in recipe_ids:
+                recipe_ids.append(recipe_id)
+    except (KeyError, TypeError, ValueError):
+        return Response(
+            {"error": f"Each recipe must be an id or {{\"id\": ..., \"servings\": ...}} with servings up to {MAX_SCALED_SERVINGS}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    recipes = Recipe.objects.only('id', 'title', 'servings').in_bulk(recipe_ids)
+    missing = [recipe_id for recipe_id in recipe_ids if recipe_id not in recipes]
+    if missing:
+        return Response({"error": "Recipes not found", "ids": missing}, status=status.HTTP_404_NOT_FOUND)
+
+    items = build_shopping_list({recipe_id: recipe.servings for recipe_id, recipe in recipes.items()}, servings)
+    return Response({
+        'recipes': [
+            {'id': recipe_id, 'title': recipes[recipe_id].title, 'servings': servings.get(recipe_id, recipes[recipe_id].servings)}
+            for recipe_id in recipe_ids
+        ],
+        'items': items,
+    })
+
+def profile_preferences(user):
+    """The user's dietary restrictions and allergies as prompt text."""
+    profile = Profile.objects.filter(user=user).first()
+    restrictions = ", ".join(profile.dietary_restrictions) if profile and profile.dietary_restrictions else ""
+    allergies = ", ".join(profile.allergies) if profile and profile.allergies else ""
+    return restrictions, allergies
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def generate_recipe(request):
     """
     Generate a complete recipe from ingredients using AI.
     Expects: {"ingredients": "flour, eggs, sugar, butter"}
+
+    With "async": true the generation runs in the background: the response
+    is 202 with the job id and /api/generate-recipe/<job_id>/ is polled.
+
+    A recipe recently generated for nearly the same ingredients and the same
+    preferences is served from cache ("cached": true); "fresh": true asks
+    for a new one.
     """
     ingredients_text = request.data.get('ingredients')
     
     if not ingredients_text:
         return Response({"error": "Ingredients are required"}, status=status.HTTP_400_BAD_REQUEST)
+    if not isinstance(ingredients_text, str) or not ingredients_text.strip():
+        return Response({"error": "ingredients must be a non-empty string"}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        # Get user's profile for dietary preferences
-        profile = Profile.objects.filter(user=request.user).first()
-        restrictions = ", ".join(profile.dietary_restrictions) if profile and profile.dietary_restrictions else ""
-        allergies = ", ".join(profile.allergies) if profile and profile.allergies else ""
+        restrictions, allergies = profile_preferences(request.user)
+        fresh = parse_flag(request.data.get('fresh', ''))
+
+        if parse_flag(request.data.get('async', '')):
+            if backlog() >= settings.GENERATION_QUEUE_LIMIT:
+                return Response(
+                    {"error": "Too many recipes are being generated, try again shortly"},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '5'},
+                )
+            job = enqueue_generation(request.user, ingredients_text, restrictions, allergies, fresh=fresh)
+            data = GenerationJobSerializer(job).data
+            data['status_url'] = request.build_absolute_uri(reverse('generation-job', args=[job.pk]))
+            return Response(data, status=status.HTTP_202_ACCEPTED)
         
         # Generate recipe using AI
-        recipe_data = generate_recipe_from_ingredients(ingredients_text, restrictions, allergies)
+        recipe_data, similarity = generate_recipe_with_cache(ingredients_text, restrictions, allergies, fresh=fresh)
         
         # Check if there was an error in AI response
         if "error" in recipe_data:
             return Response(recipe_data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
-        return Response(recipe_data, status=status.HTTP_200_OK)
+        cached = similarity is not None
+        headers = {'X-Cache': 'similar' if cached else 'miss'}
+        if cached:
+            headers['X-Cache-Similarity'] = f'{similarity:.2f}'
+        return Response(dict(recipe_data, cached=cached), status=status.HTTP_200_OK, headers=headers)
         
+    except CircuitOpenError as e:
+        return ai_unavailable(e)
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def generate_recipe_stream(request):
+    """
+    Streaming variant of generate_recipe, as Server-Sent Events.
+    Expects: {"ingredients": "flour, eggs, sugar, butter"}
+
+    Sends one event per recipe field ("title", "description", "ingredients",
+    "instructions", ...) as soon as the model has written it, then "done"
+    with the validated recipe, or "error".
+    """
+    ingredients_text = request.data.get('ingredients')
+    if not ingredients_text:
+        return Response({"error": "Ingredients are required"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        get_provider().check_available()
+    except CircuitOpenError as e:
+        return ai_unavailable(e)
+
+    restrictions, allergies = profile_preferences(request.user)
+    chunks = stream_recipe_from_ingredients(ingredients_text, restrictions, allergies)
+    response = StreamingHttpResponse(recipe_events(chunks), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Keep reverse proxies from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def generation_job(request, job_id):
+    """Status of an asynchronous recipe generation; "result" is set once it succeeded."""
+    maybe_sweep()
+    job = GenerationJob.objects.filter(pk=job_id, user=request.user).first()
+    if job is None:
+        return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+    headers = {'Retry-After': '1'} if job.status in (GenerationJob.PENDING, GenerationJob.RUNNING) else {}
+    return Response(GenerationJobSerializer(job).data, headers=headers)
+
+@api_view(['GET'])
+@permission_classes([IsStaffOrInternalNetwork])
+def metrics(request):
+    """LLM call metrics of this worker process in the Prometheus text format."""
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
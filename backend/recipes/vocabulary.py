@@ -0,0 +1,109 @@
+"""
+Normalized ingredient vocabulary.
+
+Free-text ingredient names ("2 Large Eggs", "Fresh Basil", "scallions") are
+reduced to a canonical lowercase singular phrase ("egg", "basil",
+"green onion") so they can be compared across recipes and user input.
+Quantities and the units or containers they are counted in ("2 cups",
+"500g", "1 can") are dropped too: "2 cups flour" is just "flour".
+"""
+import re
+
+# Words that describe an ingredient's preparation or quality rather than what it is
+DESCRIPTORS = {
+    'fresh', 'freshly', 'large', 'small', 'medium', 'chopped', 'diced', 'minced', 'sliced',
+    'grated', 'shredded', 'crushed', 'dried', 'frozen', 'ripe', 'raw', 'cooked',
+    'boneless', 'skinless', 'organic', 'whole', 'finely', 'roughly', 'thinly', 'peeled',
+    'softened', 'melted', 'beaten', 'optional', 'to', 'taste', 'of', 'a', 'an', 'the',
+}
+
+# Unit words (the aliases of units.UNITS, singular) and containers that
+# quantify an ingredient rather than name it
+MEASURES = {
+    'g', 'gr', 'gram', 'gramme', 'kg', 'kilo', 'kilogram', 'mg', 'milligram', 'oz', 'ounce',
+    'lb', 'lbs', 'pound', 'ml', 'millilitre', 'milliliter', 'cl', 'dl', 'l', 'litre', 'liter',
+    'tsp', 'teaspoon', 'tbsp', 'tbs', 'tablespoon', 'fl', 'fluid', 'cup', 'pint', 'quart', 'gallon',
+    'pc', 'pcs', 'piece', 'unit', 'x',
+    'can', 'tin', 'jar', 'bottle', 'carton', 'packet', 'package', 'pack', 'bag', 'box',
+    'bunch', 'clove', 'head', 'stalk', 'sprig', 'handful', 'pinch', 'dash', 'splash', 'knob',
+    'slice', 'stick', 'sheet', 'cube',
+}
+
+SYNONYMS = {
+    'scallion': 'green onion',
+    'spring onion': 'green onion',
+    'cilantro': 'coriander',
+    'garbanzo bean': 'chickpea',
+    'garbanzo': 'chickpea',
+    'aubergine': 'eggplant',
+    'courgette': 'zucchini',
+    'capsicum': 'bell pepper',
+    'confectioners sugar': 'powdered sugar',
+    'icing sugar': 'powdered sugar',
+    'caster sugar': 'sugar',
+    'granulated sugar': 'sugar',
+    'white sugar': 'sugar',
+    'all purpose flour': 'flour',
+    'plain flour': 'flour',
+    'bicarbonate soda': 'baking soda',
+    'prawn': 'shrimp',
+    'beef mince': 'ground beef',
+    'double cream': 'heavy cream',
+    'heavy whipping cream': 'heavy cream',
+    'olive oil': 'oil',
+    'vegetable oil': 'oil',
+    'canola oil': 'oil',
+    'sea salt': 'salt',
+    'kosher salt': 'salt',
+    'black pepper': 'pepper',
+    'yoghurt': 'yogurt',
+}
+
+# Assumed to be in every kitchen; never counted as missing.
+PANTRY_STAPLES = {'salt', 'pepper', 'oil', 'water'}
+
+# Irregular plurals and words the suffix rules would mangle
+SINGULARS = {
+    'leaves': 'leaf', 'loaves': 'loaf', 'halves': 'half', 'knives': 'knife',
+    'tomatoes': 'tomato', 'potatoes': 'potato', 'mangoes': 'mango',
+    'molasses': 'molasses', 'hummus': 'hummus', 'asparagus': 'asparagus',
+    'couscous': 'couscous', 'swiss': 'swiss', 'citrus': 'citrus', 'lentils': 'lentil',
+}
+
+
+def singularize(word):
+    if word in SINGULARS:
+        return SINGULARS[word]
+    if len(word) <= 3 or word.endswith(('ss', 'us', 'is')):
+        return word
+    if word.endswith('ies'):
+        return word[:-3] + 'y'
+    if word.endswith(('ches', 'shes', 'xes', 'sses', 'zes')):
+        return word[:-2]
+    if word.endswith('s'):
+        return word[:-1]
+    return word
+
+
+def normalize_ingredient(name):
+    """Return the canonical phrase for an ingredient name, or '' if nothing is left."""
+    words = re.sub(r'[^a-z\s]', ' ', (name or '').lower()).split()
+    words = [singularize(word) for word in words if word not in DESCRIPTORS]
+    # Keep the measure words when they are all there is ("cloves" the spice)
+    phrase = ' '.join(word for word in words if word not in MEASURES) or ' '.join(words)
+    return SYNONYMS.get(phrase, phrase)
+
+
+def parse_ingredient_list(value):
+    """
+    Split user input (a comma/line separated string or a list of strings)
+    into normalized ingredient phrases, dropping blanks and duplicates.
+    """
+    if isinstance(value, str):
+        value = re.split(r'[,\n;]+', value)
+    phrases = []
+    for item in value or []:
+        phrase = normalize_ingredient(str(item))
+        if phrase and phrase not in phrases:
+            phrases.append(phrase)
+    return phrases
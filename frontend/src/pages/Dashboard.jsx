@@ -8,6 +8,20 @@ import SubstitutionModal from '../components/SubstitutionModal'
 import PreferencesModal from '../components/PreferencesModal'
 import axios from 'axios'
 
+// Extra fields RecipeCard renders on top of the compact list representation
+const CARD_FIELDS = 'author,description,ingredients'
+
+// The dashboard stats need every recipe, so follow the cursor links to the end
+const fetchAllPages = async (url) => {
+    const results = []
+    while (url) {
+        const response = await axios.get(url)
+        results.push(...response.data.results)
+        url = response.data.next
+    }
+    return results
+}
+
 const Dashboard = () => {
     const { user, signOut, updateProfile } = useAuth()
     const navigate = useNavigate()
@@ -26,12 +40,10 @@ const Dashboard = () => {
             if (!user) return
             try {
                 // Fetch My Recipes
-                const recipesRes = await axios.get(`http://localhost:8000/api/recipes/?author=${user.id}`)
-                setMyRecipes(recipesRes.data)
+                setMyRecipes(await fetchAllPages(`http://localhost:8000/api/recipes/?author=${user.id}&expand=${CARD_FIELDS}`))
 
                 // Fetch Favorites
-                const favsRes = await axios.get('http://localhost:8000/api/recipes/my_favorites/')
-                setFavorites(favsRes.data)
+                setFavorites(await fetchAllPages(`http://localhost:8000/api/recipes/my_favorites/?expand=${CARD_FIELDS}`))
             } catch (error) {
                 console.error('Failed to fetch data:', error)
             } finally {
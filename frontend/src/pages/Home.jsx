@@ -7,11 +7,16 @@ import RecipeCard from '../components/RecipeCard'
 import SubstitutionModal from '../components/SubstitutionModal'
 import axios from 'axios'
 
+// Extra fields RecipeCard renders on top of the compact list representation
+const CARD_FIELDS = 'author,description,ingredients'
+
 const Home = () => {
     const { user, signOut } = useAuth()
     const navigate = useNavigate()
     const [recipes, setRecipes] = useState([])
+    const [nextPage, setNextPage] = useState(null)
     const [loading, setLoading] = useState(true)
+    const [loadingMore, setLoadingMore] = useState(false)
     const [substitutes, setSubstitutes] = useState(null)
     const [isModalOpen, setIsModalOpen] = useState(false)
 
@@ -29,11 +34,12 @@ const Home = () => {
     const fetchRecipes = async (query = searchQuery) => {
         setLoading(true)
         try {
-            let url = `http://localhost:8000/api/recipes/?search=${query}&ordering=${sortBy}`
+            let url = `http://localhost:8000/api/recipes/?search=${query}&ordering=${sortBy}&expand=${CARD_FIELDS}`
             if (category) url += `&category=${category}`
 
             const response = await axios.get(url)
-            setRecipes(response.data)
+            setRecipes(response.data.results)
+            setNextPage(response.data.next)
         } catch (error) {
             console.error('Failed to fetch recipes:', error)
         } finally {
@@ -41,6 +47,20 @@ const Home = () => {
         }
     }
 
+    const fetchMoreRecipes = async () => {
+        if (!nextPage) return
+        setLoadingMore(true)
+        try {
+            const response = await axios.get(nextPage)
+            setRecipes(prev => [...prev, ...response.data.results])
+            setNextPage(response.data.next)
+        } catch (error) {
+            console.error('Failed to fetch more recipes:', error)
+        } finally {
+            setLoadingMore(false)
+        }
+    }
+
     const handleSearchSubmit = (e) => {
         e.preventDefault()
         fetchRecipes(searchQuery)
@@ -233,6 +253,18 @@ const Home = () => {
                             )}
                         </motion.div>
                     )}
+
+                    {!loading && nextPage && (
+                        <div className="flex justify-center mt-12">
+                            <button
+                                onClick={fetchMoreRecipes}
+                                disabled={loadingMore}
+                                className="px-8 py-3 border border-orange-500/50 text-orange-500 font-bold rounded-xl hover:bg-orange-500 hover:text-white transition-all disabled:opacity-50"
+                            >
+                                {loadingMore ? 'Loading...' : 'Load More'}
+                            </button>
+                        </div>
+                    )}
                 </div>
             </main>
 